@@ -1,9 +1,13 @@
 from flask import Flask, jsonify, request, session
+import click
 from flask_cors import CORS
-from datetime import timedelta, datetime, time
+from datetime import timedelta, datetime, time, timezone
 import psycopg2
 import secrets
+from time import perf_counter
 import os
+import math
+import heapq
 from dotenv import load_dotenv
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -14,9 +18,23 @@ from flask_session import Session  # Add this import
 from hd_prediction.services.blood_report_processor import blood_report_processor
 from hd_prediction.errors import register_error_handlers
 from hd_prediction import setup_logging, get_logger, PredictionError, ValidationError
-from hd_prediction.services.analytics import AnalyticsService
+from hd_prediction.services.analytics import AnalyticsService, PredictionRollupService
+from hd_prediction.services.monitoring import ReadinessProbe, HealthMetricStore, HealthRetention, RESOLUTIONS
+from hd_prediction.services.monitoring import MetricsCollector
+from hd_prediction.services.directory import DoctorDirectory, normalize as normalize_text
+from hd_prediction.services.directory import bounding_box, EARTH_RADIUS_KM, AUTOCOMPLETE_FIELDS
+from hd_prediction.services.scheduling import SlotCalendar, IntervalIndex, WEEKDAYS, availability_rules
+from hd_prediction.services.scheduling import to_minutes, format_minutes
+from hd_prediction.services.scheduling import SlotTakenError, SLOT_CONSTRAINT, commit_booking
+from hd_prediction.services.scheduling import AppointmentStats, APPOINTMENT_STATUSES, AgendaCache
+from hd_prediction.db import database_uri_from_env, engine_options_from_env, register_pool_metrics, pool_metrics
+from hd_prediction.db import check_query_plans, seed_hot_tables, RowCounter, COUNT_MODES
+from hd_prediction.db import contains, rank, escape_like, has_extension
 from hd_prediction.services.notifications.email_service import EmailService
+from hd_prediction.api import Fieldset, FastJSONProvider, conditional_get, register_compression, stream_export
+from hd_prediction.api import KeysetCursor
 from sqlalchemy import JSON  # Add this import
+from sqlalchemy.orm import load_only
 
 # --- ML Model Integration Imports ---
 import joblib
@@ -55,12 +73,19 @@ print(f"MAIL_DEFAULT_SENDER: {os.getenv('MAIL_DEFAULT_SENDER')}")
 
 app = Flask(__name__)
 
+# Serialize responses with orjson unless the stdlib provider is explicitly requested
+if os.getenv('JSON_PROVIDER', 'fast').lower() == 'fast':
+    app.json = FastJSONProvider(app)
+
 # Setup logging
 setup_logging(app)
 
 # Register error handlers
 register_error_handlers(app)
 
+# Compress large JSON responses (gzip, or brotli when installed)
+register_compression(app, min_size=int(os.getenv('COMPRESS_MIN_SIZE', 1024)))
+
 # Add email configuration with explicit values
 app.config.update(
     MAIL_SERVER=os.getenv('MAIL_SERVER', 'smtp.gmail.com'),
@@ -96,7 +121,9 @@ except Exception as e:
 email_service = EmailService(app)
 
 # --- Configurations ---
-app.config['SQLALCHEMY_DATABASE_URI'] = f"postgresql://{os.getenv('DB_USER', 'postgres')}:{os.getenv('DB_PASSWORD', 'root')}@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '5432')}/{os.getenv('DB_NAME', 'heart_disease_db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri_from_env(os.environ)
+# Pool size/overflow/recycle/timeout/pre-ping come from DB_POOL_*; DB_PGBOUNCER=true uses NullPool
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_from_env(os.environ)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 app.secret_key = secrets.token_hex(24)
@@ -113,6 +140,9 @@ app.config['SESSION_TYPE'] = 'filesystem'
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
 
+with app.app_context():
+    register_pool_metrics(db.engine)
+
 # Initialize session
 Session(app)
 
@@ -145,9 +175,13 @@ def before_request():
         response.headers['Vary'] = 'Origin'
         return response
 
-    # Ensure database is initialized
-    if not ensure_database_initialized():
-        return jsonify({"error": "Database connection error"}), 500
+    # Load balancer probes must answer even while the database is down
+    if request.path in ('/healthz', '/readyz'):
+        return None
+
+    # Cached readiness flag; no database round trip while it is healthy
+    if not database_probe.ensure():
+        return jsonify({"error": "Database connection error"}), 503
 
 # --- Database Creation (Run once if DB doesn't exist) ---
 DEFAULT_DB_ADMIN = 'postgres'
@@ -260,7 +294,7 @@ class User(db.Model):
         for i, pred in enumerate(recent_predictions):
             # Weights: most recent = 0.5, second = 0.3, third = 0.2
             weight = 0.5 if i == 0 else (0.3 if i == 1 else 0.2)
-            risk_percentage = pred.to_dict()['riskPercentage']
+            risk_percentage = pred.risk_summary()[1]
             
             # Convert risk percentage to health score (100 - risk)
             health_score = 100 - risk_percentage
@@ -293,6 +327,7 @@ class Resource(db.Model):
     image_url = db.Column(db.String(500), nullable=True)
     date_published = db.Column(db.DateTime, default=datetime.utcnow)
     content = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def to_dict(self):
         return {'id': self.id, 'title': self.title, 'description': self.description,
@@ -335,7 +370,30 @@ class PredictionRecord(db.Model):
     probability_score = db.Column(db.Float, nullable=True)
     user = db.relationship('User', backref=db.backref('prediction_history', lazy='dynamic')) # Changed to lazy='dynamic'
 
-    def to_dict(self):
+    def risk_summary(self):
+        """Return (risk_level, risk_percentage) derived from the stored prediction"""
+        return self.summarize_risk(self.probability_score, self.predicted_class)
+
+    @staticmethod
+    def summarize_risk(probability_score, predicted_class):
+        risk_level = "low"
+        risk_percentage = 0
+        if probability_score is not None:
+            risk_percentage = round(probability_score * 100)
+            if risk_percentage >= 70: risk_level = "high"
+            elif risk_percentage >= 40: risk_level = "medium"
+        elif predicted_class == 1:
+            risk_level = "high"; risk_percentage = 75
+        else:
+            risk_percentage = 15
+        return risk_level, risk_percentage
+
+    def input_features(self):
+        return { 'age': self.age, 'sex': self.sex, 'cp': self.cp, 'trestbps': self.trestbps,
+                 'chol': self.chol, 'fbs': self.fbs, 'restecg': self.restecg, 'thalach': self.thalach,
+                 'exang': self.exang, 'oldpeak': self.oldpeak, 'slope': self.slope}
+
+    def symptoms(self):
         # Basic derived symptoms (customize further)
         symptoms_list = [f"Age: {self.age}", f"Sex: {'Male' if self.sex == 1 else 'Female'}"]
         cp_map = {0: "Typical Angina", 1: "Atypical Angina", 2: "Non-anginal Pain", 3: "Asymptomatic", 4: "CP Type 4"} # VERIFY THIS MAP
@@ -350,7 +408,9 @@ class PredictionRecord(db.Model):
         if self.exang == 1: symptoms_list.append("Exercise Induced Angina: Yes")
         if self.oldpeak > 1.0: symptoms_list.append(f"ST Depression (Oldpeak): {self.oldpeak} (Significant)")
         if self.slope in slope_map: symptoms_list.append(f"ST Slope: {slope_map[self.slope]}")
-        
+        return symptoms_list[:3] # Show top 3 for brevity
+
+    def recommendations(self):
         # Basic recommendations
         recommendations_list = ["Consult a healthcare professional for a comprehensive evaluation.",
                                 "Maintain a heart-healthy lifestyle (diet, exercise, stress management)."]
@@ -358,26 +418,51 @@ class PredictionRecord(db.Model):
             recommendations_list.append("Further diagnostic tests may be recommended by your doctor.")
         if self.probability_score is not None and self.probability_score >= 0.7:
             recommendations_list.insert(1, "Proactively discuss your risk factors with your doctor.")
+        return recommendations_list[:3]
 
-        risk_level = "low"
-        risk_percentage = 0
-        if self.probability_score is not None:
-            risk_percentage = round(self.probability_score * 100)
-            if risk_percentage >= 70: risk_level = "high"
-            elif risk_percentage >= 40: risk_level = "medium"
-        elif self.predicted_class == 1:
-            risk_level = "high"; risk_percentage = 75
-        else:
-            risk_percentage = 15
-
+    def to_dict(self):
+        risk_level, risk_percentage = self.risk_summary()
         return {'id': self.id, 'user_id': self.user_id,
                 'predictionDate': self.prediction_date.isoformat(),
                 'predictedClass': self.predicted_class, 'probabilityScore': self.probability_score,
                 'riskLevel': risk_level, 'riskPercentage': risk_percentage,
-                'symptoms': symptoms_list[:3], 'recommendations': recommendations_list[:3], # Show top 3 for brevity
-                'inputFeatures': { 'age': self.age, 'sex': self.sex, 'cp': self.cp, 'trestbps': self.trestbps,
-                                   'chol': self.chol, 'fbs': self.fbs, 'restecg': self.restecg, 'thalach': self.thalach,
-                                   'exang': self.exang, 'oldpeak': self.oldpeak, 'slope': self.slope}}
+                'symptoms': self.symptoms(), 'recommendations': self.recommendations(),
+                'inputFeatures': self.input_features()}
+
+class PredictionDailyRollup(db.Model):
+    __tablename__ = 'prediction_daily_rollup'
+    day = db.Column(db.Date, primary_key=True)
+    prediction_count = db.Column(db.Integer, nullable=False, default=0)
+    probability_sum = db.Column(db.Float, nullable=False, default=0.0)
+    probability_count = db.Column(db.Integer, nullable=False, default=0)
+    high_risk_count = db.Column(db.Integer, nullable=False, default=0)
+    medium_risk_count = db.Column(db.Integer, nullable=False, default=0)
+    low_risk_count = db.Column(db.Integer, nullable=False, default=0)
+    male_count = db.Column(db.Integer, nullable=False, default=0)
+    female_count = db.Column(db.Integer, nullable=False, default=0)
+    age_under_40 = db.Column(db.Integer, nullable=False, default=0)
+    age_40_54 = db.Column(db.Integer, nullable=False, default=0)
+    age_55_64 = db.Column(db.Integer, nullable=False, default=0)
+    age_65_plus = db.Column(db.Integer, nullable=False, default=0)
+    max_record_id = db.Column(db.Integer, nullable=False, default=0)  # incremental refresh watermark
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'prediction_count': self.prediction_count,
+            'probability_sum': self.probability_sum,
+            'probability_count': self.probability_count,
+            'high_risk_count': self.high_risk_count,
+            'medium_risk_count': self.medium_risk_count,
+            'low_risk_count': self.low_risk_count,
+            'male_count': self.male_count,
+            'female_count': self.female_count,
+            'age_under_40': self.age_under_40,
+            'age_40_54': self.age_40_54,
+            'age_55_64': self.age_55_64,
+            'age_65_plus': self.age_65_plus
+        }
 
 class UserActivity(db.Model):
     __tablename__ = 'user_activities'
@@ -420,6 +505,45 @@ class SystemHealth(db.Model):
             'recordedAt': self.recorded_at.isoformat()
         }
 
+class SystemHealthCurrent(db.Model):
+    """Latest sample per metric, upserted alongside every system_health insert"""
+    __tablename__ = 'system_health_current'
+    metric_name = db.Column(db.String(50), primary_key=True)
+    metric_value = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    details = db.Column(db.Text, nullable=True)
+    recorded_at = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            'metricName': self.metric_name,
+            'metricValue': self.metric_value,
+            'status': self.status,
+            'details': self.details,
+            'recordedAt': self.recorded_at.isoformat()
+        }
+
+class SystemHealthStatusCount(db.Model):
+    """Number of system_health rows per status, maintained on insert"""
+    __tablename__ = 'system_health_status_counts'
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+
+class SystemHealthRollup(db.Model):
+    """Hourly and daily min/avg/max of system_health samples past raw retention"""
+    __tablename__ = 'system_health_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('resolution', 'metric_name', 'bucket_start', name='uq_system_health_rollups_bucket'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.String(10), nullable=False)  # hour, day
+    metric_name = db.Column(db.String(50), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    min_value = db.Column(db.Float, nullable=False)
+    avg_value = db.Column(db.Float, nullable=False)
+    max_value = db.Column(db.Float, nullable=False)
+    sample_count = db.Column(db.Integer, nullable=False)
+
 class AdminActivityLog(db.Model):
     __tablename__ = 'admin_activity_logs'
     id = db.Column(db.Integer, primary_key=True)
@@ -471,80 +595,48 @@ class Doctor(db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
-    def to_dict(self):
-        try:
-            # Ensure availability is a valid JSON object with required fields
-            availability = self.availability or {}
-            if not isinstance(availability, dict):
-                availability = {}
-            if 'days' not in availability:
-                availability['days'] = []
-            if 'startTime' not in availability:
-                availability['startTime'] = '09:00'
-            if 'endTime' not in availability:
-                availability['endTime'] = '17:00'
-
-            # Create a dictionary with safe defaults for all fields
-            doctor_dict = {
-                'id': self.id,
-                'fullName': str(self.fullName) if self.fullName else '',
-                'specialization': str(self.specialization) if self.specialization else '',
-                'qualifications': str(self.qualifications) if self.qualifications else '',
-                'experience': int(self.experience) if self.experience is not None else 0,
-                'hospital': str(self.hospital) if self.hospital else '',
-                'address': str(self.address) if self.address else '',
-                'city': str(self.city) if self.city else '',
-                'area': str(self.area) if self.area else '',
-                'phoneNumber': str(self.phoneNumber) if self.phoneNumber else '',
-                'email': str(self.email) if self.email else '',
-                'availability': availability,
-                'rating': float(self.rating) if self.rating is not None else 0.0,
-                'totalAppointments': int(self.totalAppointments) if self.totalAppointments is not None else 0,
-                'reviews': int(self.reviews) if self.reviews is not None else 0,
-                'consultationFee': float(self.consultationFee) if self.consultationFee is not None else 0.0,
-                'latitude': float(self.latitude) if self.latitude is not None else None,
-                'longitude': float(self.longitude) if self.longitude is not None else None,
-                'created_at': self.created_at.isoformat() if self.created_at else None,
-                'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-                'last_login': self.last_login.isoformat() if self.last_login else None
-            }
-
-            # Log any missing or null fields for debugging
-            null_fields = [k for k, v in doctor_dict.items() if v is None]
-            if null_fields:
-                app.logger.warning(f"Doctor {self.id} has null fields: {null_fields}")
+    @staticmethod
+    def availability_with_defaults(availability):
+        """Return a copy of the availability JSON with the required keys filled in"""
+        if not isinstance(availability, dict):
+            availability = {}
+        return {'days': [], 'startTime': '09:00', 'endTime': '17:00', **availability}
 
-            return doctor_dict
-        except Exception as e:
-            app.logger.error(f"Error converting doctor {self.id} to dict: {str(e)}", exc_info=True)
-            # Return a minimal valid dict with required fields
-            return {
-                'id': self.id,
-                'fullName': str(self.fullName) if self.fullName else '',
-                'specialization': str(self.specialization) if self.specialization else '',
-                'hospital': str(self.hospital) if self.hospital else '',
-                'email': str(self.email) if self.email else '',
-                'phoneNumber': str(self.phoneNumber) if self.phoneNumber else '',
-                'availability': {
-                    'days': [],
-                    'startTime': '09:00',
-                    'endTime': '17:00'
-                },
-                'rating': 0.0,
-                'totalAppointments': 0,
-                'reviews': 0,
-                'consultationFee': 0.0
-            }
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'fullName': self.fullName or '',
+            'specialization': self.specialization or '',
+            'qualifications': self.qualifications or '',
+            'experience': self.experience if self.experience is not None else 0,
+            'hospital': self.hospital or '',
+            'address': self.address or '',
+            'city': self.city or '',
+            'area': self.area or '',
+            'phoneNumber': self.phoneNumber or '',
+            'email': self.email or '',
+            'availability': self.availability_with_defaults(self.availability),
+            'rating': self.rating if self.rating is not None else 0.0,
+            'totalAppointments': self.totalAppointments if self.totalAppointments is not None else 0,
+            'reviews': self.reviews if self.reviews is not None else 0,
+            'consultationFee': self.consultationFee if self.consultationFee is not None else 0.0,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'last_login': self.last_login.isoformat() if self.last_login else None
+        }
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False)
-    date = db.Column(db.Date, nullable=False)
+    # active_history: AppointmentStats needs the previous value even when the attribute was expired
+    doctor_id = db.column_property(db.Column(db.Integer, db.ForeignKey('doctors.id'), nullable=False), active_history=True)
+    date = db.column_property(db.Column(db.Date, nullable=False), active_history=True)
     time = db.Column(db.Time, nullable=False)
     reason = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(20), default='scheduled')  # scheduled, completed, cancelled
+    status = db.column_property(db.Column(db.String(20), default='scheduled'), active_history=True)  # scheduled, completed, cancelled
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -566,6 +658,303 @@ class Appointment(db.Model):
             'user': self.user.to_dict() if self.user else None
         }
 
+class DoctorScheduleRule(db.Model):
+    """Weekly working window of a doctor, cut into slots of ``slot_minutes``"""
+    __tablename__ = 'doctor_schedule_rules'
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id', ondelete='CASCADE'), nullable=False)
+    weekday = db.Column(db.SmallInteger, nullable=False)  # 0 = Monday
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    slot_minutes = db.Column(db.SmallInteger, nullable=False, default=30)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def as_rule(self):
+        return self.weekday, to_minutes(self.start_time), to_minutes(self.end_time), self.slot_minutes
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'day': WEEKDAYS[self.weekday],
+            'startTime': self.start_time.strftime('%H:%M'),
+            'endTime': self.end_time.strftime('%H:%M'),
+            'slotMinutes': self.slot_minutes
+        }
+
+class DoctorScheduleException(db.Model):
+    """Dated change to a doctor's weekly rules: time off (``off``) or extra hours (``extra``)"""
+    __tablename__ = 'doctor_schedule_exceptions'
+    id = db.Column(db.Integer, primary_key=True)
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id', ondelete='CASCADE'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # off, extra
+    start_time = db.Column(db.Time, nullable=True)  # null start/end: the whole day
+    end_time = db.Column(db.Time, nullable=True)
+    slot_minutes = db.Column(db.SmallInteger, nullable=True)
+    reason = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def as_exception(self):
+        return (self.date,
+                to_minutes(self.start_time) if self.start_time else None,
+                to_minutes(self.end_time) if self.end_time else None,
+                self.kind, self.slot_minutes)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'date': self.date.isoformat(),
+            'kind': self.kind,
+            'startTime': self.start_time.strftime('%H:%M') if self.start_time else None,
+            'endTime': self.end_time.strftime('%H:%M') if self.end_time else None,
+            'slotMinutes': self.slot_minutes,
+            'reason': self.reason
+        }
+
+class DoctorAppointmentCount(db.Model):
+    """Appointments per doctor and status, maintained by AppointmentStats on every flush"""
+    __tablename__ = 'doctor_appointment_counts'
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id', ondelete='CASCADE'), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class DoctorDailyUtilization(db.Model):
+    """Booked (non-cancelled) vs available slots per doctor and day"""
+    __tablename__ = 'doctor_daily_utilization'
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    booked_slots = db.Column(db.Integer, nullable=False, default=0)  # maintained on every flush
+    available_slots = db.Column(db.Integer, nullable=False, default=0)  # refreshed from the schedules
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class DoctorAgendaVersion(db.Model):
+    """Bumped on every flush that changes one of the doctor's appointments; validates AgendaCache"""
+    __tablename__ = 'doctor_agenda_versions'
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id', ondelete='CASCADE'), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+# --- Indexes for hot filters (see migrations/versions/add_hot_query_indexes.py) ---
+db.Index('ix_prediction_records_user_id_prediction_date_id', PredictionRecord.user_id, PredictionRecord.prediction_date, PredictionRecord.id)
+db.Index('ix_prediction_records_prediction_date', PredictionRecord.prediction_date)
+db.Index('ix_user_activities_created_at_id', UserActivity.created_at, UserActivity.id)
+db.Index('ix_user_activities_user_id_created_at', UserActivity.user_id, UserActivity.created_at)
+db.Index('ix_appointments_doctor_id_date_status', Appointment.doctor_id, Appointment.date, Appointment.status)
+db.Index(SLOT_CONSTRAINT, Appointment.doctor_id, Appointment.date, Appointment.time,
+         unique=True, postgresql_where=Appointment.status == 'scheduled')
+db.Index('ix_doctors_latitude_longitude', Doctor.latitude, Doctor.longitude)
+db.Index('ix_appointments_user_id_date_time_id', Appointment.user_id, Appointment.date, Appointment.time, Appointment.id)
+db.Index('ix_appointments_doctor_id_date_time_id', Appointment.doctor_id, Appointment.date, Appointment.time, Appointment.id)
+db.Index('ix_system_health_metric_name_recorded_at', SystemHealth.metric_name, SystemHealth.recorded_at.desc())
+db.Index('ix_system_health_recorded_at', SystemHealth.recorded_at)
+db.Index('ix_admin_activity_logs_created_at_id', AdminActivityLog.created_at, AdminActivityLog.id)
+db.Index('ix_doctor_schedule_rules_doctor_id_weekday', DoctorScheduleRule.doctor_id, DoctorScheduleRule.weekday)
+db.Index('ix_doctor_schedule_exceptions_doctor_id_date', DoctorScheduleException.doctor_id, DoctorScheduleException.date)
+db.Index('ix_doctor_daily_utilization_day', DoctorDailyUtilization.day)
+
+# --- Appointment scheduling ---
+slot_calendar = SlotCalendar(db, Appointment, DoctorScheduleRule, DoctorScheduleException)
+appointment_stats = AppointmentStats(db, Appointment, Doctor, DoctorAppointmentCount,
+                                     DoctorDailyUtilization, slot_calendar)
+appointment_stats.watch()
+
+def load_doctor_agenda(doctor_id, start, end):
+    """Day-grouped agenda from one range query on ix_appointments_doctor_id_date_time_id"""
+    # Latest prediction per patient via ix_prediction_records_user_id_prediction_date_id
+    latest = db.select(PredictionRecord.probability_score, PredictionRecord.predicted_class)\
+        .where(PredictionRecord.user_id == Appointment.user_id)\
+        .order_by(PredictionRecord.prediction_date.desc(), PredictionRecord.id.desc())\
+        .limit(1).lateral('latest_prediction')
+    rows = db.session.query(
+        Appointment.id, Appointment.date, Appointment.time, Appointment.reason, Appointment.status,
+        User.full_name, latest.c.probability_score, latest.c.predicted_class
+    ).join(User, User.id == Appointment.user_id).outerjoin(latest, db.true()).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.date.between(start, end),
+        db.func.coalesce(Appointment.status, 'scheduled') != 'cancelled'
+    ).order_by(Appointment.date, Appointment.time, Appointment.id).all()
+    days = []
+    for row in rows:
+        day = row.date.isoformat()
+        if not days or days[-1]['date'] != day:
+            days.append({'date': day, 'appointments': []})
+        has_prediction = row.probability_score is not None or row.predicted_class is not None
+        days[-1]['appointments'].append({
+            'id': row.id,
+            'time': row.time.strftime('%H:%M'),
+            'patient': row.full_name,
+            'reason': row.reason,
+            'status': row.status,
+            'risk': PredictionRecord.summarize_risk(row.probability_score, row.predicted_class)[0]
+            if has_prediction else None
+        })
+    return days
+
+agenda_cache = AgendaCache(db, Appointment, User, PredictionRecord, DoctorAgendaVersion,
+                           load_doctor_agenda, max_entries=int(os.getenv('AGENDA_CACHE_SIZE', 1000)))
+agenda_cache.watch()
+
+# --- Sparse Fieldsets (?fields=) for list endpoints ---
+PREDICTION_FEATURE_COLUMNS = ('age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg',
+                              'thalach', 'exang', 'oldpeak', 'slope')
+
+RESOURCE_FIELDS = Fieldset(Resource, {
+    'id': 'id', 'title': 'title', 'description': 'description', 'category': 'category',
+    'url': 'url', 'imageUrl': 'image_url', 'datePublished': 'date_published', 'content': 'content'
+})
+
+USER_FIELDS = Fieldset(User, {
+    'id': 'id', 'email': 'email', 'fullName': 'full_name', 'dateOfBirth': 'date_of_birth',
+    'gender': 'gender', 'phoneNumber': 'phone_number', 'address': 'address',
+    'lastCheckup': 'last_checkup'
+}, computed={
+    'healthScore': (('id',), lambda u: u.calculate_health_score())
+})
+
+PREDICTION_FIELDS = Fieldset(PredictionRecord, {
+    'id': 'id', 'user_id': 'user_id', 'predictionDate': 'prediction_date',
+    'predictedClass': 'predicted_class', 'probabilityScore': 'probability_score'
+}, computed={
+    'riskLevel': (('probability_score', 'predicted_class'), lambda r: r.risk_summary()[0]),
+    'riskPercentage': (('probability_score', 'predicted_class'), lambda r: r.risk_summary()[1]),
+    'symptoms': (PREDICTION_FEATURE_COLUMNS, lambda r: r.symptoms()),
+    'recommendations': (('probability_score', 'predicted_class'), lambda r: r.recommendations()),
+    'inputFeatures': (PREDICTION_FEATURE_COLUMNS, lambda r: r.input_features())
+})
+
+DOCTOR_FIELDS = Fieldset(Doctor, {
+    'id': 'id', 'fullName': 'fullName', 'specialization': 'specialization',
+    'qualifications': 'qualifications', 'experience': 'experience', 'hospital': 'hospital',
+    'address': 'address', 'city': 'city', 'area': 'area', 'phoneNumber': 'phoneNumber',
+    'email': 'email', 'rating': 'rating',
+    'totalAppointments': 'totalAppointments', 'reviews': 'reviews',
+    'consultationFee': 'consultationFee', 'latitude': 'latitude', 'longitude': 'longitude',
+    'created_at': 'created_at', 'updated_at': 'updated_at', 'last_login': 'last_login'
+}, computed={
+    'availability': (('availability',), lambda d: Doctor.availability_with_defaults(d.availability))
+})
+
+USER_ACTIVITY_FIELDS = Fieldset(UserActivity, {
+    'id': 'id', 'userId': 'user_id', 'activityType': 'activity_type',
+    'activityDetails': 'activity_details', 'ipAddress': 'ip_address',
+    'userAgent': 'user_agent', 'createdAt': 'created_at'
+})
+
+ADMIN_LOG_FIELDS = Fieldset(AdminActivityLog, {
+    'id': 'id', 'adminId': 'admin_id', 'actionType': 'action_type',
+    'actionDetails': 'action_details', 'ipAddress': 'ip_address', 'createdAt': 'created_at'
+})
+
+APPOINTMENT_FIELDS = Fieldset(Appointment, {
+    'id': 'id', 'userId': 'user_id', 'doctorId': 'doctor_id', 'date': 'date', 'time': 'time',
+    'reason': 'reason', 'status': 'status', 'createdAt': 'created_at', 'updatedAt': 'updated_at'
+}, computed={
+    'doctor': (('doctor_id',), lambda a: a.doctor.to_dict() if a.doctor else None),
+    'user': (('user_id',), lambda a: a.user.to_dict() if a.user else None)
+})
+
+# --- Keyset cursors (newest first) for ?after= pagination ---
+PREDICTION_CURSOR = KeysetCursor(PredictionRecord.prediction_date, PredictionRecord.id)
+USER_ACTIVITY_CURSOR = KeysetCursor(UserActivity.created_at, UserActivity.id)
+ADMIN_LOG_CURSOR = KeysetCursor(AdminActivityLog.created_at, AdminActivityLog.id)
+APPOINTMENT_CURSOR = KeysetCursor(Appointment.date, Appointment.time, Appointment.id)
+CURSOR_PAGE_MAX = 100
+
+def cursor_page_size(per_page):
+    return max(1, min(per_page, CURSOR_PAGE_MAX))
+
+def wants_total():
+    return request.args.get('include_total', 'false').lower() == 'true'
+
+# --- Totals for offset-paginated admin lists (?count=exact|estimated|none) ---
+row_counter = RowCounter(db, ttl=int(os.getenv('COUNT_CACHE_SECONDS', 30)))
+
+def parse_count_mode():
+    mode = request.args.get('count', 'exact')
+    if mode not in COUNT_MODES:
+        raise ValidationError('Invalid count mode', payload={'allowed': list(COUNT_MODES)})
+    return mode
+
+def counted_page_response(key, items, page):
+    return jsonify({
+        'success': True,
+        key: items,
+        'total': page.total,
+        'total_approximate': page.approximate,
+        'pages': page.pages,
+        'current_page': page.page,
+        'has_next': page.has_next
+    })
+
+# --- HTTP caching for public read endpoints ---
+PUBLIC_CACHE_MAX_AGE = int(os.getenv('PUBLIC_CACHE_MAX_AGE', 60))
+
+def table_version(model):
+    """Cheap version stamp for a table: row count plus the latest updated_at"""
+    count, latest = db.session.query(db.func.count(model.id), db.func.max(model.updated_at)).one()
+    return f"{model.__tablename__}:{count}:{latest.isoformat() if latest else 0}"
+
+# --- Doctor search backend (search, suggest, locations) ---
+# 'memory' serves reads from a per-worker index; 'sql' uses the pg_trgm indexes
+# and suits directories too large to hold in every worker.
+DOCTOR_SEARCH_BACKEND = os.getenv('DOCTOR_SEARCH_BACKEND', 'memory')
+
+# rank() calls pg_trgm's word_similarity(), which db.create_all() does not install;
+# where the extension is missing, text search keeps the plain ILIKE filters.
+doctor_trigram_ranking = None
+
+def trigram_ranking_enabled():
+    """Whether pg_trgm is installed; looked up once per process"""
+    global doctor_trigram_ranking
+    if doctor_trigram_ranking is None:
+        with db.engine.connect() as connection:
+            doctor_trigram_ranking = has_extension(connection, 'pg_trgm')
+        if not doctor_trigram_ranking:
+            app.logger.warning("pg_trgm is not installed; doctor search falls back to unranked ILIKE")
+    return doctor_trigram_ranking
+
+def load_doctor_directory():
+    return [doctor.to_dict() for doctor in Doctor.query.all()]
+
+doctor_directory = DoctorDirectory(load_doctor_directory, lambda: table_version(Doctor))
+doctor_directory.watch(Doctor, ignore=('last_login', 'updated_at'))
+
+def refresh_doctor_directory():
+    if DOCTOR_SEARCH_BACKEND != 'memory':
+        return
+    with app.app_context():
+        try:
+            doctor_directory.refresh()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error refreshing doctor directory: {str(e)}")
+
+def doctor_directory_version():
+    if DOCTOR_SEARCH_BACKEND == 'memory':
+        return doctor_directory.version
+    return table_version(Doctor)
+
+def doctor_search_query(query, city, area=None, specialization=None):
+    """Trigram-indexed substring filters, best matches first"""
+    query = query.filter(contains(Doctor.city, city))
+    terms = [(city, Doctor.city)]
+    if area:
+        query = query.filter(contains(Doctor.area, area))
+        terms.append((area, Doctor.area))
+    if specialization:
+        query = query.filter(contains(Doctor.specialization, specialization))
+        terms.append((specialization, Doctor.specialization))
+    if not trigram_ranking_enabled():
+        return query.order_by(Doctor.id)
+    relevance = sum((rank(term, column) for term, column in terms[1:]), rank(*terms[0]))
+    return query.order_by(relevance.desc(), Doctor.id)
+
+def find_doctors(city, area=None, specialization=None):
+    """Public doctor dicts matching the location/specialization filters"""
+    if DOCTOR_SEARCH_BACKEND == 'memory':
+        return doctor_directory.search(city, area, specialization)
+    return [doctor.to_dict() for doctor in doctor_search_query(Doctor.query, city, area, specialization).all()]
+
 # --- Decorators ---
 def login_required(f):
     @wraps(f)
@@ -828,10 +1217,12 @@ def change_password_route():
 @app.route('/api/admin/resources', methods=['GET'])
 @admin_required
 def admin_get_resources_route():
+    fields = RESOURCE_FIELDS.parse(request.args.get('fields'))
     try:
         page = request.args.get('page', 1, type=int); per_page = request.args.get('per_page', 10, type=int)
-        pagination = Resource.query.order_by(Resource.date_published.desc()).paginate(page=page, per_page=per_page, error_out=False)
-        return jsonify({'success': True, 'resources': [r.to_dict() for r in pagination.items], 'total': pagination.total,
+        query = RESOURCE_FIELDS.apply(Resource.query, fields)
+        pagination = query.order_by(Resource.date_published.desc()).paginate(page=page, per_page=per_page, error_out=False)
+        return jsonify({'success': True, 'resources': RESOURCE_FIELDS.dump(pagination.items, fields), 'total': pagination.total,
                         'pages': pagination.pages, 'current_page': pagination.page, 'has_next': pagination.has_next, 'has_prev': pagination.has_prev})
     except Exception as e: app.logger.error(f"Admin get resources error: {e}"); return jsonify({'error': 'Fetch failed'}), 500
 
@@ -902,18 +1293,21 @@ def admin_delete_resource_route(resource_id):
 
 # --- Public Resource Routes ---
 @app.route('/api/resources', methods=['GET'])
+@conditional_get(lambda: table_version(Resource), max_age=PUBLIC_CACHE_MAX_AGE)
 def get_public_resources_route():
+    fields = RESOURCE_FIELDS.parse(request.args.get('fields'))
     try:
         page = request.args.get('page', 1, type=int); per_page = request.args.get('per_page', 10, type=int)
         category = request.args.get('category', None, type=str)
-        query = Resource.query
+        query = RESOURCE_FIELDS.apply(Resource.query, fields)
         if category: query = query.filter_by(category=category)
         pagination = query.order_by(Resource.date_published.desc()).paginate(page=page, per_page=per_page, error_out=False)
-        return jsonify({'success': True, 'resources': [r.to_dict() for r in pagination.items], 'total': pagination.total,
+        return jsonify({'success': True, 'resources': RESOURCE_FIELDS.dump(pagination.items, fields), 'total': pagination.total,
                         'pages': pagination.pages, 'currentPage': pagination.page, 'hasNext': pagination.has_next, 'hasPrev': pagination.has_prev})
     except Exception as e: app.logger.error(f"Public get resources error: {e}"); return jsonify({'success': False, 'error': 'Fetch failed'}), 500
 
 @app.route('/api/resources/<int:resource_id>', methods=['GET'])
+@conditional_get(lambda: table_version(Resource), max_age=PUBLIC_CACHE_MAX_AGE)
 def get_public_resource_route(resource_id):
     try: res = Resource.query.get_or_404(resource_id); return jsonify({'success': True, 'resource': res.to_dict()})
     except Exception as e:
@@ -928,10 +1322,19 @@ def get_prediction_history_route():
     current_user_id = session['user_id']
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 5, type=int)
-    history_pagination = PredictionRecord.query.filter_by(user_id=current_user_id)\
-                                             .order_by(PredictionRecord.prediction_date.desc())\
-                                             .paginate(page=page, per_page=per_page, error_out=False)
-    return jsonify({'success': True, 'history': [r.to_dict() for r in history_pagination.items],
+    fields = PREDICTION_FIELDS.parse(request.args.get('fields'))
+    after = PREDICTION_CURSOR.parse(request.args)
+    query = PREDICTION_FIELDS.apply(PredictionRecord.query, fields).filter_by(user_id=current_user_id)
+    if after is not None:
+        keyset = PREDICTION_CURSOR.page(query, after, cursor_page_size(per_page), with_total=wants_total())
+        result = {'success': True, 'history': PREDICTION_FIELDS.dump(keyset.items, fields),
+                  'nextCursor': keyset.next_cursor, 'hasNext': keyset.has_next}
+        if keyset.total is not None:
+            result['total'] = keyset.total
+        return jsonify(result)
+    history_pagination = query.order_by(PredictionRecord.prediction_date.desc())\
+                              .paginate(page=page, per_page=per_page, error_out=False)
+    return jsonify({'success': True, 'history': PREDICTION_FIELDS.dump(history_pagination.items, fields),
                     'total': history_pagination.total, 'pages': history_pagination.pages,
                     'currentPage': history_pagination.page, 'hasNext': history_pagination.has_next,
                     'hasPrev': history_pagination.has_prev})
@@ -1120,6 +1523,25 @@ def init_db_command():
         db.create_all()
     app.logger.info("Database tables ensured/created (if they didn't exist based on models).")
 
+@app.cli.command("check-query-plans")
+@click.option('--seed-rows', default=0, help='Seed this many synthetic rows per hot table first (rolled back afterwards).')
+@click.option('--threshold', default=10000, help='Fail on sequential scans over tables with at least this many rows.')
+def check_query_plans_command(seed_rows, threshold):
+    """EXPLAINs the hot queries and fails if any plan falls back to a large sequential scan."""
+    with app.app_context():
+        try:
+            if seed_rows:
+                seed_hot_tables(db.session, seed_rows)
+            results = check_query_plans(db.session, threshold=threshold)
+        finally:
+            db.session.rollback()
+    for result in results:
+        status = 'PASS' if result['passed'] else 'FAIL'
+        details = f" seq scan on {', '.join(result['seq_scans'])}" if result['seq_scans'] else ''
+        click.echo(f"[{status}] {result['query']}: {result['node_type']} (cost {result['total_cost']}){details}")
+    if not all(result['passed'] for result in results):
+        raise SystemExit(1)
+
 @app.route('/api/upload-blood-report', methods=['POST'])
 @login_required
 def upload_blood_report_route():
@@ -1233,30 +1655,33 @@ def test_email_config():
             'error_type': type(e).__name__
         }), 500
 
-# --- Database Initialization Check ---
-def ensure_database_initialized():
-    try:
-        with app.app_context():
-            # Test database connection
-            db.engine.connect()
-            app.logger.info("Database connection successful")
-            
-            # Ensure tables exist
-            db.create_all()
-            app.logger.info("Database tables verified")
-            
-            return True
-    except Exception as e:
-        app.logger.error(f"Database connection failed: {str(e)}", exc_info=True)
-        return False
-
-# Ensure database is initialized before handling requests
-@app.before_request
-def before_request():
-    if not ensure_database_initialized():
-        return jsonify({"error": "Database connection error"}), 500
+# --- Database Readiness ---
+DB_PROBE_INTERVAL_SECONDS = int(os.getenv('DB_PROBE_INTERVAL_SECONDS', 15))
 
-# --- Database Table Creation ---
+def probe_database():
+    """Cheap liveness query; the connection is returned to the pool straight away"""
+    with app.app_context():
+        with db.engine.connect() as connection:
+            connection.execute(db.text('SELECT 1'))
+
+database_probe = ReadinessProbe(probe_database)
+
+@app.route('/healthz', methods=['GET'])
+def healthz_route():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz_route():
+    """Readiness: the cached database probe is passing"""
+    ready = database_probe.ensure()
+    return jsonify({
+        'status': 'ready' if ready else 'unavailable',
+        'database': database_probe.status(),
+        'ml_model_loaded': ML_COMPONENTS_LOADED
+    }), 200 if ready else 503
+
+# --- Database Table Creation (once at startup; use `flask db upgrade` in production) ---
 def create_tables_if_not_exist():
     try:
         with app.app_context():
@@ -1268,35 +1693,141 @@ def create_tables_if_not_exist():
         return False
 
 # Create tables when the application starts
-create_tables_if_not_exist()
+if os.getenv('DB_BOOTSTRAP_ON_STARTUP', 'true').lower() == 'true':
+    create_tables_if_not_exist()
+if database_probe.check():
+    refresh_doctor_directory()
+
+# --- Prediction Analytics Rollups ---
+prediction_rollups = PredictionRollupService(db, PredictionRecord, PredictionDailyRollup)
+
+def refresh_prediction_rollup():
+    with app.app_context():
+        try:
+            prediction_rollups.refresh()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error refreshing prediction rollup: {str(e)}")
+
+@app.cli.command("backfill-prediction-rollup")
+@click.option('--days', default=None, type=int, help='Only rebuild the last N days (default: all history).')
+def backfill_prediction_rollup_command(days):
+    """Rebuilds prediction_daily_rollup from prediction_records."""
+    with app.app_context():
+        start = None
+        if days:
+            start = datetime.combine(datetime.utcnow().date() - timedelta(days=days), time.min)
+        processed = prediction_rollups.backfill(start=start)
+    click.echo(f"Backfilled {processed} day(s) of prediction rollups.")
+
+# --- System Health Storage ---
+health_store = HealthMetricStore(db, SystemHealth, SystemHealthCurrent, SystemHealthStatusCount)
+health_retention = HealthRetention(
+    db, SystemHealth, SystemHealthRollup, health_store,
+    raw_days=int(os.getenv('HEALTH_RAW_RETENTION_DAYS', 7)),
+    hourly_days=int(os.getenv('HEALTH_HOURLY_RETENTION_DAYS', 90)),
+    batch_size=int(os.getenv('HEALTH_RETENTION_BATCH_SIZE', 5000))
+)
+
+def apply_health_retention():
+    with app.app_context():
+        try:
+            health_retention.run()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error applying system health retention: {str(e)}")
+
+# --- Doctor Utilization ---
+UTILIZATION_DAYS_BACK = int(os.getenv('UTILIZATION_DAYS_BACK', 7))
+UTILIZATION_DAYS_AHEAD = int(os.getenv('UTILIZATION_DAYS_AHEAD', 30))
+
+def refresh_doctor_utilization():
+    with app.app_context():
+        try:
+            today = datetime.now().date()
+            appointment_stats.refresh_available(today - timedelta(days=UTILIZATION_DAYS_BACK),
+                                                today + timedelta(days=UTILIZATION_DAYS_AHEAD))
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error refreshing doctor utilization: {str(e)}")
+
+@app.cli.command("rebuild-appointment-counters")
+def rebuild_appointment_counters_command():
+    """Recomputes the per-doctor appointment counters and booked slots from appointments."""
+    with app.app_context():
+        doctors = appointment_stats.rebuild()
+    click.echo(f"Rebuilt appointment counters for {doctors} doctor(s).")
 
 # --- Admin Dashboard Enhanced Routes ---
+def filter_users(query, search):
+    if search:
+        search = f"%{search}%"
+        query = query.filter(
+            db.or_(
+                User.email.ilike(search),
+                User.full_name.ilike(search),
+                User.phone_number.ilike(search)
+            )
+        )
+    return query
+
+def filter_user_activities(query, args):
+    user_id = args.get('user_id', type=int)
+    activity_type = args.get('activity_type')
+    if user_id:
+        query = query.filter_by(user_id=user_id)
+    if activity_type:
+        query = query.filter_by(activity_type=activity_type)
+    return query
+
+def filter_admin_activity_logs(query, args):
+    admin_id = args.get('admin_id', type=int)
+    action_type = args.get('action_type')
+    if admin_id:
+        query = query.filter_by(admin_id=admin_id)
+    if action_type:
+        query = query.filter_by(action_type=action_type)
+    return query
+
+def filter_predictions(query, args):
+    user_id = args.get('user_id', type=int)
+    date_from = args.get('from')
+    date_to = args.get('to')
+    if user_id:
+        query = query.filter(PredictionRecord.user_id == user_id)
+    try:
+        if date_from:
+            query = query.filter(PredictionRecord.prediction_date >= datetime.strptime(date_from, '%Y-%m-%d'))
+        if date_to:
+            query = query.filter(PredictionRecord.prediction_date < datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        raise ValidationError('Invalid date format. Use YYYY-MM-DD')
+    return query
+
 @app.route('/api/admin/user-activities', methods=['GET'])
 @admin_required
 def get_user_activities_route():
+    after = USER_ACTIVITY_CURSOR.parse(request.args)
+    count_mode = parse_count_mode()
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
-        user_id = request.args.get('user_id', type=int)
-        activity_type = request.args.get('activity_type')
-        
-        query = UserActivity.query
-        if user_id:
-            query = query.filter_by(user_id=user_id)
-        if activity_type:
-            query = query.filter_by(activity_type=activity_type)
-            
-        pagination = query.order_by(UserActivity.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        query = filter_user_activities(UserActivity.query, request.args)
+        if after is not None:
+            keyset = USER_ACTIVITY_CURSOR.page(query, after, cursor_page_size(per_page), with_total=wants_total())
+            result = {
+                'success': True,
+                'activities': [activity.to_dict() for activity in keyset.items],
+                'next_cursor': keyset.next_cursor,
+                'has_next': keyset.has_next
+            }
+            if keyset.total is not None:
+                result['total'] = keyset.total
+            return jsonify(result)
+        pagination = row_counter.paginate(
+            query.order_by(UserActivity.created_at.desc()), UserActivity.__tablename__, page, per_page, count_mode
         )
-        
-        return jsonify({
-            'success': True,
-            'activities': [activity.to_dict() for activity in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': pagination.page
-        })
+        return counted_page_response('activities', [activity.to_dict() for activity in pagination.items], pagination)
     except Exception as e:
         app.logger.error(f"Error fetching user activities: {str(e)}")
         return jsonify({'error': 'Failed to fetch user activities'}), 500
@@ -1305,57 +1836,138 @@ def get_user_activities_route():
 @admin_required
 def get_system_health_route():
     try:
-        # Get latest metrics for each type
-        metrics = {}
-        for metric_name in ['cpu_usage', 'memory_usage', 'disk_usage', 'active_users']:
-            latest = SystemHealth.query.filter_by(metric_name=metric_name)\
-                .order_by(SystemHealth.recorded_at.desc())\
-                .first()
-            if latest:
-                metrics[metric_name] = latest.to_dict()
-        
-        # Get system status summary
-        status_summary = {
-            'healthy': SystemHealth.query.filter_by(status='healthy').count(),
-            'warning': SystemHealth.query.filter_by(status='warning').count(),
-            'critical': SystemHealth.query.filter_by(status='critical').count()
-        }
+        # Latest samples come from this worker's collector; the read model covers a cold buffer
+        metrics = metrics_collector.latest() or health_store.latest()
+        status_summary = health_store.status_summary()
         
         return jsonify({
             'success': True,
             'metrics': metrics,
-            'status_summary': status_summary
+            'status_summary': status_summary,
+            'recent': metrics_collector.recent(
+                request.args.get('metric'), limit=min(request.args.get('limit', 100, type=int), 1000)
+            ),
+            'collector': metrics_collector.stats()
         })
     except Exception as e:
         app.logger.error(f"Error fetching system health: {str(e)}")
         return jsonify({'error': 'Failed to fetch system health'}), 500
 
+def parse_iso_datetime(value, name):
+    """Naive UTC datetime from an ISO 8601 timestamp; offsets are converted, naive values taken as UTC"""
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+        return moment
+    except ValueError:
+        raise ValidationError(f"Invalid {name} timestamp", payload={'value': value})
+
+@app.route('/api/admin/system-health/history', methods=['GET'])
+@admin_required
+def get_system_health_history_route():
+    metric = request.args.get('metric')
+    if not metric:
+        raise ValidationError("metric is required")
+    end = request.args.get('to')
+    end = parse_iso_datetime(end, 'to') if end else datetime.utcnow()
+    start = request.args.get('from')
+    start = parse_iso_datetime(start, 'from') if start else end - timedelta(days=1)
+    if start >= end:
+        raise ValidationError("from must be earlier than to")
+    resolution = request.args.get('resolution')
+    if resolution and resolution not in RESOLUTIONS:
+        raise ValidationError("Invalid resolution", payload={'allowed': list(RESOLUTIONS)})
+    try:
+        # Resolution follows the requested span unless explicitly overridden
+        resolution, points = health_retention.series(metric, start, end, resolution)
+        return jsonify({
+            'success': True,
+            'metric': metric,
+            'resolution': resolution,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'points': points
+        })
+    except Exception as e:
+        app.logger.error(f"Error fetching system health history: {str(e)}")
+        return jsonify({'error': 'Failed to fetch system health history'}), 500
+
+UTILIZATION_RANGE_MAX_DAYS = 92
+
+@app.route('/api/admin/doctor-utilization', methods=['GET'])
+@admin_required
+def get_doctor_utilization_route():
+    try:
+        today = datetime.now().date()
+        end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else today
+        start = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') \
+            else end - timedelta(days=27)
+    except ValueError:
+        raise ValidationError('Invalid date format. Use YYYY-MM-DD')
+    if not 0 <= (end - start).days < UTILIZATION_RANGE_MAX_DAYS:
+        raise ValidationError(f'from must not be after to, and the range is limited to {UTILIZATION_RANGE_MAX_DAYS} days')
+    specialization = request.args.get('specialization', '').strip()
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    try:
+        # Reads only the rollup: one row per doctor and day, aligned to `days` below
+        query = db.session.query(
+            DoctorDailyUtilization.doctor_id, DoctorDailyUtilization.day,
+            DoctorDailyUtilization.booked_slots, DoctorDailyUtilization.available_slots
+        ).filter(DoctorDailyUtilization.day.between(start, end))
+        if specialization:
+            query = query.join(Doctor, Doctor.id == DoctorDailyUtilization.doctor_id)\
+                .filter(Doctor.specialization == specialization)
+        days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        column = {day: index for index, day in enumerate(days)}
+        rows = {}
+        for doctor_id, day, booked, available in query.all():
+            row = rows.setdefault(doctor_id, {'booked': [0] * len(days), 'available': [0] * len(days)})
+            row['booked'][column[day]] = booked
+            row['available'][column[day]] = available
+        busiest = heapq.nlargest(limit, rows, key=lambda doctor_id: sum(rows[doctor_id]['booked']))
+        names = dict(db.session.query(Doctor.id, Doctor.fullName).filter(Doctor.id.in_(busiest)).all())
+        return jsonify({
+            'success': True,
+            'days': [day.isoformat() for day in days],
+            'doctors': [{
+                'id': doctor_id,
+                'name': names.get(doctor_id),
+                'booked': rows[doctor_id]['booked'],
+                'available': rows[doctor_id]['available'],
+                'utilization': [round(booked / available, 3) if available else None
+                                for booked, available in zip(rows[doctor_id]['booked'], rows[doctor_id]['available'])]
+            } for doctor_id in busiest],
+            'doctors_total': len(rows)
+        })
+    except Exception as e:
+        app.logger.error(f"Error fetching doctor utilization: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to fetch doctor utilization'}), 500
+
 @app.route('/api/admin/activity-logs', methods=['GET'])
 @admin_required
 def get_admin_activity_logs_route():
+    after = ADMIN_LOG_CURSOR.parse(request.args)
+    count_mode = parse_count_mode()
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
-        admin_id = request.args.get('admin_id', type=int)
-        action_type = request.args.get('action_type')
-        
-        query = AdminActivityLog.query
-        if admin_id:
-            query = query.filter_by(admin_id=admin_id)
-        if action_type:
-            query = query.filter_by(action_type=action_type)
-            
-        pagination = query.order_by(AdminActivityLog.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        query = filter_admin_activity_logs(AdminActivityLog.query, request.args)
+        if after is not None:
+            keyset = ADMIN_LOG_CURSOR.page(query, after, cursor_page_size(per_page), with_total=wants_total())
+            result = {
+                'success': True,
+                'logs': [log.to_dict() for log in keyset.items],
+                'next_cursor': keyset.next_cursor,
+                'has_next': keyset.has_next
+            }
+            if keyset.total is not None:
+                result['total'] = keyset.total
+            return jsonify(result)
+        pagination = row_counter.paginate(
+            query.order_by(AdminActivityLog.created_at.desc()), AdminActivityLog.__tablename__, page, per_page, count_mode
         )
-        
-        return jsonify({
-            'success': True,
-            'logs': [log.to_dict() for log in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': pagination.page
-        })
+        return counted_page_response('logs', [log.to_dict() for log in pagination.items], pagination)
     except Exception as e:
         app.logger.error(f"Error fetching admin activity logs: {str(e)}")
         return jsonify({'error': 'Failed to fetch admin activity logs'}), 500
@@ -1389,6 +2001,42 @@ def bulk_user_management_route():
         app.logger.error(f"Error in bulk user management: {str(e)}")
         return jsonify({'error': 'Failed to process bulk user action'}), 500
 
+# --- Admin Dataset Exports (streamed NDJSON/CSV) ---
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+def export_dataset(query, fieldset, default_fields, name):
+    fields = fieldset.parse(request.args.get('fields')) or default_fields
+    export_format = request.args.get('format', 'ndjson')
+    response = stream_export(query, fieldset, fields, export_format, name, batch_size=EXPORT_BATCH_SIZE)
+    log_admin_activity(session['admin_id'], 'export', f'Exported {name} as {export_format}')
+    return response
+
+@app.route('/api/admin/users/export', methods=['GET'])
+@admin_required
+def export_users_route():
+    query = filter_users(User.query, request.args.get('search', '')).order_by(User.id)
+    # healthScore needs a query per user, so it is only exported when asked for explicitly
+    return export_dataset(query, USER_FIELDS, list(USER_FIELDS.columns), 'users')
+
+@app.route('/api/admin/predictions/export', methods=['GET'])
+@admin_required
+def export_predictions_route():
+    query = filter_predictions(PredictionRecord.query, request.args).order_by(PredictionRecord.id)
+    default_fields = list(PREDICTION_FIELDS.columns) + ['riskLevel', 'riskPercentage', 'inputFeatures']
+    return export_dataset(query, PREDICTION_FIELDS, default_fields, 'predictions')
+
+@app.route('/api/admin/user-activities/export', methods=['GET'])
+@admin_required
+def export_user_activities_route():
+    query = filter_user_activities(UserActivity.query, request.args).order_by(UserActivity.id)
+    return export_dataset(query, USER_ACTIVITY_FIELDS, USER_ACTIVITY_FIELDS.keys, 'user-activities')
+
+@app.route('/api/admin/activity-logs/export', methods=['GET'])
+@admin_required
+def export_admin_activity_logs_route():
+    query = filter_admin_activity_logs(AdminActivityLog.query, request.args).order_by(AdminActivityLog.id)
+    return export_dataset(query, ADMIN_LOG_FIELDS, ADMIN_LOG_FIELDS.keys, 'activity-logs')
+
 # Helper function to log admin activity
 def log_admin_activity(admin_id, action_type, action_details=None):
     try:
@@ -1418,72 +2066,107 @@ def log_user_activity(user_id, activity_type, activity_details=None):
     except Exception as e:
         app.logger.error(f"Error logging user activity: {str(e)}")
 
-# Helper function to update system health metrics
-def update_system_health_metrics():
+# Helper function to sample system health metrics
+def sample_system_health_metrics():
+    import psutil
+    samples = []
+    
+    # CPU Usage (since the previous sample, so no blocking interval)
+    cpu_usage = psutil.cpu_percent()
+    cpu_status = 'critical' if cpu_usage > 90 else 'warning' if cpu_usage > 70 else 'healthy'
+    samples.append({
+        'metric_name': 'cpu_usage',
+        'metric_value': cpu_usage,
+        'status': cpu_status,
+        'details': f'CPU usage at {cpu_usage}%'
+    })
+    
+    # Memory Usage
+    memory = psutil.virtual_memory()
+    memory_usage = memory.percent
+    memory_status = 'critical' if memory_usage > 90 else 'warning' if memory_usage > 70 else 'healthy'
+    samples.append({
+        'metric_name': 'memory_usage',
+        'metric_value': memory_usage,
+        'status': memory_status,
+        'details': f'Memory usage at {memory_usage}%'
+    })
+    
+    # Disk Usage
+    disk = psutil.disk_usage('/')
+    disk_usage = disk.percent
+    disk_status = 'critical' if disk_usage > 90 else 'warning' if disk_usage > 70 else 'healthy'
+    samples.append({
+        'metric_name': 'disk_usage',
+        'metric_value': disk_usage,
+        'status': disk_status,
+        'details': f'Disk usage at {disk_usage}%'
+    })
+    
+    # Active Users (last 15 minutes)
+    active_users = db.session.query(db.func.count(db.distinct(UserActivity.user_id))).filter(
+        UserActivity.created_at >= datetime.utcnow() - timedelta(minutes=15)
+    ).scalar()
+    
+    samples.append({
+        'metric_name': 'active_users',
+        'metric_value': active_users,
+        'status': 'healthy',
+        'details': f'{active_users} active users in last 15 minutes'
+    })
+    return samples
+
+HEALTH_SAMPLE_SECONDS = int(os.getenv('HEALTH_SAMPLE_SECONDS', 15))
+HEALTH_FLUSH_SECONDS = int(os.getenv('HEALTH_FLUSH_SECONDS', 300))
+metrics_collector = MetricsCollector(
+    sample_system_health_metrics, health_store,
+    capacity=int(os.getenv('HEALTH_BUFFER_SIZE', 1000))
+)
+
+def collect_system_health_metrics():
     with app.app_context():
         try:
-            import psutil
-            
-            # CPU Usage
-            cpu_usage = psutil.cpu_percent()
-            cpu_status = 'critical' if cpu_usage > 90 else 'warning' if cpu_usage > 70 else 'healthy'
-            SystemHealth(
-                metric_name='cpu_usage',
-                metric_value=cpu_usage,
-                status=cpu_status,
-                details=f'CPU usage at {cpu_usage}%'
-            )
-            
-            # Memory Usage
-            memory = psutil.virtual_memory()
-            memory_usage = memory.percent
-            memory_status = 'critical' if memory_usage > 90 else 'warning' if memory_usage > 70 else 'healthy'
-            SystemHealth(
-                metric_name='memory_usage',
-                metric_value=memory_usage,
-                status=memory_status,
-                details=f'Memory usage at {memory_usage}%'
-            )
-            
-            # Disk Usage
-            disk = psutil.disk_usage('/')
-            disk_usage = disk.percent
-            disk_status = 'critical' if disk_usage > 90 else 'warning' if disk_usage > 70 else 'healthy'
-            SystemHealth(
-                metric_name='disk_usage',
-                metric_value=disk_usage,
-                status=disk_status,
-                details=f'Disk usage at {disk_usage}%'
-            )
-            
-            # Active Users (last 15 minutes)
-            active_users = UserActivity.query.filter(
-                UserActivity.created_at >= datetime.utcnow() - timedelta(minutes=15)
-            ).distinct(UserActivity.user_id).count()
-            
-            SystemHealth(
-                metric_name='active_users',
-                metric_value=active_users,
-                status='healthy',
-                details=f'{active_users} active users in last 15 minutes'
-            )
-            
-            db.session.commit()
+            metrics_collector.sample()
         except Exception as e:
-            app.logger.error(f"Error updating system health metrics: {str(e)}")
-            if 'db' in locals():
-                db.session.rollback()
+            app.logger.error(f"Error sampling system health metrics: {str(e)}")
+            db.session.rollback()
+
+def flush_system_health_metrics():
+    with app.app_context():
+        try:
+            # Raw history, latest-per-metric and status counters in one multi-row write
+            metrics_collector.flush()
+        except Exception as e:
+            app.logger.error(f"Error flushing system health metrics: {str(e)}")
+            db.session.rollback()
 
 # Schedule system health updates
 from apscheduler.schedulers.background import BackgroundScheduler
 scheduler = BackgroundScheduler()
-scheduler.add_job(update_system_health_metrics, 'interval', minutes=5)
+scheduler.add_job(collect_system_health_metrics, 'interval', seconds=HEALTH_SAMPLE_SECONDS)
+scheduler.add_job(flush_system_health_metrics, 'interval', seconds=HEALTH_FLUSH_SECONDS)
+scheduler.add_job(database_probe.check, 'interval', seconds=DB_PROBE_INTERVAL_SECONDS)
+scheduler.add_job(refresh_prediction_rollup, 'interval', minutes=int(os.getenv('ROLLUP_REFRESH_MINUTES', 10)))
+scheduler.add_job(apply_health_retention, 'interval', minutes=int(os.getenv('HEALTH_RETENTION_INTERVAL_MINUTES', 60)))
+scheduler.add_job(refresh_doctor_directory, 'interval', seconds=int(os.getenv('DOCTOR_DIRECTORY_CHECK_SECONDS', 30)))
+scheduler.add_job(refresh_doctor_utilization, 'interval', minutes=int(os.getenv('UTILIZATION_REFRESH_MINUTES', 60)))
 scheduler.start()
 
+@app.route('/api/admin/db/pool', methods=['GET'])
+@admin_required
+def get_db_pool_metrics_route():
+    try:
+        return jsonify({'success': True, 'pool': pool_metrics.snapshot(db.engine.pool)})
+    except Exception as e:
+        app.logger.error(f"Error fetching pool metrics: {str(e)}")
+        return jsonify({'error': 'Failed to fetch pool metrics'}), 500
+
 # --- Admin User Management Routes ---
 @app.route('/api/admin/users', methods=['GET'])
 @admin_required
 def get_users_route():
+    fields = USER_FIELDS.parse(request.args.get('fields'))
+    count_mode = parse_count_mode()
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
@@ -1491,18 +2174,7 @@ def get_users_route():
         sort_by = request.args.get('sort_by', 'created_at')
         sort_order = request.args.get('sort_order', 'desc')
         
-        query = User.query
-        
-        # Search functionality
-        if search:
-            search = f"%{search}%"
-            query = query.filter(
-                db.or_(
-                    User.email.ilike(search),
-                    User.full_name.ilike(search),
-                    User.phone_number.ilike(search)
-                )
-            )
+        query = filter_users(USER_FIELDS.apply(User.query, fields), search)
         
         # Sorting
         if sort_by in ['email', 'full_name', 'created_at', 'last_checkup']:
@@ -1513,15 +2185,8 @@ def get_users_route():
                 query = query.order_by(sort_column.asc())
         
         # Pagination
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        return jsonify({
-            'success': True,
-            'users': [user.to_dict() for user in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': pagination.page
-        })
+        pagination = row_counter.paginate(query, User.__tablename__, page, per_page, count_mode)
+        return counted_page_response('users', USER_FIELDS.dump(pagination.items, fields), pagination)
     except Exception as e:
         app.logger.error(f"Error fetching users: {str(e)}")
         return jsonify({'error': 'Failed to fetch users'}), 500
@@ -1562,73 +2227,72 @@ def get_user_details_route(user_id):
 @admin_required
 def get_dashboard_analytics_route():
     try:
-        # Get total users
-        total_users = User.query.count()
-        
-        # Get new users in last 30 days
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        new_users = User.query.filter(User.created_at >= thirty_days_ago).count()
-        
-        # Get total predictions
-        total_predictions = PredictionRecord.query.count()
-        
-        # Get predictions in last 30 days
-        recent_predictions = PredictionRecord.query.filter(
-            PredictionRecord.prediction_date >= thirty_days_ago
-        ).count()
-        
-        # Get risk level distribution using simpler queries
-        high_risk = PredictionRecord.query.filter(
-            PredictionRecord.probability_score >= 0.7
-        ).count()
-        
-        medium_risk = PredictionRecord.query.filter(
-            PredictionRecord.probability_score >= 0.4,
-            PredictionRecord.probability_score < 0.7
-        ).count()
-        
-        low_risk = PredictionRecord.query.filter(
-            PredictionRecord.probability_score < 0.4
-        ).count()
-        
+        timings = {}
+
+        def timed(label, run):
+            started = perf_counter()
+            result = run()
+            timings[label] = round((perf_counter() - started) * 1000, 2)
+            return result
+
+        # Prediction totals, recent activity and risk bands in one pass (COUNT ... FILTER)
+        recent_prediction = PredictionRecord.prediction_date >= thirty_days_ago
+        (total_predictions, recent_predictions, high_risk, medium_risk,
+         low_risk, active_users) = timed('predictions', lambda: db.session.query(
+            db.func.count(PredictionRecord.id),
+            db.func.count(PredictionRecord.id).filter(recent_prediction),
+            db.func.count(PredictionRecord.id).filter(PredictionRecord.probability_score >= 0.7),
+            db.func.count(PredictionRecord.id).filter(
+                PredictionRecord.probability_score >= 0.4,
+                PredictionRecord.probability_score < 0.7
+            ),
+            db.func.count(PredictionRecord.id).filter(PredictionRecord.probability_score < 0.4),
+            # Active users: users with predictions in last 30 days
+            db.func.count(db.distinct(PredictionRecord.user_id)).filter(recent_prediction)
+        ).one())
+
         risk_distribution = {
             'high': high_risk,
             'medium': medium_risk,
             'low': low_risk
         }
-        
-        # Get active users (users with predictions in last 30 days)
-        active_users = db.session.query(PredictionRecord.user_id)\
-            .filter(PredictionRecord.prediction_date >= thirty_days_ago)\
-            .group_by(PredictionRecord.user_id)\
-            .count()
 
-        # Get doctor statistics
-        total_doctors = Doctor.query.count()
-        new_doctors = Doctor.query.filter(Doctor.created_at >= thirty_days_ago).count()
-        
-        # Get doctor specializations distribution
-        specializations = db.session.query(
+        total_users, new_users = timed('users', lambda: db.session.query(
+            db.func.count(User.id),
+            db.func.count(User.id).filter(User.created_at >= thirty_days_ago)
+        ).one())
+
+        # Doctor totals are summed from the per-specialization counts
+        specializations = timed('doctors', lambda: db.session.query(
             Doctor.specialization,
-            db.func.count(Doctor.id).label('count')
-        ).group_by(Doctor.specialization).all()
-        
+            db.func.count(Doctor.id),
+            db.func.count(Doctor.id).filter(Doctor.created_at >= thirty_days_ago)
+        ).group_by(Doctor.specialization).all())
+
         specialization_distribution = {
-            spec: count for spec, count in specializations
+            spec: count for spec, count, _ in specializations
         }
+        total_doctors = sum(count for _, count, _ in specializations)
+        new_doctors = sum(new for _, _, new in specializations)
         
         # Get top rated doctors
-        top_doctors = Doctor.query.order_by(Doctor.rating.desc()).limit(5).all()
+        top_doctors = timed('top_doctors', lambda: Doctor.query.options(load_only(
+            Doctor.id, Doctor.fullName, Doctor.specialization, Doctor.rating, Doctor.totalAppointments
+        )).order_by(Doctor.rating.desc()).limit(5).all())
+        appointment_counts = timed('top_doctor_appointments',
+                                   lambda: appointment_stats.counts([doc.id for doc in top_doctors]))
         top_doctors_list = [{
             'id': doc.id,
             'name': doc.fullName,
             'specialization': doc.specialization,
             'rating': doc.rating,
-            'totalAppointments': doc.totalAppointments
+            'totalAppointments': doc.totalAppointments,
+            'appointments': appointment_counts[doc.id]
         } for doc in top_doctors]
         
         # Get system health metrics with default values
-        latest_health = SystemHealth.query.order_by(SystemHealth.recorded_at.desc()).first()
+        latest_health = timed('system_health', lambda: SystemHealth.query.order_by(SystemHealth.recorded_at.desc()).first())
         system_health = {
             'metricName': 'system_status',
             'metricValue': 100,
@@ -1636,7 +2300,7 @@ def get_dashboard_analytics_route():
             'details': 'System is running normally'
         } if not latest_health else latest_health.to_dict()
         
-        return jsonify({
+        response = {
             'success': True,
             'analytics': {
                 'users': {
@@ -1657,7 +2321,10 @@ def get_dashboard_analytics_route():
                 },
                 'system_health': system_health
             }
-        })
+        }
+        if app.debug:
+            response['timings_ms'] = timings
+        return jsonify(response)
     except Exception as e:
         app.logger.error(f"Error fetching dashboard analytics: {str(e)}", exc_info=True)
         # Return a default response structure even in case of error
@@ -1697,34 +2364,23 @@ def get_dashboard_analytics_route():
 @admin_required
 def get_prediction_analytics_route():
     try:
-        # Get predictions over time (last 30 days)
+        # Closed days come from the rollup table; today is aggregated live
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        daily_predictions = db.session.query(
-            db.func.date(PredictionRecord.prediction_date).label('date'),
-            db.func.count(PredictionRecord.id).label('count')
-        ).filter(
-            PredictionRecord.prediction_date >= thirty_days_ago
-        ).group_by('date').all()
-        
-        # Get average risk score over time
-        daily_risk_scores = db.session.query(
-            db.func.date(PredictionRecord.prediction_date).label('date'),
-            db.func.avg(PredictionRecord.probability_score).label('avg_risk')
-        ).filter(
-            PredictionRecord.prediction_date >= thirty_days_ago
-        ).group_by('date').all()
+        daily = prediction_rollups.daily_series(thirty_days_ago)
         
         return jsonify({
             'success': True,
             'analytics': {
                 'daily_predictions': [
-                    {'date': str(date), 'count': count}
-                    for date, count in daily_predictions
+                    {'date': row['day'], 'count': row['prediction_count']}
+                    for row in daily
                 ],
                 'daily_risk_scores': [
-                    {'date': str(date), 'avg_risk': float(avg_risk) if avg_risk else 0}
-                    for date, avg_risk in daily_risk_scores
-                ]
+                    {'date': row['day'],
+                     'avg_risk': row['probability_sum'] / row['probability_count'] if row['probability_count'] else 0}
+                    for row in daily
+                ],
+                'daily_breakdown': daily
             }
         })
     except Exception as e:
@@ -1739,8 +2395,9 @@ def get_detailed_system_health_route():
         import psutil
         
         # CPU Information
+        cpu_usage = metrics_collector.latest_value('cpu_usage')
         cpu_info = {
-            'usage_percent': psutil.cpu_percent(interval=1),
+            'usage_percent': cpu_usage if cpu_usage is not None else psutil.cpu_percent(interval=1),
             'count': psutil.cpu_count(),
             'frequency': psutil.cpu_freq()._asdict() if psutil.cpu_freq() else None
         }
@@ -1773,12 +2430,7 @@ def get_detailed_system_health_route():
         }
         
         # Database Connection Status
-        try:
-            db.engine.connect()
-            db_status = 'healthy'
-        except Exception as e:
-            db_status = 'error'
-            app.logger.error(f"Database connection error: {str(e)}")
+        db_status = 'healthy' if database_probe.check() else 'error'
         
         # Application Metrics
         app_metrics = {
@@ -1840,6 +2492,7 @@ def get_system_logs_route():
 @app.route('/api/admin/doctors', methods=['GET'])
 @admin_required
 def get_doctors_route():
+    fields = DOCTOR_FIELDS.parse(request.args.get('fields'))
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
@@ -1866,18 +2519,19 @@ def get_doctors_route():
                 'details': str(table_error)
             }), 500
         
-        query = Doctor.query
+        query = DOCTOR_FIELDS.apply(Doctor.query, fields)
         
-        # Search functionality
+        # Search functionality (trigram-indexed), best matches first when pg_trgm is installed
         if search:
-            search = f"%{search}%"
             query = query.filter(
                 db.or_(
-                    Doctor.fullName.ilike(search),
-                    Doctor.email.ilike(search),
-                    Doctor.hospital.ilike(search)
+                    contains(Doctor.fullName, search),
+                    contains(Doctor.email, search),
+                    contains(Doctor.hospital, search)
                 )
             )
+            if trigram_ranking_enabled():
+                query = query.order_by(rank(search, Doctor.fullName, Doctor.email, Doctor.hospital).desc(), Doctor.id)
         
         # Filter by specialization
         if specialization:
@@ -1906,7 +2560,7 @@ def get_doctors_route():
             doctors_list = []
             for doctor in paginated_doctors.items:
                 try:
-                    doctor_dict = doctor.to_dict()
+                    doctor_dict = doctor.to_dict() if fields is None else DOCTOR_FIELDS.serialize(doctor, fields)
                     doctors_list.append(doctor_dict)
                 except Exception as dict_error:
                     app.logger.error(f"Error converting doctor {doctor.id} to dict: {str(dict_error)}", exc_info=True)
@@ -2090,7 +2744,9 @@ def delete_doctor_route(doctor_id):
 
 # --- Doctor Search and Recommendation Routes ---
 @app.route('/api/doctors/search', methods=['GET'])
+@conditional_get(doctor_directory_version, max_age=PUBLIC_CACHE_MAX_AGE)
 def search_doctors():
+    fields = DOCTOR_FIELDS.parse(request.args.get('fields'))
     try:
         city = request.args.get('city', '').strip()
         area = request.args.get('area', '').strip()
@@ -2106,47 +2762,41 @@ def search_doctors():
                 'error': 'City is required'
             }), 400
 
-        # Base query with case-insensitive search
-        query = Doctor.query.filter(Doctor.city.ilike(f'%{city}%'))
-        
-        # Add area filter if provided
-        if area:
-            query = query.filter(Doctor.area.ilike(f'%{area}%'))
-
-        # Add specialization filter if provided
-        if specialization:
-            query = query.filter(Doctor.specialization.ilike(f'%{specialization}%'))
+        if DOCTOR_SEARCH_BACKEND != 'memory':
+            query = doctor_search_query(DOCTOR_FIELDS.apply(Doctor.query, fields), city, area, specialization)
+            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            return jsonify({
+                'success': True,
+                'doctors': DOCTOR_FIELDS.dump(pagination.items, fields),
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'current_page': pagination.page,
+                'has_next': pagination.has_next,
+                'has_prev': pagination.has_prev
+            })
 
-        # Get total count before pagination
-        total_count = query.count()
+        # Case- and accent-insensitive substring match against the in-memory directory
+        matches = doctor_directory.search(city, area, specialization)
+        total_count = len(matches)
         app.logger.info(f"Total doctors found: {total_count}")
 
-        # Paginate the results
-        paginated_doctors = query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        if not paginated_doctors.items and page > 1:
+        per_page = max(per_page, 1)
+        pages = math.ceil(total_count / per_page)
+        if page < 1 or (page > pages and page > 1):
             # If no items found on requested page, return to page 1
-            paginated_doctors = query.paginate(page=1, per_page=per_page, error_out=False)
             page = 1
-
-        # Convert doctors to dict format
-        doctors_list = []
-        for doctor in paginated_doctors.items:
-            try:
-                doctor_dict = doctor.to_dict()
-                doctors_list.append(doctor_dict)
-            except Exception as dict_error:
-                app.logger.error(f"Error converting doctor {doctor.id} to dict: {str(dict_error)}")
-                continue
+        page_items = matches[(page - 1) * per_page:page * per_page]
+        if fields is not None:
+            page_items = [{key: doctor[key] for key in fields} for doctor in page_items]
 
         return jsonify({
             'success': True,
-            'doctors': doctors_list,
+            'doctors': page_items,
             'total': total_count,
-            'pages': paginated_doctors.pages,
+            'pages': pages,
             'current_page': page,
-            'has_next': paginated_doctors.has_next,
-            'has_prev': paginated_doctors.has_prev
+            'has_next': page < pages,
+            'has_prev': page > 1
         })
 
     except Exception as e:
@@ -2157,6 +2807,64 @@ def search_doctors():
             'details': str(e)
         }), 500
 
+def doctor_relevance(doctor, risk_level, city, area, specialization):
+    """Relevance of a directory entry for a patient's risk level and location"""
+    relevance_score = 0
+    experience = doctor['experience'] or 0
+    
+    # Experience factor (0-3 points)
+    if risk_level == 'high':
+        if experience >= 10:
+            relevance_score += 3
+        elif experience >= 5:
+            relevance_score += 2
+        elif experience >= 2:
+            relevance_score += 1
+    elif risk_level == 'medium':
+        if experience >= 5:
+            relevance_score += 2
+        elif experience >= 2:
+            relevance_score += 1
+    else:  # low risk
+        if experience >= 2:
+            relevance_score += 1
+    
+    # Rating factor (0-2 points)
+    relevance_score += min(float(doctor['rating'] or 0), 5) * 0.4
+    
+    # Reviews factor (0-1 point)
+    relevance_score += min(int(doctor['reviews'] or 0) / 50, 1)
+    
+    # Specialization match factor (0-2 points)
+    if specialization and normalize_text(specialization) in normalize_text(doctor['specialization']):
+        relevance_score += 2
+    
+    # Location match factor (0-2 points)
+    if area and normalize_text(area) in normalize_text(doctor['area']):
+        relevance_score += 2
+    elif normalize_text(city) in normalize_text(doctor['city']):
+        relevance_score += 1
+    return relevance_score
+
+def doctor_relevance_sql(risk_level, city, area, specialization):
+    """SQL expression computing the same score as doctor_relevance"""
+    experience = db.func.coalesce(Doctor.experience, 0)
+    if risk_level == 'high':
+        tiers = [(experience >= 10, 3), (experience >= 5, 2), (experience >= 2, 1)]
+    elif risk_level == 'medium':
+        tiers = [(experience >= 5, 2), (experience >= 2, 1)]
+    else:  # low risk
+        tiers = [(experience >= 2, 1)]
+    score = db.case(*tiers, else_=0)
+    score = score + db.func.least(db.func.coalesce(Doctor.rating, 0), 5) * 0.4
+    score = score + db.func.least(db.func.coalesce(Doctor.reviews, 0) / 50.0, 1)
+    if specialization:
+        score = score + db.case((contains(Doctor.specialization, specialization), 2), else_=0)
+    location = [(contains(Doctor.city, city), 1)]
+    if area:
+        location.insert(0, (contains(Doctor.area, area), 2))
+    return score + db.case(*location, else_=0)
+
 @app.route('/api/doctors/suggest', methods=['GET'])
 def suggest_doctors_route():
     try:
@@ -2170,6 +2878,10 @@ def suggest_doctors_route():
         area = request.args.get('area', '').strip()
         specialization = request.args.get('specialization', '').strip()
         
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), 50)
+        offset = (page - 1) * per_page
+        
         app.logger.info(f"Parsed parameters - Risk: {risk_level}, City: {city}, Area: {area}, Specialization: {specialization}")
         
         # Validate required parameters
@@ -2181,109 +2893,38 @@ def suggest_doctors_route():
             }), 400
 
         try:
-            # Base query with case-insensitive search
-            query = Doctor.query.filter(Doctor.city.ilike(f'%{city}%'))
-            
-            # Add area filter if provided
-            if area:
-                query = query.filter(Doctor.area.ilike(f'%{area}%'))
-            
-            # Filter by specialization if provided
-            if specialization:
-                query = query.filter(Doctor.specialization.ilike(f'%{specialization}%'))
-            
-            # Get all matching doctors
-            doctors = query.all()
-            app.logger.info(f"Found {len(doctors)} doctors matching criteria")
-            
-            if not doctors:
-                app.logger.info("No doctors found matching criteria")
-                return jsonify({
-                    'success': True,
-                    'doctors': [],
-                    'message': 'No doctors found matching your criteria'
-                })
-            
-            # Calculate relevance score for each doctor
-            suggested_doctors = []
-            for doctor in doctors:
-                try:
-                    app.logger.info(f"Processing doctor {doctor.id}: {doctor.fullName}")
-                    
-                    # Get doctor dictionary with safe defaults
-                    doctor_dict = doctor.to_dict()
-                    if not doctor_dict:
-                        app.logger.warning(f"Doctor {doctor.id} returned empty dictionary")
-                        continue
-                    
-                    # Calculate a relevance score based on multiple factors
-                    relevance_score = 0
-                    
-                    # Experience factor (0-3 points)
-                    try:
-                        if risk_level == 'high':
-                            if doctor.experience >= 10:
-                                relevance_score += 3
-                            elif doctor.experience >= 5:
-                                relevance_score += 2
-                            elif doctor.experience >= 2:
-                                relevance_score += 1
-                        elif risk_level == 'medium':
-                            if doctor.experience >= 5:
-                                relevance_score += 2
-                            elif doctor.experience >= 2:
-                                relevance_score += 1
-                        else:  # low risk
-                            if doctor.experience >= 2:
-                                relevance_score += 1
-                    except Exception as exp_error:
-                        app.logger.error(f"Error calculating experience score for doctor {doctor.id}: {str(exp_error)}")
-                    
-                    # Rating factor (0-2 points)
-                    try:
-                        relevance_score += min(float(doctor.rating or 0), 5) * 0.4
-                    except Exception as rating_error:
-                        app.logger.error(f"Error calculating rating score for doctor {doctor.id}: {str(rating_error)}")
-                    
-                    # Reviews factor (0-1 point)
-                    try:
-                        relevance_score += min(int(doctor.reviews or 0) / 50, 1)
-                    except Exception as reviews_error:
-                        app.logger.error(f"Error calculating reviews score for doctor {doctor.id}: {str(reviews_error)}")
-                    
-                    # Specialization match factor (0-2 points)
-                    try:
-                        if specialization and specialization.lower() in doctor.specialization.lower():
-                            relevance_score += 2
-                    except Exception as spec_error:
-                        app.logger.error(f"Error calculating specialization score for doctor {doctor.id}: {str(spec_error)}")
-                    
-                    # Location match factor (0-2 points)
-                    try:
-                        if area and area.lower() in doctor.area.lower():
-                            relevance_score += 2
-                        elif city.lower() in doctor.city.lower():
-                            relevance_score += 1
-                    except Exception as loc_error:
-                        app.logger.error(f"Error calculating location score for doctor {doctor.id}: {str(loc_error)}")
-                    
-                    doctor_dict['relevance_score'] = round(relevance_score, 2)
-                    suggested_doctors.append(doctor_dict)
-                    app.logger.info(f"Successfully processed doctor {doctor.id} with relevance score {relevance_score}")
-                except Exception as dict_error:
-                    app.logger.error(f"Error processing doctor {doctor.id}: {str(dict_error)}", exc_info=True)
-                    continue
-            
-            # Sort by relevance score
-            suggested_doctors.sort(key=lambda x: -x['relevance_score'])
+            if DOCTOR_SEARCH_BACKEND == 'memory':
+                # Top k of the in-memory matches without sorting all of them
+                matches = doctor_directory.search(city, area, specialization)
+                total = len(matches)
+                scored = ((doctor_relevance(doctor, risk_level, city, area, specialization), doctor)
+                          for doctor in matches)
+                top = heapq.nlargest(offset + per_page, scored, key=lambda item: (item[0], -item[1]['id']))
+                suggested_doctors = [dict(doctor, relevance_score=round(score, 2))
+                                     for score, doctor in top[offset:]]
+            else:
+                # Score in SQL: ORDER BY score DESC LIMIT k, so cost follows k, not the match count
+                score = doctor_relevance_sql(risk_level, city, area, specialization).label('relevance_score')
+                query = doctor_search_query(Doctor.query, city, area, specialization)
+                total = query.order_by(None).count()
+                rows = query.add_columns(score).order_by(None).order_by(score.desc(), Doctor.id)\
+                    .offset(offset).limit(per_page).all()
+                suggested_doctors = [dict(doctor.to_dict(), relevance_score=round(float(relevance), 2))
+                                     for doctor, relevance in rows]
             
-            app.logger.info(f"Successfully processed {len(suggested_doctors)} doctors")
+            app.logger.info(f"Suggested {len(suggested_doctors)} of {total} matching doctors")
             
-            return jsonify({
+            response = {
                 'success': True,
                 'doctors': suggested_doctors,
-                'total': len(suggested_doctors)
-            })
+                'total': total,
+                'page': page,
+                'per_page': per_page,
+                'has_next': offset + per_page < total
+            }
+            if not total:
+                response['message'] = 'No doctors found matching your criteria'
+            return jsonify(response)
         except Exception as query_error:
             app.logger.error(f"Database query error: {str(query_error)}", exc_info=True)
             return jsonify({
@@ -2299,23 +2940,119 @@ def suggest_doctors_route():
             'details': str(e)
         }), 500
 
+def autocomplete_sql(field, prefix, limit):
+    """Distinct values with a word starting with ``prefix``, most doctors first.
+
+    Groups and matches on doctor_search_key() (see the add_doctor_search_key_indexes
+    migration), the SQL twin of normalize(), so results agree with the in-memory backend.
+    """
+    column = getattr(Doctor, field)
+    key = db.func.doctor_search_key(column)
+    doctor_count = db.func.count(Doctor.id)
+    # Most common spelling of each group, like PrefixIndex
+    spelling = db.func.mode().within_group(column)
+    query = db.session.query(spelling, doctor_count).filter(key != '')
+    term = escape_like(normalize_text(prefix))
+    if term:
+        query = query.filter(db.or_(
+            key.like(f'{term}%', escape='\\'), key.like(f'% {term}%', escape='\\')
+        ))
+    rows = query.group_by(key).order_by(doctor_count.desc(), spelling.desc()).limit(limit).all()
+    return [{'value': value, 'count': count} for value, count in rows]
+
+@app.route('/api/doctors/autocomplete', methods=['GET'])
+@conditional_get(doctor_directory_version, max_age=PUBLIC_CACHE_MAX_AGE)
+def autocomplete_doctors_route():
+    field = request.args.get('type', 'city')
+    if field not in AUTOCOMPLETE_FIELDS:
+        raise ValidationError('Invalid autocomplete type', payload={'allowed': list(AUTOCOMPLETE_FIELDS)})
+    prefix = request.args.get('q', '').strip()
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    try:
+        if DOCTOR_SEARCH_BACKEND == 'memory':
+            suggestions = doctor_directory.autocomplete(field, prefix, limit)
+        else:
+            suggestions = autocomplete_sql(field, prefix, limit)
+        return jsonify({'success': True, 'type': field, 'suggestions': suggestions})
+    except Exception as e:
+        app.logger.error(f"Error autocompleting doctors: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'error': 'Failed to autocomplete'}), 500
+
+def nearby_doctors_sql(lat, lng, k, radius_km):
+    """Bounding-box prefilter on the (latitude, longitude) index, then exact haversine order"""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = db.func.radians(Doctor.latitude), db.func.radians(Doctor.longitude)
+    # least(1, ...): rounding can push the haversine term just past 1 near antipodes
+    distance = (2 * EARTH_RADIUS_KM * db.func.asin(db.func.least(1.0, db.func.sqrt(
+        db.func.power(db.func.sin((lat2 - lat1) / 2), 2)
+        + math.cos(lat1) * db.func.cos(lat2) * db.func.power(db.func.sin((lng2 - lng1) / 2), 2)
+    )))).label('distance_km')
+    query = db.session.query(Doctor, distance).filter(Doctor.latitude.between(min_lat, max_lat))
+    if min_lng is not None:
+        query = query.filter(Doctor.longitude.between(min_lng, max_lng))
+    rows = query.filter(distance <= radius_km).order_by(distance, Doctor.id).limit(k).all()
+    return [dict(doctor.to_dict(), distance_km=round(float(km), 3)) for doctor, km in rows]
+
+@app.route('/api/doctors/nearby', methods=['GET'])
+def nearby_doctors_route():
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None or not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        raise ValidationError('lat and lng are required and must be valid coordinates')
+    radius = request.args.get('radius', 25.0, type=float)
+    if not 0 < radius <= 500:
+        raise ValidationError('radius must be between 0 and 500 km')
+    k = min(max(request.args.get('k', 10, type=int), 1), 100)
+    try:
+        started = perf_counter()
+        if DOCTOR_SEARCH_BACKEND == 'memory':
+            doctors = doctor_directory.nearby(lat, lng, k, radius)
+        else:
+            doctors = nearby_doctors_sql(lat, lng, k, radius)
+        result = {
+            'success': True,
+            'doctors': doctors,
+            'total': len(doctors),
+            'radius_km': radius
+        }
+        if app.debug:
+            result['timings_ms'] = {'nearest': round((perf_counter() - started) * 1000, 3)}
+        return jsonify(result)
+    except Exception as e:
+        app.logger.error(f"Error finding nearby doctors: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'error': 'Failed to find nearby doctors'}), 500
+
 # --- Appointment Routes ---
 @app.route('/api/appointments', methods=['GET'])
 @login_required
 def get_appointments_route():
+    fields = APPOINTMENT_FIELDS.parse(request.args.get('fields'))
+    after = APPOINTMENT_CURSOR.parse(request.args)
     try:
         user_id = session['user_id']
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        query = Appointment.query.filter_by(user_id=user_id)
+        query = APPOINTMENT_FIELDS.apply(Appointment.query, fields).filter_by(user_id=user_id)
+        if after is not None:
+            keyset = APPOINTMENT_CURSOR.page(query, after, cursor_page_size(per_page), with_total=wants_total())
+            result = {
+                'success': True,
+                'appointments': APPOINTMENT_FIELDS.dump(keyset.items, fields),
+                'next_cursor': keyset.next_cursor,
+                'has_next': keyset.has_next
+            }
+            if keyset.total is not None:
+                result['total'] = keyset.total
+            return jsonify(result)
         pagination = query.order_by(Appointment.date.desc(), Appointment.time.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
         return jsonify({
             'success': True,
-            'appointments': [appointment.to_dict() for appointment in pagination.items],
+            'appointments': APPOINTMENT_FIELDS.dump(pagination.items, fields),
             'total': pagination.total,
             'pages': pagination.pages,
             'current_page': pagination.page
@@ -2349,34 +3086,43 @@ def create_appointment_route():
         except ValueError:
             return jsonify({'error': 'Invalid date or time format. Use YYYY-MM-DD for date and HH:MM for time'}), 400
         
-        # First check if the slot is within doctor's availability
-        available_slots = get_available_slots(doctor, appointment_date)
-        if not available_slots:
-            return jsonify({
-                'error': 'Doctor is not available on this date',
-                'message': 'Please select a different date'
-            }), 409
-            
-        if appointment_time.strftime('%H:%M') not in available_slots:
-            return jsonify({
-                'error': 'Selected time slot is not available',
-                'message': 'Please select from available time slots',
-                'availableSlots': available_slots
-            }), 409
-        
-        # Then check if the slot is already booked
-        if not is_slot_available(doctor.id, appointment_date, appointment_time):
-            # Get next 7 days of available slots
-            alternative_dates = []
-            current_date = appointment_date
-            for _ in range(7):
-                current_date = current_date + timedelta(days=1)
-                available_slots = get_available_slots(doctor, current_date)
-                if available_slots:
-                    alternative_dates.append({
-                        'date': current_date.isoformat(),
-                        'availableSlots': available_slots
-                    })
+        try:
+            # Serializes this doctor's bookings and checks overlap with every scheduled appointment
+            slot = slot_calendar.reserve(doctor, appointment_date, appointment_time)
+            if not slot:
+                db.session.rollback()
+                available_slots = get_available_slots(doctor, appointment_date)
+                if not available_slots:
+                    return jsonify({
+                        'error': 'Doctor is not available on this date',
+                        'message': 'Please select a different date'
+                    }), 409
+                return jsonify({
+                    'error': 'Selected time slot is not available',
+                    'message': 'Please select from available time slots',
+                    'availableSlots': available_slots
+                }), 409
+
+            # The scheduled-slot unique index stays as a backstop for the exact same start
+            appointment = Appointment(
+                user_id=session['user_id'],
+                doctor_id=doctor.id,
+                date=appointment_date,
+                time=appointment_time,
+                reason=data['reason'],
+                status='scheduled'
+            )
+            db.session.add(appointment)
+            commit_booking(db.session)
+        except SlotTakenError:
+            db.session.rollback()
+            # One query covers the next 7 days of alternatives
+            free = slot_calendar.free_slots(doctor, appointment_date + timedelta(days=1),
+                                            appointment_date + timedelta(days=7))
+            alternative_dates = [
+                {'date': day.isoformat(), 'availableSlots': slots}
+                for day, slots in sorted(free.items()) if slots
+            ]
             
             return jsonify({
                 'error': 'This time slot is already booked',
@@ -2387,19 +3133,6 @@ def create_appointment_route():
                 }
             }), 409
         
-        # Create appointment
-        appointment = Appointment(
-            user_id=session['user_id'],
-            doctor_id=data['doctorId'],
-            date=appointment_date,
-            time=appointment_time,
-            reason=data['reason'],
-            status='scheduled'
-        )
-        
-        db.session.add(appointment)
-        db.session.commit()
-        
         return jsonify({
             'success': True,
             'message': 'Appointment created successfully',
@@ -2431,15 +3164,23 @@ def update_appointment_route(appointment_id):
         
         # Update fields
         if 'status' in data:
+            if data['status'] not in APPOINTMENT_STATUSES:
+                return jsonify({'error': f"status must be one of: {', '.join(APPOINTMENT_STATUSES)}"}), 400
+            if data['status'] == 'scheduled' and appointment.status != 'scheduled':
+                # Re-scheduling a cancelled appointment can collide with a newer, possibly overlapping booking
+                slot_calendar.reserve(appointment.doctor, appointment.date, appointment.time, require_slot=False)
             appointment.status = data['status']
         
-        db.session.commit()
+        commit_booking(db.session)
         
         return jsonify({
             'success': True,
             'message': 'Appointment updated successfully',
             'appointment': appointment.to_dict()
         })
+    except SlotTakenError as e:
+        db.session.rollback()
+        return jsonify({'error': e.message}), 409
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"Error updating appointment: {str(e)}")
@@ -2479,21 +3220,16 @@ if __name__ == '__main__':
     app.run(debug=is_debug, host='0.0.0.0', port=port)
 
 @app.route('/api/locations', methods=['GET'])
+@conditional_get(doctor_directory_version, max_age=PUBLIC_CACHE_MAX_AGE)
 def get_locations_route():
     try:
-        # Get unique cities and their corresponding areas
-        cities_query = db.session.query(Doctor.city).distinct().order_by(Doctor.city)
-        cities = [city[0] for city in cities_query.all()]
-        
-        # Get areas for each city
-        locations = {}
-        for city in cities:
-            areas_query = db.session.query(Doctor.area)\
-                .filter(Doctor.city == city)\
-                .distinct()\
-                .order_by(Doctor.area)
-            locations[city] = [area[0] for area in areas_query.all()]
-        
+        if DOCTOR_SEARCH_BACKEND == 'memory':
+            # City -> areas tree precomputed by the doctor directory
+            locations = doctor_directory.locations()
+        else:
+            rows = db.session.query(Doctor.city, db.func.array_agg(db.distinct(Doctor.area)))\
+                .group_by(Doctor.city).order_by(Doctor.city).all()
+            locations = {city: sorted(areas) for city, areas in rows}
         return jsonify({
             'success': True,
             'locations': locations
@@ -2529,64 +3265,16 @@ def debug_doctors():
 
 # Add these helper functions after the Doctor model definition
 
+SLOT_RANGE_MAX_DAYS = 62
+
 def get_available_slots(doctor, date):
     """Get available time slots for a doctor on a specific date."""
     try:
-        # Get doctor's availability
-        availability = doctor.availability
-        if not availability or 'days' not in availability or 'startTime' not in availability or 'endTime' not in availability:
-            return []
-
-        # Check if the date is in the doctor's available days
-        day_name = date.strftime('%A')  # Get full day name (e.g., 'Monday', 'Tuesday')
-        if day_name not in availability['days']:
-            return []
-
-        # Parse start and end times
-        start_time = datetime.strptime(availability['startTime'], '%H:%M').time()
-        end_time = datetime.strptime(availability['endTime'], '%H:%M').time()
-
-        # Get all booked appointments for this doctor on this date
-        booked_slots = Appointment.query.filter_by(
-            doctor_id=doctor.id,
-            date=date,
-            status='scheduled'  # Only consider active appointments
-        ).all()
-
-        # Convert booked slots to time objects
-        booked_times = [appt.time for appt in booked_slots]
-
-        # Generate all possible slots (30-minute intervals)
-        available_slots = []
-        current_time = start_time
-        while current_time < end_time:
-            # Check if this slot is not booked
-            if current_time not in booked_times:
-                available_slots.append(current_time.strftime('%H:%M'))
-            # Add 30 minutes
-            current_time = (datetime.combine(date, current_time) + timedelta(minutes=30)).time()
-
-        return available_slots
+        return slot_calendar.free_slots(doctor, date, date)[date]
     except Exception as e:
         app.logger.error(f"Error getting available slots: {str(e)}")
         return []
 
-def is_slot_available(doctor_id, date, time):
-    """Check if a specific slot is available."""
-    try:
-        # Check if there's any existing appointment for this slot
-        existing_appointment = Appointment.query.filter_by(
-            doctor_id=doctor_id,
-            date=date,
-            time=time,
-            status='scheduled'
-        ).first()
-        
-        return existing_appointment is None
-    except Exception as e:
-        app.logger.error(f"Error checking slot availability: {str(e)}")
-        return False
-
 # Add these new routes after your existing appointment routes
 
 @app.route('/api/appointments/available-slots', methods=['GET'])
@@ -2595,18 +3283,34 @@ def get_available_slots_route():
     try:
         doctor_id = request.args.get('doctorId')
         date_str = request.args.get('date')
+        from_str = request.args.get('from')
+        to_str = request.args.get('to')
         
-        if not doctor_id or not date_str:
-            return jsonify({'error': 'Doctor ID and date are required'}), 400
+        if not doctor_id or not (date_str or (from_str and to_str)):
+            return jsonify({'error': 'Doctor ID and date (or from and to) are required'}), 400
             
         try:
-            date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            if date_str:
+                date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            else:
+                start = datetime.strptime(from_str, '%Y-%m-%d').date()
+                end = datetime.strptime(to_str, '%Y-%m-%d').date()
         except ValueError:
             return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        if not date_str and not 0 <= (end - start).days < SLOT_RANGE_MAX_DAYS:
+            return jsonify({'error': f'from must not be after to, and the range is limited to {SLOT_RANGE_MAX_DAYS} days'}), 400
             
         doctor = Doctor.query.get(doctor_id)
         if not doctor:
             return jsonify({'error': 'Doctor not found'}), 404
+        
+        if not date_str:
+            # Free slots for every day in [from, to] from a single bookings query
+            free = slot_calendar.free_slots(doctor, start, end)
+            return jsonify({
+                'success': True,
+                'days': [{'date': day.isoformat(), 'availableSlots': slots} for day, slots in sorted(free.items())]
+            })
             
         available_slots = get_available_slots(doctor, date)
         
@@ -2618,6 +3322,217 @@ def get_available_slots_route():
         app.logger.error(f"Error getting available slots: {str(e)}")
         return jsonify({'error': 'Failed to get available slots'}), 500
 
+@app.route('/api/doctors/earliest-slots', methods=['GET'])
+def earliest_slots_route():
+    city = request.args.get('city', '').strip()
+    if not city:
+        raise ValidationError('City is required')
+    area = request.args.get('area', '').strip()
+    specialization = request.args.get('specialization', '').strip()
+    try:
+        today = datetime.now().date()
+        start = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else today
+        end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') \
+            else start + timedelta(days=13)
+    except ValueError:
+        raise ValidationError('Invalid date format. Use YYYY-MM-DD')
+    if not 0 <= (end - start).days < SLOT_RANGE_MAX_DAYS:
+        raise ValidationError(f'from must not be after to, and the range is limited to {SLOT_RANGE_MAX_DAYS} days')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    try:
+        doctors = {doctor['id']: doctor for doctor in find_doctors(city, area, specialization)}
+        earliest = slot_calendar.earliest(
+            ((doctor_id, doctor['availability']) for doctor_id, doctor in doctors.items()),
+            max(start, today), end, limit=limit, not_before=datetime.now()
+        )
+        return jsonify({
+            'success': True,
+            'slots': [{
+                'doctor': {key: doctors[doctor_id][key] for key in
+                           ('id', 'fullName', 'specialization', 'hospital', 'city', 'area', 'rating')},
+                'date': day.isoformat(),
+                'time': format_minutes(slot_start),
+                'minutes': slot_end - slot_start
+            } for doctor_id, day, slot_start, slot_end in earliest],
+            'doctors_considered': len(doctors)
+        })
+    except Exception as e:
+        app.logger.error(f"Error finding earliest slots: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'error': 'Failed to find available slots'}), 500
+
+SCHEDULE_SLOT_MINUTES = range(5, 241, 5)
+SCHEDULE_EXCEPTION_KINDS = ('off', 'extra')
+
+def parse_schedule_window(data, required=True):
+    """(start_time, end_time) from the startTime/endTime fields; (None, None) if optional and absent"""
+    if not required and not data.get('startTime') and not data.get('endTime'):
+        return None, None
+    try:
+        start = datetime.strptime(data.get('startTime'), '%H:%M').time()
+        end = datetime.strptime(data.get('endTime'), '%H:%M').time()
+    except (TypeError, ValueError):
+        raise ValidationError('startTime and endTime are required and must use HH:MM')
+    if start >= end:
+        raise ValidationError('startTime must be before endTime')
+    return start, end
+
+def parse_slot_minutes(value):
+    minutes = 30 if value is None else value
+    if not isinstance(minutes, int) or minutes not in SCHEDULE_SLOT_MINUTES:
+        raise ValidationError('slotMinutes must be a multiple of 5 between 5 and 240')
+    return minutes
+
+def appointments_outside_schedule(doctor, start, end=None):
+    """Scheduled appointments of ``doctor`` from ``start`` that no longer start on one of their slots"""
+    query = Appointment.query.filter(
+        Appointment.doctor_id == doctor.id,
+        Appointment.status == 'scheduled',
+        Appointment.date >= start
+    )
+    if end is not None:
+        query = query.filter(Appointment.date <= end)
+    appointments = query.order_by(Appointment.date, Appointment.time).all()
+    if not appointments:
+        return []
+    schedule = slot_calendar.schedules([(doctor.id, doctor.availability)], start, appointments[-1].date)[doctor.id]
+    return [appointment for appointment in appointments
+            if not schedule.day(appointment.date).slot_at(to_minutes(appointment.time))]
+
+def working_windows(doctor, day):
+    """IntervalIndex of the doctor's weekly working windows and extra hours on ``day``"""
+    rules = [rule.as_rule() for rule in DoctorScheduleRule.query.filter_by(doctor_id=doctor.id).all()] \
+        or availability_rules(doctor.availability)
+    windows = [(start, end) for weekday, start, end, _ in rules if weekday == day.weekday()]
+    windows += [(to_minutes(extra.start_time), to_minutes(extra.end_time)) for extra in
+                DoctorScheduleException.query.filter_by(doctor_id=doctor.id, date=day, kind='extra').all()]
+    return IntervalIndex(windows)
+
+@app.route('/api/doctor/schedule', methods=['GET'])
+def get_doctor_schedule_route():
+    if 'doctor_id' not in session:
+        return jsonify({'error': 'Unauthorized', 'type': 'AUTH_ERROR'}), 401
+    try:
+        today = datetime.now().date()
+        start = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else today
+        end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') \
+            else start + timedelta(days=60)
+    except ValueError:
+        raise ValidationError('Invalid date format. Use YYYY-MM-DD')
+    try:
+        doctor_id = session['doctor_id']
+        rules = DoctorScheduleRule.query.filter_by(doctor_id=doctor_id)\
+            .order_by(DoctorScheduleRule.weekday, DoctorScheduleRule.start_time).all()
+        exceptions = DoctorScheduleException.query.filter(
+            DoctorScheduleException.doctor_id == doctor_id,
+            DoctorScheduleException.date.between(start, end)
+        ).order_by(DoctorScheduleException.date, DoctorScheduleException.start_time).all()
+        return jsonify({
+            'success': True,
+            'source': 'rules' if rules else 'availability',
+            'rules': [rule.to_dict() for rule in rules],
+            'exceptions': [exception.to_dict() for exception in exceptions]
+        })
+    except Exception as e:
+        app.logger.error(f"Error fetching doctor schedule: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to fetch schedule'}), 500
+
+@app.route('/api/doctor/schedule/rules', methods=['PUT'])
+def replace_doctor_schedule_rules_route():
+    if 'doctor_id' not in session:
+        return jsonify({'error': 'Unauthorized', 'type': 'AUTH_ERROR'}), 401
+    data = request.get_json()
+    if not data or not isinstance(data.get('rules'), list):
+        raise ValidationError('rules must be a list')
+    parsed = []
+    for item in data['rules']:
+        if not isinstance(item, dict) or item.get('day') not in WEEKDAYS:
+            raise ValidationError(f"Each rule needs a day, one of: {', '.join(WEEKDAYS)}")
+        start, end = parse_schedule_window(item)
+        parsed.append((WEEKDAYS.index(item['day']), start, end, parse_slot_minutes(item.get('slotMinutes'))))
+    parsed.sort()
+    for previous, current in zip(parsed, parsed[1:]):
+        if previous[0] == current[0] and current[1] < previous[2]:
+            raise ValidationError(f'Rules overlap on {WEEKDAYS[current[0]]}')
+    try:
+        doctor = Doctor.query.get(session['doctor_id'])
+        # An empty list reverts the doctor to their availability JSON
+        DoctorScheduleRule.query.filter_by(doctor_id=doctor.id).delete(synchronize_session=False)
+        rules = [DoctorScheduleRule(doctor_id=doctor.id, weekday=weekday, start_time=start,
+                                    end_time=end, slot_minutes=slot_minutes)
+                 for weekday, start, end, slot_minutes in parsed]
+        db.session.add_all(rules)
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'rules': [rule.to_dict() for rule in rules],
+            'affectedAppointments': [appointment.id for appointment in
+                                     appointments_outside_schedule(doctor, datetime.now().date())]
+        })
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error saving doctor schedule rules: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to save schedule rules'}), 500
+
+@app.route('/api/doctor/schedule/exceptions', methods=['POST'])
+def create_doctor_schedule_exception_route():
+    if 'doctor_id' not in session:
+        return jsonify({'error': 'Unauthorized', 'type': 'AUTH_ERROR'}), 401
+    data = request.get_json()
+    if not data:
+        raise ValidationError('No data provided')
+    kind = data.get('kind')
+    if kind not in SCHEDULE_EXCEPTION_KINDS:
+        raise ValidationError(f"kind must be one of: {', '.join(SCHEDULE_EXCEPTION_KINDS)}")
+    try:
+        exception_date = datetime.strptime(data.get('date') or '', '%Y-%m-%d').date()
+    except ValueError:
+        raise ValidationError('Invalid date format. Use YYYY-MM-DD')
+    # Time off without a window covers the whole day; extra hours always need one
+    start, end = parse_schedule_window(data, required=kind == 'extra')
+    slot_minutes = parse_slot_minutes(data.get('slotMinutes')) if kind == 'extra' else None
+    doctor = Doctor.query.get(session['doctor_id'])
+    if kind == 'extra':
+        # Extra hours must not create slots that overlap the day's existing ones
+        overlaps = working_windows(doctor, exception_date).overlapping(to_minutes(start), to_minutes(end))
+        if overlaps:
+            raise ValidationError('Extra hours overlap the working hours of that day', payload={
+                'overlaps': [{'startTime': format_minutes(low), 'endTime': format_minutes(high)}
+                             for low, high in overlaps]
+            })
+    try:
+        exception = DoctorScheduleException(
+            doctor_id=doctor.id, date=exception_date, kind=kind, start_time=start, end_time=end,
+            slot_minutes=slot_minutes, reason=(data.get('reason') or '')[:200] or None
+        )
+        db.session.add(exception)
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'exception': exception.to_dict(),
+            'affectedAppointments': [appointment.id for appointment in
+                                     appointments_outside_schedule(doctor, exception_date, exception_date)]
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error creating schedule exception: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to create schedule exception'}), 500
+
+@app.route('/api/doctor/schedule/exceptions/<int:exception_id>', methods=['DELETE'])
+def delete_doctor_schedule_exception_route(exception_id):
+    if 'doctor_id' not in session:
+        return jsonify({'error': 'Unauthorized', 'type': 'AUTH_ERROR'}), 401
+    try:
+        exception = DoctorScheduleException.query.get(exception_id)
+        if not exception or exception.doctor_id != session['doctor_id']:
+            return jsonify({'error': 'Schedule exception not found'}), 404
+        db.session.delete(exception)
+        db.session.commit()
+        return jsonify({'success': True})
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error deleting schedule exception: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to delete schedule exception'}), 500
+
 # Add doctor authentication routes
 @app.route('/api/doctor/login', methods=['POST', 'OPTIONS'])
 def doctor_login_route():
@@ -2670,8 +3585,11 @@ def doctor_login_route():
             session['doctor_email'] = doctor.email
             session['doctor_name'] = doctor.fullName
         
-            # Update last login
-            doctor.last_login = datetime.utcnow()
+            # Update last login; keep updated_at so a login is not a directory change in any worker
+            doctors = Doctor.__table__
+            db.session.execute(db.update(doctors).where(doctors.c.id == doctor.id).values(
+                last_login=datetime.utcnow(), updated_at=doctors.c.updated_at
+            ))
             db.session.commit()
         
             app.logger.info(f"Doctor login successful for {email}")
@@ -2950,12 +3868,35 @@ def doctor_simple_reset_password_route():
         app.logger.error(f"Error in simple reset password route: {str(e)}")
         return jsonify({"error": "An error occurred"}), 500
 
+@app.route('/api/doctor/agenda', methods=['GET'])
+def get_doctor_agenda_route():
+    if 'doctor_id' not in session:
+        return jsonify({'error': 'Unauthorized', 'type': 'AUTH_ERROR'}), 401
+    try:
+        today = datetime.now().date()
+        start = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else today
+        end = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') \
+            else start + timedelta(days=6)
+    except ValueError:
+        raise ValidationError('Invalid date format. Use YYYY-MM-DD')
+    if not 0 <= (end - start).days < SLOT_RANGE_MAX_DAYS:
+        raise ValidationError(f'from must not be after to, and the range is limited to {SLOT_RANGE_MAX_DAYS} days')
+    try:
+        return jsonify({
+            'success': True,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'days': agenda_cache.get(session['doctor_id'], start, end)
+        })
+    except Exception as e:
+        app.logger.error(f"Error fetching doctor agenda: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to fetch agenda'}), 500
+
 @app.route('/api/appointments/doctor', methods=['GET'])
 def get_doctor_appointments_route():
+    fields = APPOINTMENT_FIELDS.parse(request.args.get('fields'))
+    after = APPOINTMENT_CURSOR.parse(request.args)
     try:
-        app.logger.info(f"Session contents: {dict(session)}")
-        app.logger.info(f"Doctor ID in session: {session.get('doctor_id')}")
-        
         if 'doctor_id' not in session:
             app.logger.warning("No doctor_id found in session")
             return jsonify({'error': 'Unauthorized', 'type': 'AUTH_ERROR'}), 401
@@ -2964,18 +3905,29 @@ def get_doctor_appointments_route():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        query = Appointment.query.filter_by(doctor_id=doctor_id)
-        pagination = query.order_by(Appointment.date.desc(), Appointment.time.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        response = jsonify({
-            'success': True,
-            'appointments': [appointment.to_dict() for appointment in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': pagination.page
-        })
+        query = APPOINTMENT_FIELDS.apply(Appointment.query, fields).filter_by(doctor_id=doctor_id)
+        if after is not None:
+            keyset = APPOINTMENT_CURSOR.page(query, after, cursor_page_size(per_page), with_total=wants_total())
+            result = {
+                'success': True,
+                'appointments': APPOINTMENT_FIELDS.dump(keyset.items, fields),
+                'next_cursor': keyset.next_cursor,
+                'has_next': keyset.has_next
+            }
+            if keyset.total is not None:
+                result['total'] = keyset.total
+            response = jsonify(result)
+        else:
+            pagination = query.order_by(Appointment.date.desc(), Appointment.time.desc()).paginate(
+                page=page, per_page=per_page, error_out=False
+            )
+            response = jsonify({
+                'success': True,
+                'appointments': APPOINTMENT_FIELDS.dump(pagination.items, fields),
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'current_page': pagination.page
+            })
         response.headers['Access-Control-Allow-Origin'] = 'http://localhost:3000'
         response.headers['Access-Control-Allow-Credentials'] = 'true'
         return response
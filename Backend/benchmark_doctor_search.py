@@ -0,0 +1,114 @@
+"""Doctor search benchmark.
+
+Seeds N synthetic doctors into a temporary table and times the search
+filters as leading-wildcard ILIKE sequential scans, then with pg_trgm GIN
+indexes and word_similarity ranking, then against the in-memory
+DoctorDirectory snapshot. Everything runs in one transaction that is
+rolled back. Connection settings come from the same DB_* variables as the app.
+
+Usage: python benchmark_doctor_search.py [doctors] [repeats]
+"""
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+from hd_prediction.db import database_uri_from_env
+from hd_prediction.services.directory.doctor_directory import _Snapshot, DoctorDirectory
+
+CITIES = ['Pune', 'Mumbai', 'Nagpur', 'Nashik', 'Delhi', 'Bengaluru', 'Chennai', 'Kolkata', 'Hyderabad', 'Jaipur']
+SPECIALIZATIONS = ['Cardiology', 'Interventional Cardiology', 'Cardiac Surgery', 'Internal Medicine',
+                   'General Medicine', 'Electrophysiology']
+
+SEED = """
+INSERT INTO bench_doctors ("fullName", email, hospital, city, area, specialization)
+SELECT 'Dr. Bench ' || g,
+       'bench-' || g || '@example.invalid',
+       'Hospital ' || (g % 997),
+       (:cities)[1 + g % cardinality(:cities)] || ' ' || (g % 50),
+       'Area ' || (g % 400),
+       (:specializations)[1 + g % cardinality(:specializations)]
+FROM generate_series(1, :rows) g
+"""
+
+QUERIES = {
+    'search city+area+specialization': (
+        "SELECT id FROM bench_doctors WHERE city ILIKE :city AND area ILIKE :area "
+        "AND specialization ILIKE :specialization",
+        "SELECT id FROM bench_doctors WHERE city ILIKE :city AND area ILIKE :area "
+        "AND specialization ILIKE :specialization ORDER BY word_similarity(:city_term, city) "
+        "+ word_similarity(:area_term, area) + word_similarity(:specialization_term, specialization) DESC, id "
+        "LIMIT 10",
+    ),
+    'admin name/email/hospital search': (
+        "SELECT id FROM bench_doctors WHERE \"fullName\" ILIKE :name OR email ILIKE :name OR hospital ILIKE :name",
+        "SELECT id FROM bench_doctors WHERE \"fullName\" ILIKE :name OR email ILIKE :name OR hospital ILIKE :name "
+        "ORDER BY word_similarity(:name_term, \"fullName\") + word_similarity(:name_term, email) "
+        "+ word_similarity(:name_term, hospital) DESC, id LIMIT 10",
+    ),
+}
+
+PARAMS = {
+    'city': '%nagpur 1%', 'city_term': 'nagpur 1',
+    'area': '%area 12%', 'area_term': 'area 12',
+    'specialization': '%cardio%', 'specialization_term': 'cardio',
+    'name': '%bench 4242%', 'name_term': 'bench 4242',
+}
+
+
+def timed(label, fn, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<60} {best * 1000:9.3f} ms")
+    return best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    load_dotenv()
+    engine = create_engine(database_uri_from_env(os.environ))
+
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            connection.execute(text(
+                'CREATE TEMP TABLE bench_doctors (id serial PRIMARY KEY, "fullName" text, email text, '
+                'hospital text, city text, area text, specialization text)'
+            ))
+            connection.execute(text(SEED), {'rows': rows, 'cities': CITIES, 'specializations': SPECIALIZATIONS})
+            connection.execute(text('ANALYZE bench_doctors'))
+            print(f"Searching {rows:,} doctors, best of {repeats}")
+
+            for name, (plain, _) in QUERIES.items():
+                timed(f'{name}: ILIKE, no index', lambda: connection.execute(text(plain), PARAMS).all(), repeats)
+
+            for column in ('city', 'area', 'specialization', '"fullName"', 'email', 'hospital'):
+                connection.execute(text(f'CREATE INDEX ON bench_doctors USING gin ({column} gin_trgm_ops)'))
+            connection.execute(text('ANALYZE bench_doctors'))
+
+            for name, (plain, ranked) in QUERIES.items():
+                timed(f'{name}: ILIKE, pg_trgm GIN', lambda: connection.execute(text(plain), PARAMS).all(), repeats)
+                timed(f'{name}: pg_trgm GIN + ranked top 10',
+                      lambda: connection.execute(text(ranked), PARAMS).all(), repeats)
+
+            doctors = [dict(row._mapping) for row in connection.execute(text(
+                'SELECT id, city, area, specialization FROM bench_doctors'
+            ))]
+            directory = DoctorDirectory(lambda: doctors, lambda: 'bench')
+            timed('in-memory directory: build snapshot', lambda: _Snapshot(doctors, 'bench'), 1)
+            directory.rebuild()
+            timed('search city+area+specialization: in-memory directory',
+                  lambda: directory.search('nagpur 1', 'area 12', 'cardio'), repeats)
+        finally:
+            transaction.rollback()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Serialization throughput benchmark.
+
+Compares the stdlib JSON encoder used by Flask's default provider with the
+orjson-backed FastJSONProvider on a 10k-row doctor payload, and the compact
+Fieldset serializer with a per-row to_dict.
+
+Usage: python benchmark_serialization.py [rows] [repeats]
+"""
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON
+from sqlalchemy.orm import declarative_base
+
+from hd_prediction.api import Fieldset, fast_dumps
+
+Base = declarative_base()
+
+
+class BenchDoctor(Base):
+    __tablename__ = 'bench_doctors'
+    id = Column(Integer, primary_key=True)
+    fullName = Column(String(100))
+    specialization = Column(String(100))
+    city = Column(String(100))
+    area = Column(String(100))
+    availability = Column(JSON)
+    rating = Column(Float)
+    created_at = Column(DateTime)
+
+    def to_dict(self):
+        # Mirrors the previous Doctor.to_dict: defensive casts plus a null scan per row
+        doctor_dict = {
+            'id': self.id,
+            'fullName': str(self.fullName) if self.fullName else '',
+            'specialization': str(self.specialization) if self.specialization else '',
+            'city': str(self.city) if self.city else '',
+            'area': str(self.area) if self.area else '',
+            'availability': self.availability or {},
+            'rating': float(self.rating) if self.rating is not None else 0.0,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+        null_fields = [k for k, v in doctor_dict.items() if v is None]
+        if null_fields:
+            print(f"Doctor {self.id} has null fields: {null_fields}")
+        return doctor_dict
+
+
+BENCH_FIELDS = Fieldset(BenchDoctor, {
+    'id': 'id', 'fullName': 'fullName', 'specialization': 'specialization', 'city': 'city',
+    'area': 'area', 'availability': 'availability', 'rating': 'rating', 'created_at': 'created_at'
+})
+
+
+def build_rows(count):
+    now = datetime.utcnow()
+    return [BenchDoctor(
+        id=i, fullName=f'Dr. Bench {i}', specialization='Cardiology', city='Pune',
+        area=f'Area {i % 40}', rating=float(np.float64(i % 50 / 10)),
+        availability={'days': ['Monday', 'Wednesday'], 'startTime': '09:00', 'endTime': '17:00'},
+        created_at=now - timedelta(minutes=i)
+    ) for i in range(count)]
+
+
+def timed(label, fn, repeats, rows):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<45} {best * 1000:8.2f} ms  {rows / best:12,.0f} rows/s")
+    return best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    doctors = build_rows(rows)
+    fields = BENCH_FIELDS.keys
+    payload = {'success': True, 'doctors': [d.to_dict() for d in doctors]}
+    numpy_payload = {'scores': np.random.rand(rows), 'created': [d.created_at for d in doctors]}
+
+    print(f"Serializing {rows:,} rows, best of {repeats}")
+    timed('to_dict per row', lambda: [d.to_dict() for d in doctors], repeats, rows)
+    timed('Fieldset.dump', lambda: BENCH_FIELDS.dump(doctors, fields), repeats, rows)
+    timed('stdlib json.dumps (sort_keys)', lambda: json.dumps(payload, sort_keys=True), repeats, rows)
+    timed('fast_dumps', lambda: fast_dumps(payload), repeats, rows)
+    timed('fast_dumps (numpy + datetime values)', lambda: fast_dumps(numpy_payload), repeats, rows)
+    timed('end-to-end: to_dict + stdlib json',
+          lambda: json.dumps({'doctors': [d.to_dict() for d in doctors]}, sort_keys=True), repeats, rows)
+    timed('end-to-end: Fieldset.dump + fast_dumps',
+          lambda: fast_dumps({'doctors': BENCH_FIELDS.dump(doctors, fields)}), repeats, rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Admin doctor search fallback check.
+
+Creates a few throwaway doctors and runs the admin doctor search through the
+test client with pg_trgm ranking forced off, as on a database bootstrapped
+with db.create_all() where the extension is not installed, and again with
+ranking on when pg_trgm is available. The fallback must answer without
+calling word_similarity() and both paths must return the same doctors. All
+rows created here are deleted afterwards. Connection settings come from the
+same DB_* variables as the app.
+
+Usage: python check_doctor_search.py
+"""
+import sys
+
+from sqlalchemy import event
+
+import app as server
+from app import app, db, Doctor
+from hd_prediction.db import has_extension
+
+MARKER = 'check-doctor-search'
+
+
+def create_fixtures():
+    doctors = []
+    for index, name in enumerate(['Alpha', 'Beta', 'Gamma']):
+        doctor = Doctor(
+            fullName=f'Dr. {name} {MARKER}', specialization='Cardiology', qualifications='MD', experience=10,
+            hospital=f'{MARKER} Hospital', address='Check Street', city='Check City', area='Check Area',
+            phoneNumber='000', email=f'{MARKER}-{index}@example.invalid',
+            availability={'days': ['Monday'], 'startTime': '09:00', 'endTime': '17:00'}
+        )
+        doctor.set_password('x')
+        doctors.append(doctor)
+    db.session.add_all(doctors)
+    db.session.commit()
+    return sorted(doctor.id for doctor in doctors)
+
+
+def drop_fixtures():
+    Doctor.query.filter(Doctor.email.like(f'{MARKER}-%')).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def search(client, ranking):
+    """Admin search for the fixtures with ranking forced on/off; returns the response and its SQL"""
+    server.doctor_trigram_ranking = ranking
+    statements = []
+
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/api/admin/doctors', query_string={'search': MARKER, 'per_page': 100})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response, statements
+
+
+def main():
+    failures = []
+    with app.app_context():
+        with db.engine.connect() as connection:
+            trigram = has_extension(connection, 'pg_trgm')
+        expected = create_fixtures()
+        try:
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['admin_id'] = 0
+            for ranking in ([False, True] if trigram else [False]):
+                label = 'ranked' if ranking else 'ILIKE fallback'
+                response, statements = search(client, ranking)
+                found = sorted(doctor['id'] for doctor in (response.get_json() or {}).get('doctors', []))
+                ranked = any('word_similarity' in statement for statement in statements)
+                print(f"{label}: HTTP {response.status_code}, {len(found)} doctor(s), "
+                      f"word_similarity {'used' if ranked else 'not used'}")
+                if response.status_code != 200 or found != expected:
+                    failures.append(f"{label}: expected doctors {expected}, got HTTP {response.status_code} {found}")
+                if ranked != ranking:
+                    failures.append(f"{label}: word_similarity {'used' if ranked else 'not used'}")
+            if not trigram:
+                print("pg_trgm is not installed here; ranked path skipped")
+        finally:
+            server.doctor_trigram_ranking = None
+            drop_fixtures()
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK: admin doctor search works with and without pg_trgm")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+from .fieldsets import Fieldset
+from .json_provider import FastJSONProvider, fast_dumps
+from .http_cache import conditional_get, register_compression
+from .streaming import stream_export
+from .pagination import KeysetCursor, KeysetPage
+
+__all__ = [
+    'Fieldset',
+    'FastJSONProvider',
+    'fast_dumps',
+    'conditional_get',
+    'register_compression',
+    'stream_export',
+    'KeysetCursor',
+    'KeysetPage'
+]
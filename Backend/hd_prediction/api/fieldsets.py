@@ -0,0 +1,99 @@
+from datetime import datetime, date, time
+from operator import attrgetter
+from sqlalchemy import Date, DateTime, Time
+from sqlalchemy.orm import load_only
+from ..errors import ValidationError
+
+
+def _jsonable(value):
+    """Convert column values to the same wire format used by the models' to_dict"""
+    if isinstance(value, datetime) or isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, time):
+        return value.strftime('%H:%M')
+    return value
+
+
+class Fieldset:
+    """Whitelist of public keys a list endpoint can project with ``?fields=a,b,c``.
+
+    ``columns`` maps a public key to the model attribute holding it. ``computed``
+    maps a public key to ``(required_columns, getter)`` for derived values.
+    Only the columns behind the requested keys are selected from the database.
+    """
+
+    def __init__(self, model, columns, computed=None):
+        self.model = model
+        self.columns = columns
+        self.computed = computed or {}
+
+    @property
+    def keys(self):
+        return list(self.columns) + list(self.computed)
+
+    def parse(self, raw):
+        """Parse a ``fields`` query value. Returns None when every field is wanted."""
+        if not raw:
+            return None
+        fields = []
+        for key in raw.split(','):
+            key = key.strip()
+            if key and key not in fields:
+                fields.append(key)
+        if not fields:
+            return None
+        unknown = [key for key in fields if key not in self.columns and key not in self.computed]
+        if unknown:
+            raise ValidationError(
+                f"Unknown fields: {', '.join(unknown)}",
+                payload={'allowed_fields': self.keys}
+            )
+        return fields
+
+    def load_only(self, fields):
+        """Loader option restricting the SELECT list to the requested fields"""
+        attrs = set()
+        for key in fields:
+            if key in self.columns:
+                attrs.add(self.columns[key])
+            else:
+                attrs.update(self.computed[key][0])
+        return load_only(*[getattr(self.model, attr) for attr in sorted(attrs)])
+
+    def apply(self, query, fields):
+        return query.options(self.load_only(fields)) if fields else query
+
+    def _column_getter(self, attr):
+        getter = attrgetter(attr)
+        column = self.model.__table__.columns.get(attr)
+        if column is not None and isinstance(column.type, (Date, DateTime, Time)):
+            return lambda obj: _jsonable(getter(obj))
+        return getter
+
+    def getters(self, fields):
+        """Resolve the requested keys into (key, getter) pairs once per response"""
+        getters = []
+        for key in fields:
+            if key in self.columns:
+                getters.append((key, self._column_getter(self.columns[key])))
+            else:
+                getters.append((key, self.computed[key][1]))
+        return getters
+
+    def template(self, fields):
+        """Row for ``fields`` evaluated on a blank, transient model instance.
+
+        Gives the shape of a row (e.g. the keys of nested dicts) without any data.
+        """
+        blank = self.model()
+        return {key: getter(blank) for key, getter in self.getters(fields)}
+
+    def serialize(self, obj, fields):
+        return {key: getter(obj) for key, getter in self.getters(fields)}
+
+    def dump(self, objects, fields):
+        """Serialize a list of rows, falling back to the full to_dict when no fields were requested"""
+        if fields is None:
+            return [obj.to_dict() for obj in objects]
+        getters = self.getters(fields)
+        return [{key: getter(obj) for key, getter in getters} for obj in objects]
@@ -0,0 +1,77 @@
+import gzip
+import hashlib
+from functools import wraps
+from flask import request, make_response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+def conditional_get(version_func, max_age=60):
+    """Serve ``If-None-Match`` revalidations with 304 without running the view.
+
+    ``version_func`` must be cheap (e.g. a table's row count and max ``updated_at``).
+    The ETag combines that version with the request path and query string, so every
+    page and filter combination gets its own validator.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            version = str(version_func())
+            etag = hashlib.sha1(f"{version}|{request.full_path}".encode('utf-8')).hexdigest()
+            cache_control = f'public, max-age={max_age}, must-revalidate'
+
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return decorated_function
+    return decorator
+
+
+def _pick_encoding(accept_encoding):
+    if brotli is not None and 'br' in accept_encoding:
+        return 'br'
+    if 'gzip' in accept_encoding:
+        return 'gzip'
+    return None
+
+
+def register_compression(app, min_size=1024, mimetypes=('application/json',)):
+    """Compress JSON responses larger than ``min_size`` bytes with brotli or gzip"""
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code < 200 or response.status_code >= 300
+                or response.status_code == 204
+                or response.direct_passthrough or response.is_streamed
+                or response.mimetype not in mimetypes
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        encoding = _pick_encoding(request.headers.get('Accept-Encoding', '').lower())
+        if encoding is None:
+            return response
+
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(body, quality=4)
+        else:
+            compressed = gzip.compress(body, compresslevel=6)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        response.headers['Content-Length'] = str(len(compressed))
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,73 @@
+import dataclasses
+import decimal
+import uuid
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy ships with the ML stack
+    np = None
+
+
+def _default(obj):
+    """Fallback for types the fast encoder does not handle natively"""
+    if np is not None:
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def fast_dumps(obj, sort_keys=False):
+    """Encode ``obj`` to JSON bytes with orjson, falling back to the stdlib encoder"""
+    if orjson is None:
+        import json
+        return json.dumps(obj, default=_default, sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(obj, default=_default, option=option)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Handles datetime, date, time and numpy values natively. When orjson is not
+    installed, or a caller passes stdlib-only keyword arguments, it defers to
+    Flask's default provider.
+    """
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            kwargs.setdefault('default', _default)
+            return super().dumps(obj, **kwargs)
+        return fast_dumps(obj, sort_keys=self.sort_keys).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            fast_dumps(obj, sort_keys=self.sort_keys) + b"\n", mimetype=self.mimetype
+        )
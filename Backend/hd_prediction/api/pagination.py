@@ -0,0 +1,79 @@
+import base64
+import json
+from datetime import datetime, date, time
+from sqlalchemy import Date, DateTime, Time, tuple_
+from ..errors import ValidationError
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _decoder(column):
+    column_type = column.type
+    if isinstance(column_type, DateTime):
+        return datetime.fromisoformat
+    if isinstance(column_type, Date):
+        return date.fromisoformat
+    if isinstance(column_type, Time):
+        return time.fromisoformat
+    return lambda value: value
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+        self.total = total
+
+
+class KeysetCursor:
+    """Opt-in cursor pagination over a descending, unique sort key.
+
+    ``columns`` is the sort key, newest first, ending in the primary key so it
+    is unique (e.g. ``created_at, id``). Clients pass ``after=`` (empty for
+    the first page) and get back an opaque ``next_cursor`` encoding the last
+    row's key. Each page is a ``WHERE (key) < (cursor) ... LIMIT n`` range
+    scan, so deep pages cost the same as the first and no COUNT(*) is run
+    unless asked for.
+    """
+
+    def __init__(self, *columns):
+        self.columns = columns
+        self.decoders = [_decoder(column) for column in columns]
+
+    def encode(self, values):
+        raw = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode(self, token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.columns):
+                raise ValueError(token)
+            return tuple(decode(value) for decode, value in zip(self.decoders, values))
+        except (ValueError, TypeError):
+            raise ValidationError('Invalid cursor', payload={'after': token})
+
+    def parse(self, args):
+        """None unless the request opted into cursor mode; () for the first page"""
+        if 'after' not in args:
+            return None
+        token = args.get('after')
+        return self.decode(token) if token else ()
+
+    def page(self, query, after, limit, with_total=False):
+        limit = max(limit, 1)
+        total = query.order_by(None).count() if with_total else None
+        if after:
+            query = query.filter(tuple_(*self.columns) < tuple_(*after))
+        # Select the key alongside the entity so it is available even under load_only
+        rows = query.add_columns(*self.columns)\
+            .order_by(None).order_by(*[column.desc() for column in self.columns])\
+            .limit(limit + 1).all()
+        next_cursor = self.encode(rows[limit - 1][1:]) if len(rows) > limit else None
+        return KeysetPage([row[0] for row in rows[:limit]], next_cursor, total)
@@ -0,0 +1,30 @@
+from .pool import (
+    PoolMetrics,
+    InstrumentedQueuePool,
+    pool_metrics,
+    database_uri_from_env,
+    engine_options_from_env,
+    register_pool_metrics
+)
+from .query_plans import HOT_QUERIES, check_query_plans, seed_hot_tables
+from .counts import COUNT_MODES, OffsetPage, RowCounter
+from .text_search import contains, rank, escape_like, has_extension
+
+__all__ = [
+    'PoolMetrics',
+    'InstrumentedQueuePool',
+    'pool_metrics',
+    'database_uri_from_env',
+    'engine_options_from_env',
+    'register_pool_metrics',
+    'HOT_QUERIES',
+    'check_query_plans',
+    'seed_hot_tables',
+    'COUNT_MODES',
+    'OffsetPage',
+    'RowCounter',
+    'contains',
+    'rank',
+    'escape_like',
+    'has_extension'
+]
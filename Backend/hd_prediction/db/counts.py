@@ -0,0 +1,100 @@
+import json
+import math
+import threading
+from time import monotonic
+from sqlalchemy import text
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+COUNT_MODES = ('exact', 'estimated', 'none')
+
+
+class OffsetPage:
+    def __init__(self, items, page, per_page, has_next, total=None, approximate=False):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+        self.total = total
+        self.approximate = approximate
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return math.ceil(self.total / self.per_page) if self.per_page else 0
+
+
+class RowCounter:
+    """Totals for admin list pages without paying for COUNT(*) on every request.
+
+    ``exact`` runs COUNT(*), but unfiltered counts are cached for ``ttl``
+    seconds and dropped as soon as the table's insert/delete counters in
+    ``pg_stat_user_tables`` move. ``estimated`` reads ``pg_class.reltuples``
+    for unfiltered lists and the planner's row estimate for filtered ones.
+    ``none`` skips the total entirely.
+    """
+
+    def __init__(self, db, ttl=30):
+        self.db = db
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _write_version(self, table_name):
+        row = self.db.session.execute(text(
+            "SELECT n_tup_ins, n_tup_del FROM pg_stat_user_tables WHERE relname = :name"
+        ), {'name': table_name}).first()
+        return tuple(row) if row else None
+
+    def _exact(self, query, table_name, filtered):
+        if filtered:
+            return query.order_by(None).count()
+        version = self._write_version(table_name)
+        now = monotonic()
+        with self._lock:
+            cached = self._cache.get(table_name)
+        if cached and cached[1] == version and cached[2] > now:
+            return cached[0]
+        total = query.order_by(None).count()
+        with self._lock:
+            self._cache[table_name] = (total, version, now + self.ttl)
+        return total
+
+    def _planner_rows(self, query):
+        compiled = query.order_by(None).statement.compile(
+            dialect=self.db.engine.dialect, compile_kwargs={'render_postcompile': True}
+        )
+        plan = self.db.session.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def _estimated(self, query, table_name, filtered):
+        if not filtered:
+            tuples = self.db.session.execute(text(
+                "SELECT reltuples FROM pg_class WHERE oid = to_regclass(:name)"
+            ), {'name': table_name}).scalar()
+            # reltuples is -1 (or 0 on older servers) until the table is first analyzed
+            if tuples and tuples > 0:
+                return int(tuples)
+        return self._planner_rows(query)
+
+    def count(self, query, table_name, mode='exact'):
+        """Returns ``(total, approximate)``; total is None for ``mode='none'``"""
+        if mode == 'none':
+            return None, False
+        filtered = query.whereclause is not None
+        if mode == 'estimated':
+            return self._estimated(query, table_name, filtered), True
+        return self._exact(query, table_name, filtered), False
+
+    def paginate(self, query, table_name, page, per_page, mode='exact'):
+        """OFFSET page whose total follows ``mode``; has_next comes from fetching one extra row"""
+        page = max(page, 1)
+        total, approximate = self.count(query, table_name, mode)
+        rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+        return OffsetPage(rows[:per_page], page, per_page, len(rows) > per_page, total, approximate)
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import Counter
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+def _env_bool(env, key, default):
+    return str(env.get(key, default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+class PoolMetrics:
+    """Thread-safe counters describing connection pool pressure"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.waiting = 0
+            self.max_waiting = 0
+            self.waits = 0
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+            self.timeouts = 0
+            self.checkouts = 0
+            self.connects = 0
+            self.checkouts_by_route = Counter()
+
+    def begin_wait(self):
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def end_wait(self, elapsed, timed_out=False):
+        with self._lock:
+            self.waiting -= 1
+            self.waits += 1
+            self.wait_time_total += elapsed
+            self.wait_time_max = max(self.wait_time_max, elapsed)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_checkout(self):
+        # Unmatched URLs share one key so scanners cannot grow the counter without bound
+        route = (request.endpoint or '<unmatched>') if has_request_context() else '<background>'
+        with self._lock:
+            self.checkouts += 1
+            self.checkouts_by_route[route] += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self, pool=None):
+        with self._lock:
+            data = {
+                'waiting': self.waiting,
+                'max_waiting': self.max_waiting,
+                'waits': self.waits,
+                'wait_time_total_ms': round(self.wait_time_total * 1000, 2),
+                'wait_time_avg_ms': round(self.wait_time_total * 1000 / self.waits, 3) if self.waits else 0.0,
+                'wait_time_max_ms': round(self.wait_time_max * 1000, 2),
+                'timeouts': self.timeouts,
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'checkouts_by_route': dict(self.checkouts_by_route.most_common())
+            }
+        if pool is not None:
+            data['pool_class'] = type(pool).__name__
+            if isinstance(pool, QueuePool):
+                data.update({
+                    'size': pool.size(),
+                    'checked_out': pool.checkedout(),
+                    'checked_in': pool.checkedin(),
+                    'overflow': pool.overflow(),
+                    'status': pool.status()
+                })
+        return data
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection.
+
+    Checkouts served from an idle connection are not waits; only those that
+    found the pool empty (and so block or open an overflow connection) count.
+    """
+
+    def _do_get(self):
+        if self.checkedin() > 0:
+            return super()._do_get()
+        pool_metrics.begin_wait()
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            pool_metrics.end_wait(time.perf_counter() - started, timed_out)
+
+
+def database_uri_from_env(env):
+    """Build the PostgreSQL URI from DB_* environment variables"""
+    driver = env.get('DB_DRIVER', 'psycopg2')
+    return (f"postgresql+{driver}://{env.get('DB_USER', 'postgres')}:{env.get('DB_PASSWORD', 'root')}"
+            f"@{env.get('DB_HOST', 'localhost')}:{env.get('DB_PORT', '5432')}/{env.get('DB_NAME', 'heart_disease_db')}")
+
+
+def engine_options_from_env(env):
+    """Build SQLALCHEMY_ENGINE_OPTIONS from DB_POOL_* environment variables.
+
+    ``DB_PGBOUNCER=true`` switches to NullPool so PgBouncer owns pooling, and
+    turns off server-side prepared statements for drivers that use them.
+    """
+    if _env_bool(env, 'DB_PGBOUNCER', False):
+        options = {'poolclass': NullPool, 'pool_pre_ping': False}
+        # psycopg (v3) prepares repeated statements server-side; psycopg2 never does
+        if env.get('DB_DRIVER', 'psycopg2') == 'psycopg':
+            options['connect_args'] = {'prepare_threshold': None}
+        return options
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(env.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(env.get('DB_MAX_OVERFLOW', 20)),
+        'pool_recycle': int(env.get('DB_POOL_RECYCLE', 1800)),
+        'pool_timeout': float(env.get('DB_POOL_TIMEOUT', 30)),
+        'pool_pre_ping': _env_bool(env, 'DB_POOL_PRE_PING', True)
+    }
+
+
+def register_pool_metrics(engine):
+    """Attach checkout/connect listeners that feed ``pool_metrics``"""
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_metrics.record_checkout()
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        pool_metrics.record_connect()
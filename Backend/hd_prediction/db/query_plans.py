@@ -0,0 +1,147 @@
+import json
+from datetime import date, datetime, timedelta
+from sqlalchemy import text
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+# Hot filters served by the indexes in migrations/versions/add_hot_query_indexes.py
+HOT_QUERIES = {
+    'prediction_history': (
+        "SELECT * FROM prediction_records WHERE user_id = :user_id "
+        "ORDER BY prediction_date DESC LIMIT 5",
+        lambda: {'user_id': 1}
+    ),
+    'active_users': (
+        "SELECT DISTINCT user_id FROM user_activities WHERE created_at >= :since",
+        lambda: {'since': datetime.utcnow() - timedelta(minutes=15)}
+    ),
+    'user_activities_by_user': (
+        "SELECT * FROM user_activities WHERE user_id = :user_id "
+        "ORDER BY created_at DESC LIMIT 20",
+        lambda: {'user_id': 1}
+    ),
+    'doctor_day_bookings': (
+        "SELECT time FROM appointments WHERE doctor_id = :doctor_id AND date = :day "
+        "AND status = 'scheduled'",
+        lambda: {'doctor_id': 1, 'day': date.today()}
+    ),
+    'latest_health_metric': (
+        "SELECT * FROM system_health WHERE metric_name = 'cpu_usage' "
+        "ORDER BY recorded_at DESC LIMIT 1",
+        lambda: {}
+    ),
+    'admin_activity_logs': (
+        "SELECT * FROM admin_activity_logs ORDER BY created_at DESC LIMIT 20",
+        lambda: {}
+    ),
+}
+
+
+def find_seq_scans(plan):
+    """Yield (relation, estimated_rows) for every Seq Scan node in an EXPLAIN JSON plan"""
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan.get('Relation Name'), plan.get('Plan Rows', 0)
+    for child in plan.get('Plans', []):
+        yield from find_seq_scans(child)
+
+
+def table_row_estimates(session):
+    rows = session.execute(text(
+        "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' "
+        "AND relnamespace = 'public'::regnamespace"
+    ))
+    return {name: int(max(tuples, 0)) for name, tuples in rows}
+
+
+def check_query_plans(session, threshold=10000, queries=None):
+    """EXPLAIN each hot query and flag sequential scans over tables above ``threshold`` rows.
+
+    Returns a list of dicts with the query name, the seq-scanned relations and
+    whether the plan passed.
+    """
+    estimates = table_row_estimates(session)
+    results = []
+    for name, (sql, params) in (queries or HOT_QUERIES).items():
+        plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params()).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]['Plan']
+        offending = [relation for relation, _ in find_seq_scans(root)
+                     if estimates.get(relation, 0) >= threshold]
+        results.append({
+            'query': name,
+            'passed': not offending,
+            'seq_scans': offending,
+            'total_cost': root.get('Total Cost'),
+            'node_type': root.get('Node Type')
+        })
+    return results
+
+
+def seed_hot_tables(session, rows):
+    """Insert ``rows`` synthetic rows into each hot table with generate_series.
+
+    Meant to run inside a transaction that the caller rolls back, so the
+    planner sees realistic table sizes without leaving data behind. The raw
+    inserts bypass the appointment counters (AppointmentStats); that is only
+    safe because of the rollback. Run ``flask rebuild-appointment-counters``
+    if seeded rows are ever committed.
+    """
+    users = max(rows // 100, 10)
+    doctors = max(rows // 1000, 10)
+    params = {'rows': rows, 'users': users, 'doctors': doctors}
+    statements = [
+        "INSERT INTO users (email, password_hash, full_name, created_at, updated_at) "
+        "SELECT 'plan-check-' || g || '@example.invalid', 'x', 'Plan Check ' || g, now(), now() "
+        "FROM generate_series(1, :users) g",
+        "INSERT INTO admins (email, password_hash, full_name, created_at) "
+        "VALUES ('plan-check-admin@example.invalid', 'x', 'Plan Check', now())",
+        "INSERT INTO doctors (\"fullName\", specialization, qualifications, experience, hospital, address, "
+        "city, area, \"phoneNumber\", email, password_hash, availability, rating, \"totalAppointments\", "
+        "reviews, \"consultationFee\", created_at, updated_at) "
+        "SELECT 'Dr. Plan ' || g, 'Cardiology', 'MD', g % 30, 'Plan Hospital', 'Plan Street', 'Plan City', "
+        "'Area ' || (g % 20), '000', 'plan-check-doctor-' || g || '@example.invalid', 'x', "
+        "'{\"days\": [\"Monday\"], \"startTime\": \"09:00\", \"endTime\": \"17:00\"}', 4.0, 0, 0, 0, now(), now() "
+        "FROM generate_series(1, :doctors) g",
+    ]
+    for statement in statements:
+        session.execute(text(statement), params)
+
+    params['min_user'] = session.execute(text(
+        "SELECT min(id) FROM users WHERE email LIKE 'plan-check-%@example.invalid'")).scalar()
+    params['min_doctor'] = session.execute(text(
+        "SELECT min(id) FROM doctors WHERE email LIKE 'plan-check-doctor-%@example.invalid'")).scalar()
+    params['admin_id'] = session.execute(text(
+        "SELECT id FROM admins WHERE email = 'plan-check-admin@example.invalid'")).scalar()
+
+    # Appointments: each doctor's n-th row takes its n-th 30-minute slot (16 a day), so
+    # (doctor_id, date, time) never repeats and uq_appointments_doctor_slot_scheduled holds
+    statements = [
+        "INSERT INTO prediction_records (user_id, prediction_date, age, sex, cp, trestbps, chol, fbs, "
+        "restecg, thalach, exang, oldpeak, slope, predicted_class, probability_score) "
+        "SELECT :min_user + (g % :users), now() - make_interval(mins => g), 50, g % 2, g % 4, 120, 200, 0, "
+        "0, 150, 0, 1.0, 1, g % 2, random() FROM generate_series(1, :rows) g",
+        "INSERT INTO user_activities (user_id, activity_type, activity_details, created_at) "
+        "SELECT :min_user + (g % :users), 'login', 'plan check', now() - make_interval(mins => g) "
+        "FROM generate_series(1, :rows) g",
+        "INSERT INTO admin_activity_logs (admin_id, action_type, action_details, created_at) "
+        "SELECT :admin_id, 'login', 'plan check', now() - make_interval(mins => g) "
+        "FROM generate_series(1, :rows) g",
+        "INSERT INTO appointments (user_id, doctor_id, date, time, reason, status, created_at, updated_at) "
+        "SELECT :min_user + (g % :users), :min_doctor + (g % :doctors), current_date + (g / :doctors) / 16, "
+        "time '09:00' + make_interval(mins => 30 * ((g / :doctors) % 16)), 'plan check', "
+        "(ARRAY['scheduled', 'completed', 'cancelled'])[1 + g % 3], now(), now() "
+        "FROM generate_series(1, :rows) g",
+        "INSERT INTO system_health (metric_name, metric_value, status, details, recorded_at) "
+        "SELECT (ARRAY['cpu_usage', 'memory_usage', 'disk_usage', 'active_users'])[1 + g % 4], "
+        "random() * 100, 'healthy', 'plan check', now() - make_interval(mins => g) "
+        "FROM generate_series(1, :rows) g",
+    ]
+    for statement in statements:
+        session.execute(text(statement), params)
+
+    for table in ('users', 'doctors', 'prediction_records', 'user_activities',
+                  'admin_activity_logs', 'appointments', 'system_health'):
+        session.execute(text(f"ANALYZE {table}"))
+    logger.info(f"Seeded {rows} rows per hot table for query plan checks")
@@ -0,0 +1,31 @@
+from sqlalchemy import func, literal, text
+
+# Indexed by migrations/versions/add_doctor_trigram_indexes.py (pg_trgm GIN)
+LIKE_ESCAPE = '\\'
+
+
+def escape_like(term):
+    """Escape LIKE wildcards so user input is matched literally"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def contains(column, term):
+    """Case-insensitive substring filter; served by a gin_trgm_ops index on ``column``"""
+    return column.ilike(f'%{escape_like(term)}%', escape=LIKE_ESCAPE)
+
+
+def has_extension(connection, name):
+    """Whether the Postgres extension ``name`` is installed in the connected database"""
+    return connection.execute(
+        text('SELECT 1 FROM pg_extension WHERE extname = :name'), {'name': name}
+    ).first() is not None
+
+
+def rank(term, *columns):
+    """Trigram relevance (needs pg_trgm) of ``term`` against the best-matching extent of each column, summed"""
+    term = literal(term)
+    score = None
+    for column in columns:
+        similarity = func.word_similarity(term, func.coalesce(column, ''))
+        score = similarity if score is None else score + similarity
+    return score
@@ -4,6 +4,7 @@ from .custom_exceptions import (
     AuthenticationError,
     PredictionError,
     DatabaseError,
+    ConflictError,
     ResourceNotFoundError
 )
 from .error_handlers import register_error_handlers
@@ -14,6 +15,7 @@ __all__ = [
     'AuthenticationError',
     'PredictionError',
     'DatabaseError',
+    'ConflictError',
     'ResourceNotFoundError',
     'register_error_handlers'
 ] 
\ No newline at end of file
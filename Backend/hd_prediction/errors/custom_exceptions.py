@@ -32,6 +32,11 @@ class DatabaseError(HeartDiseaseError):
     def __init__(self, message, payload=None):
         super().__init__(message, status_code=500, payload=payload)
 
+class ConflictError(HeartDiseaseError):
+    """Raised when a write conflicts with the current state of a resource"""
+    def __init__(self, message, payload=None):
+        super().__init__(message, status_code=409, payload=payload)
+
 class ResourceNotFoundError(HeartDiseaseError):
     """Raised when a requested resource is not found"""
     def __init__(self, message, payload=None):
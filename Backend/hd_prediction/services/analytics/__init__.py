@@ -1,3 +1,4 @@
 from .user_analytics import UserAnalytics as AnalyticsService
+from .rollups import PredictionRollupService, AGE_BANDS
 
-__all__ = ['AnalyticsService'] 
\ No newline at end of file
+__all__ = ['AnalyticsService', 'PredictionRollupService', 'AGE_BANDS']
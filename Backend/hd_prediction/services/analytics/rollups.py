@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.postgresql import insert
+from ...logging import get_logger
+
+logger = get_logger(__name__)
+
+# (rollup column, lower bound inclusive, upper bound exclusive)
+AGE_BANDS = (
+    ('age_under_40', None, 40),
+    ('age_40_54', 40, 55),
+    ('age_55_64', 55, 65),
+    ('age_65_plus', 65, None),
+)
+
+ROLLUP_COUNTERS = (
+    'prediction_count', 'probability_count', 'high_risk_count', 'medium_risk_count',
+    'low_risk_count', 'male_count', 'female_count'
+) + tuple(band for band, _, _ in AGE_BANDS)
+
+
+class PredictionRollupService:
+    """Maintains one ``prediction_daily_rollup`` row per day of predictions.
+
+    Days are recomputed in full from ``prediction_records`` and upserted, so a
+    refresh is idempotent. ``refresh`` touches the days that received rows
+    with an id above the highest id already rolled up, plus the trailing
+    ``trailing_days``: ids are assigned at insert but become visible at
+    commit, so a slow transaction can land below the watermark.
+    """
+
+    def __init__(self, db, record_model, rollup_model, trailing_days=2):
+        self.db = db
+        self.Record = record_model
+        self.Rollup = rollup_model
+        self.trailing_days = trailing_days
+
+    def _aggregates(self):
+        Record = self.Record
+        prob = Record.probability_score
+        count = func.count(Record.id)
+        # Risk bands follow PredictionRecord.risk_summary, which bands the rounded percentage
+        percentage = func.round(prob * 100)
+        high = or_(percentage >= 70, (prob.is_(None)) & (Record.predicted_class == 1))
+        low = or_(percentage < 40, (prob.is_(None)) & (Record.predicted_class != 1))
+        columns = [
+            count.label('prediction_count'),
+            func.coalesce(func.sum(prob), 0.0).label('probability_sum'),
+            func.count(prob).label('probability_count'),
+            count.filter(high).label('high_risk_count'),
+            count.filter((percentage >= 40) & (percentage < 70)).label('medium_risk_count'),
+            count.filter(low).label('low_risk_count'),
+            count.filter(Record.sex == 1).label('male_count'),
+            count.filter(Record.sex == 0).label('female_count'),
+        ]
+        for band, lower, upper in AGE_BANDS:
+            conditions = []
+            if lower is not None:
+                conditions.append(Record.age >= lower)
+            if upper is not None:
+                conditions.append(Record.age < upper)
+            columns.append(count.filter(*conditions).label(band))
+        columns.append(func.max(Record.id).label('max_record_id'))
+        return columns
+
+    def aggregate(self, start, end, days=None):
+        """Aggregate raw predictions per day for ``start <= prediction_date < end``"""
+        Record = self.Record
+        day = func.date(Record.prediction_date).label('day')
+        query = self.db.session.query(day, *self._aggregates()).filter(
+            Record.prediction_date >= start,
+            Record.prediction_date < end
+        )
+        if days is not None:
+            query = query.filter(func.date(Record.prediction_date).in_(days))
+        return [row._asdict() for row in query.group_by(day).order_by(day).all()]
+
+    def _upsert(self, rows):
+        if not rows:
+            return
+        now = datetime.utcnow()
+        values = [dict(row, updated_at=now) for row in rows]
+        statement = insert(self.Rollup.__table__).values(values)
+        updates = {name: statement.excluded[name] for name in values[0] if name != 'day'}
+        self.db.session.execute(statement.on_conflict_do_update(index_elements=['day'], set_=updates))
+
+    def refresh(self):
+        """Roll up the days that received new predictions since the last run, plus the trailing days"""
+        watermark = self.db.session.query(func.coalesce(func.max(self.Rollup.max_record_id), 0)).scalar()
+        changed = {row[0] for row in self.db.session.query(
+            func.date(self.Record.prediction_date)
+        ).filter(self.Record.id > watermark).distinct().all()}
+        today = datetime.utcnow().date()
+        changed.update(today - timedelta(days=offset) for offset in range(self.trailing_days))
+        changed = sorted(changed)
+        if not changed:
+            return []
+        start = datetime.combine(min(changed), datetime.min.time())
+        end = datetime.combine(max(changed), datetime.min.time()) + timedelta(days=1)
+        self._upsert(self.aggregate(start, end, days=changed))
+        self.db.session.commit()
+        logger.info(f"Prediction rollup refreshed for {len(changed)} day(s)")
+        return changed
+
+    def backfill(self, start=None, end=None, chunk_days=31):
+        """Recompute every day in ``[start, end)`` in chunks; defaults to all history"""
+        if start is None:
+            first = self.db.session.query(func.min(self.Record.prediction_date)).scalar()
+            if first is None:
+                return 0
+            start = datetime.combine(first.date(), datetime.min.time())
+        if end is None:
+            end = datetime.combine(datetime.utcnow().date(), datetime.min.time()) + timedelta(days=1)
+        processed = 0
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days), end)
+            rows = self.aggregate(chunk_start, chunk_end)
+            self._upsert(rows)
+            self.db.session.commit()
+            processed += len(rows)
+            chunk_start = chunk_end
+        logger.info(f"Prediction rollup backfilled {processed} day(s)")
+        return processed
+
+    def daily_series(self, since):
+        """Rolled-up days from ``since`` (a datetime) merged with today's live partial aggregate"""
+        today_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        rows = [row.to_dict() for row in self.Rollup.query.filter(
+            self.Rollup.day >= since.date(),
+            self.Rollup.day < today_start.date()
+        ).order_by(self.Rollup.day).all()]
+        for row in self.aggregate(max(since, today_start), today_start + timedelta(days=1)):
+            row['day'] = row['day'].isoformat()
+            row.pop('max_record_id')
+            rows.append(row)
+        return rows
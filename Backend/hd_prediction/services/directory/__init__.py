@@ -0,0 +1,6 @@
+from .doctor_directory import DoctorDirectory, normalize, AUTOCOMPLETE_FIELDS
+from .autocomplete import PrefixIndex
+from .geo import NearestDoctorIndex, bounding_box, EARTH_RADIUS_KM
+
+__all__ = ['DoctorDirectory', 'normalize', 'AUTOCOMPLETE_FIELDS', 'PrefixIndex',
+           'NearestDoctorIndex', 'bounding_box', 'EARTH_RADIUS_KM']
@@ -0,0 +1,53 @@
+import heapq
+from bisect import bisect_left
+from collections import Counter
+
+
+class PrefixIndex:
+    """Sorted-array prefix index over distinct values weighted by doctor count.
+
+    ``counts`` maps display values to the number of doctors carrying them.
+    Values are grouped by ``normalize`` so case and accent variants share one
+    entry (displayed in their most common spelling), and every word start is
+    indexed, so "mum" finds both "Mumbai" and "Navi Mumbai".
+    """
+
+    def __init__(self, counts, normalize):
+        self.normalize = normalize
+        totals = Counter()
+        spellings = {}
+        for value, count in counts.items():
+            key = normalize(value)
+            if not key:
+                continue
+            totals[key] += count
+            best = spellings.get(key)
+            if best is None or count > counts[best]:
+                spellings[key] = value
+        self.entries = {key: (spellings[key], total) for key, total in totals.items()}
+        suffixes = []
+        for key in totals:
+            words = key.split(' ')
+            for start in range(len(words)):
+                suffixes.append((' '.join(words[start:]), key))
+        suffixes.sort()
+        self.suffixes = suffixes
+        self.sorted_keys = [suffix for suffix, _ in suffixes]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def complete(self, prefix, limit=10):
+        """Top ``limit`` (value, doctor_count) pairs having a word starting with ``prefix``"""
+        prefix = self.normalize(prefix)
+        if not prefix:
+            candidates = self.entries
+        else:
+            start = bisect_left(self.sorted_keys, prefix)
+            candidates = {}
+            for suffix, key in self.suffixes[start:]:
+                if not suffix.startswith(prefix):
+                    break
+                candidates[key] = self.entries[key]
+        top = heapq.nlargest(limit, candidates.values(), key=lambda entry: (entry[1], entry[0]))
+        return [{'value': value, 'count': count} for value, count in top]
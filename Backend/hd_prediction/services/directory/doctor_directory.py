@@ -0,0 +1,187 @@
+import threading
+import unicodedata
+from collections import Counter
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from ...logging import get_logger
+from .geo import NearestDoctorIndex
+from .autocomplete import PrefixIndex
+
+logger = get_logger(__name__)
+
+_DIRTY_KEY = 'doctor_directory_dirty'
+
+AUTOCOMPLETE_FIELDS = ('city', 'area', 'specialization')
+
+
+def normalize(value):
+    """Case-fold, strip accents and collapse whitespace for matching"""
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().split())
+
+
+class _Snapshot:
+    """Immutable view of the directory; readers never see a half-built index"""
+
+    def __init__(self, doctors, version):
+        self.version = version
+        self.doctors = {doctor['id']: doctor for doctor in doctors}
+        self.by_city = {}
+        self.by_area = {}
+        self.by_specialization = {}
+        tree = {}
+        for doctor in doctors:
+            self.by_city.setdefault(normalize(doctor['city']), set()).add(doctor['id'])
+            self.by_area.setdefault(normalize(doctor['area']), set()).add(doctor['id'])
+            self.by_specialization.setdefault(normalize(doctor['specialization']), set()).add(doctor['id'])
+            tree.setdefault(doctor['city'], set()).add(doctor['area'])
+        self.locations = {city: sorted(areas) for city, areas in sorted(tree.items())}
+        self.geo = NearestDoctorIndex(doctors)
+        self.prefixes = {
+            field: PrefixIndex(Counter(doctor[field] for doctor in doctors if doctor[field]), normalize)
+            for field in AUTOCOMPLETE_FIELDS
+        }
+
+    @staticmethod
+    def _containing(index, needle):
+        """Ids whose indexed value contains ``needle`` (same semantics as ILIKE '%needle%')"""
+        ids = set()
+        for key, members in index.items():
+            if needle in key:
+                ids |= members
+        return ids
+
+
+class DoctorDirectory:
+    """Per-worker in-memory index over the doctors table.
+
+    ``loader`` returns the public doctor dicts (``Doctor.to_dict``) and
+    ``version_func`` a cheap version stamp of the table. Each snapshot holds
+    inverted indexes on normalized city, area and specialization plus the
+    city -> areas location tree, so the search, suggest and locations
+    endpoints are served without a database round trip. Commits that touch
+    a watched model mark the index stale and the next read rebuilds it; a
+    periodic ``refresh()`` compares versions to pick up other workers' writes.
+    """
+
+    def __init__(self, loader, version_func):
+        self.loader = loader
+        self.version_func = version_func
+        self._snapshot = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._ensure().version
+
+    def watch(self, model, ignore=()):
+        """Mark the directory stale after any commit that inserted, updated or deleted ``model`` rows.
+
+        Updates that only change attributes in ``ignore`` (e.g. ``last_login``) are not a change.
+        """
+        ignore = frozenset(ignore)
+
+        def flag(mapper, connection, target):
+            session = object_session(target)
+            if session is not None:
+                session.info[_DIRTY_KEY] = True
+
+        def flag_update(mapper, connection, target):
+            changed = {attr.key for attr in inspect(target).attrs if attr.history.has_changes()}
+            if changed - ignore:
+                flag(mapper, connection, target)
+
+        event.listen(model, 'after_insert', flag)
+        event.listen(model, 'after_update', flag_update)
+        event.listen(model, 'after_delete', flag)
+
+        @event.listens_for(Session, 'after_commit')
+        def after_commit(session):
+            if session.info.pop(_DIRTY_KEY, False):
+                self.mark_stale()
+
+        @event.listens_for(Session, 'after_rollback')
+        def after_rollback(session):
+            session.info.pop(_DIRTY_KEY, None)
+
+    def mark_stale(self):
+        self._stale = True
+
+    def _build(self):
+        # Caller holds the lock. Clear first so a commit landing mid-build marks the new snapshot stale again
+        self._stale = False
+        try:
+            version = self.version_func()
+            snapshot = _Snapshot(self.loader(), version)
+        except Exception:
+            self._stale = True
+            raise
+        self._snapshot = snapshot
+        logger.info(f"Doctor directory rebuilt: {len(snapshot.doctors)} doctors (version {snapshot.version})")
+        return snapshot
+
+    def rebuild(self):
+        with self._lock:
+            return self._build()
+
+    def _rebuild_after(self, seen):
+        """Rebuild unless another thread already replaced ``seen`` with a fresh snapshot while we waited"""
+        with self._lock:
+            current = self._snapshot
+            if current is not None and current is not seen and not self._stale:
+                return current
+            return self._build()
+
+    def refresh(self):
+        """Rebuild if the table changed behind this worker's back; returns True if rebuilt"""
+        snapshot = self._snapshot
+        if snapshot is None or self._stale or self.version_func() != snapshot.version:
+            return self._rebuild_after(snapshot) is not snapshot
+        return False
+
+    def _ensure(self):
+        snapshot = self._snapshot
+        if snapshot is None or self._stale:
+            snapshot = self._rebuild_after(snapshot)
+        return snapshot
+
+    def search(self, city, area=None, specialization=None):
+        """Doctors whose city (and optionally area/specialization) contain the given text, by id"""
+        snapshot = self._ensure()
+        ids = snapshot._containing(snapshot.by_city, normalize(city))
+        if area and ids:
+            ids &= snapshot._containing(snapshot.by_area, normalize(area))
+        if specialization and ids:
+            ids &= snapshot._containing(snapshot.by_specialization, normalize(specialization))
+        return [snapshot.doctors[doctor_id] for doctor_id in sorted(ids)]
+
+    def nearby(self, lat, lng, k, radius_km=None):
+        """The ``k`` doctors closest to (lat, lng), within ``radius_km`` if given, with ``distance_km``"""
+        snapshot = self._ensure()
+        return [dict(snapshot.doctors[doctor_id], distance_km=round(distance, 3))
+                for doctor_id, distance in snapshot.geo.nearest(lat, lng, k, radius_km)]
+
+    def autocomplete(self, field, prefix, limit=10):
+        """Distinct ``field`` values with a word starting with ``prefix``, most doctors first"""
+        return self._ensure().prefixes[field].complete(prefix, limit)
+
+    def get(self, doctor_id):
+        return self._ensure().doctors.get(doctor_id)
+
+    def locations(self):
+        return self._ensure().locations
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'built': snapshot is not None,
+            'stale': self._stale,
+            'version': snapshot.version if snapshot else None,
+            'doctors': len(snapshot.doctors) if snapshot else 0,
+            'cities': len(snapshot.by_city) if snapshot else 0,
+            'located': len(snapshot.geo) if snapshot else 0
+        }
@@ -0,0 +1,49 @@
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class NearestDoctorIndex:
+    """Ball tree over doctor coordinates using the haversine metric.
+
+    Built once per directory snapshot from the doctors that have both a
+    latitude and a longitude; queries return ``(doctor_id, distance_km)``
+    pairs nearest first.
+    """
+
+    def __init__(self, doctors):
+        located = [doctor for doctor in doctors
+                   if doctor.get('latitude') is not None and doctor.get('longitude') is not None]
+        self.ids = np.array([doctor['id'] for doctor in located], dtype=np.int64)
+        self.tree = None
+        if located:
+            points = np.radians([[doctor['latitude'], doctor['longitude']] for doctor in located])
+            self.tree = BallTree(points, metric='haversine')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nearest(self, lat, lng, k, radius_km=None):
+        if self.tree is None or k < 1:
+            return []
+        distances, indexes = self.tree.query(np.radians([[lat, lng]]), k=min(k, len(self.ids)))
+        results = []
+        for distance, index in zip(distances[0] * EARTH_RADIUS_KM, indexes[0]):
+            if radius_km is not None and distance > radius_km:
+                break
+            results.append((int(self.ids[index]), float(distance)))
+        return results
+
+
+def bounding_box(lat, lng, radius_km):
+    """(min_lat, max_lat, min_lng, max_lng) enclosing the radius; longitude is None near the poles/antimeridian"""
+    # Plain floats: numpy scalars would otherwise end up as SQL parameters
+    delta_lat = float(np.degrees(radius_km / EARTH_RADIUS_KM))
+    min_lat, max_lat = max(lat - delta_lat, -90.0), min(lat + delta_lat, 90.0)
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return min_lat, max_lat, None, None
+    delta_lng = float(np.degrees(radius_km / (EARTH_RADIUS_KM * np.cos(np.radians(lat)))))
+    if lng - delta_lng < -180.0 or lng + delta_lng > 180.0:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, float(lng - delta_lng), float(lng + delta_lng)
@@ -0,0 +1,7 @@
+from .readiness import ReadinessProbe
+from .health_store import HealthMetricStore, HEALTH_STATUSES
+from .retention import HealthRetention, RESOLUTIONS
+from .collector import MetricsCollector
+
+__all__ = ['ReadinessProbe', 'HealthMetricStore', 'HEALTH_STATUSES', 'HealthRetention', 'RESOLUTIONS',
+           'MetricsCollector']
@@ -0,0 +1,83 @@
+import threading
+from collections import deque
+from datetime import datetime
+from ...logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class MetricsCollector:
+    """Samples health metrics into memory and flushes them in batches.
+
+    ``sampler`` returns a list of sample dicts (metric_name, metric_value,
+    status, details). Every ``sample()`` call appends them to a bounded ring
+    buffer, which serves the health endpoints without touching the database,
+    and to a pending batch that ``flush()`` writes through ``store.record``
+    as one multi-row insert.
+    """
+
+    def __init__(self, sampler, store, capacity=1000, max_pending=10000):
+        self.sampler = sampler
+        self.store = store
+        self.buffer = deque(maxlen=capacity)
+        self.pending = deque(maxlen=max_pending)
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def sample(self):
+        now = datetime.utcnow()
+        samples = [dict(sample, recorded_at=now) for sample in self.sampler()]
+        with self._lock:
+            for sample in samples:
+                self.buffer.append(sample)
+                self.pending.append(sample)
+                self._latest[sample['metric_name']] = sample
+        return samples
+
+    def flush(self):
+        """Write pending samples in one batch; keeps them queued if the write fails"""
+        with self._lock:
+            batch = list(self.pending)
+            self.pending.clear()
+        if not batch:
+            return 0
+        try:
+            return self.store.record(batch)
+        except Exception:
+            with self._lock:
+                # Put the batch back ahead of newer samples; a bounded deque trims from the
+                # left, so the oldest samples drop off first if the database stays unavailable
+                self.pending = deque(batch + list(self.pending), maxlen=self.pending.maxlen)
+            raise
+
+    @staticmethod
+    def _to_dict(sample):
+        return {
+            'metricName': sample['metric_name'],
+            'metricValue': sample['metric_value'],
+            'status': sample['status'],
+            'details': sample.get('details'),
+            'recordedAt': sample['recorded_at'].isoformat()
+        }
+
+    def latest(self):
+        """Most recent sample per metric, in the same shape as SystemHealth.to_dict"""
+        with self._lock:
+            return {name: self._to_dict(sample) for name, sample in self._latest.items()}
+
+    def latest_value(self, metric_name):
+        with self._lock:
+            sample = self._latest.get(metric_name)
+        return sample['metric_value'] if sample else None
+
+    def recent(self, metric_name=None, limit=100):
+        """Newest-first samples from the ring buffer, optionally for one metric"""
+        with self._lock:
+            samples = list(self.buffer)
+        if metric_name:
+            samples = [sample for sample in samples if sample['metric_name'] == metric_name]
+        return [self._to_dict(sample) for sample in reversed(samples[-limit:])]
+
+    def stats(self):
+        with self._lock:
+            return {'buffered': len(self.buffer), 'capacity': self.buffer.maxlen, 'pending': len(self.pending)}
@@ -0,0 +1,87 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import insert as sa_insert
+from sqlalchemy.dialects.postgresql import insert
+from ...logging import get_logger
+
+logger = get_logger(__name__)
+
+HEALTH_STATUSES = ('healthy', 'warning', 'critical')
+
+
+class HealthMetricStore:
+    """Writes system_health samples and keeps the read models in step.
+
+    Every batch goes into the raw ``system_health`` history and updates
+    ``system_health_current`` (latest sample per metric) and
+    ``system_health_status_counts`` (rows per status) in the same transaction.
+    The health endpoints therefore never scan the history.
+    """
+
+    def __init__(self, db, sample_model, current_model, counter_model):
+        self.db = db
+        self.Sample = sample_model
+        self.Current = current_model
+        self.Counter = counter_model
+
+    def record(self, samples, commit=True):
+        """Persist a batch of sample dicts (metric_name, metric_value, status, details, recorded_at)"""
+        if not samples:
+            return 0
+        now = datetime.utcnow()
+        rows = [dict(sample, recorded_at=sample.get('recorded_at') or now) for sample in samples]
+        session = self.db.session
+
+        # One multi-row INSERT for the raw history
+        session.execute(sa_insert(self.Sample.__table__), rows)
+
+        latest = {}
+        for row in rows:
+            current = latest.get(row['metric_name'])
+            if current is None or row['recorded_at'] >= current['recorded_at']:
+                latest[row['metric_name']] = row
+        statement = insert(self.Current.__table__).values([
+            {key: row.get(key) for key in ('metric_name', 'metric_value', 'status', 'details', 'recorded_at')}
+            for row in latest.values()
+        ])
+        table = self.Current.__table__
+        session.execute(statement.on_conflict_do_update(
+            index_elements=['metric_name'],
+            set_={key: statement.excluded[key] for key in ('metric_value', 'status', 'details', 'recorded_at')},
+            where=table.c.recorded_at <= statement.excluded.recorded_at
+        ))
+
+        self.adjust_status_counts(Counter(row['status'] for row in rows))
+        if commit:
+            session.commit()
+        return len(rows)
+
+    def adjust_status_counts(self, deltas):
+        """Add (or, with negative deltas, remove) rows from the per-status counters"""
+        deltas = {status: delta for status, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        statement = insert(self.Counter.__table__).values([
+            {'status': status, 'count': delta} for status, delta in deltas.items()
+        ])
+        table = self.Counter.__table__
+        self.db.session.execute(statement.on_conflict_do_update(
+            index_elements=['status'],
+            set_={'count': table.c.count + statement.excluded['count']}
+        ))
+
+    def latest(self):
+        """Latest sample per metric; falls back to DISTINCT ON over the history if the read model is empty"""
+        current = self.Current.query.all()
+        if current:
+            return {row.metric_name: row.to_dict() for row in current}
+        Sample = self.Sample
+        rows = Sample.query.distinct(Sample.metric_name)\
+            .order_by(Sample.metric_name, Sample.recorded_at.desc()).all()
+        return {row.metric_name: row.to_dict() for row in rows}
+
+    def status_summary(self):
+        summary = {status: 0 for status in HEALTH_STATUSES}
+        for row in self.Counter.query.all():
+            summary[row.status] = row.count
+        return summary
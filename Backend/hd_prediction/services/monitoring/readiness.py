@@ -0,0 +1,67 @@
+import threading
+import time
+from datetime import datetime
+from ...logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ReadinessProbe:
+    """Cached database readiness flag refreshed by a cheap periodic probe.
+
+    ``probe_func`` should run something trivial such as ``SELECT 1`` and raise on
+    failure. Requests only read the cached flag; while the flag is down, a
+    request may trigger a re-probe at most once every ``retry_interval`` seconds
+    so the service recovers without waiting for the next scheduled probe.
+    """
+
+    def __init__(self, probe_func, retry_interval=5):
+        self.probe_func = probe_func
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._ready = False
+        self._last_checked = 0.0
+        self._last_checked_at = None
+        self._last_error = None
+        self._latency_ms = None
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def check(self):
+        """Run the probe now and update the cached flag"""
+        started = time.perf_counter()
+        try:
+            self.probe_func()
+            ready, error = True, None
+        except Exception as e:
+            ready, error = False, str(e)
+        with self._lock:
+            if ready != self._ready:
+                if ready:
+                    logger.info("Database readiness probe succeeded")
+                else:
+                    logger.error(f"Database readiness probe failed: {error}")
+            self._ready = ready
+            self._last_error = error
+            self._last_checked = time.monotonic()
+            self._last_checked_at = datetime.utcnow()
+            self._latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        return ready
+
+    def ensure(self):
+        """Return the cached flag, re-probing only when down and the retry interval elapsed"""
+        if self._ready:
+            return True
+        if time.monotonic() - self._last_checked >= self.retry_interval:
+            return self.check()
+        return False
+
+    def status(self):
+        return {
+            'ready': self._ready,
+            'last_checked': self._last_checked_at.isoformat() if self._last_checked_at else None,
+            'latency_ms': self._latency_ms,
+            'error': self._last_error
+        }
@@ -0,0 +1,180 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from ...logging import get_logger
+
+logger = get_logger(__name__)
+
+RESOLUTIONS = ('raw', 'hour', 'day')
+
+
+def _truncate(moment, resolution):
+    if resolution == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class HealthRetention:
+    """Downsamples and expires the system_health time series.
+
+    Raw samples older than ``raw_days`` are folded into hourly min/avg/max
+    buckets, and hourly buckets older than ``hourly_days`` into daily ones.
+    Daily buckets are kept. Each batch of at most ``batch_size`` rows is
+    aggregated, merged into the coarser buckets and deleted in its own
+    transaction, so a run never holds long locks and a crash never counts a
+    row twice.
+    """
+
+    def __init__(self, db, sample_model, rollup_model, store, raw_days=7, hourly_days=90, batch_size=5000):
+        self.db = db
+        self.Sample = sample_model
+        self.Rollup = rollup_model
+        self.store = store
+        self.raw_days = raw_days
+        self.hourly_days = hourly_days
+        self.batch_size = batch_size
+
+    def _merge(self, buckets):
+        """Upsert (resolution, metric, bucket) aggregates, combining with existing buckets"""
+        if not buckets:
+            return
+        table = self.Rollup.__table__
+        statement = insert(table).values([
+            {'resolution': resolution, 'metric_name': metric, 'bucket_start': bucket,
+             'min_value': agg['min'], 'max_value': agg['max'], 'avg_value': agg['sum'] / agg['count'],
+             'sample_count': agg['count']}
+            for (resolution, metric, bucket), agg in buckets.items()
+        ])
+        excluded = statement.excluded
+        total = table.c.sample_count + excluded.sample_count
+        self.db.session.execute(statement.on_conflict_do_update(
+            index_elements=['resolution', 'metric_name', 'bucket_start'],
+            set_={
+                'min_value': func.least(table.c.min_value, excluded.min_value),
+                'max_value': func.greatest(table.c.max_value, excluded.max_value),
+                'avg_value': (table.c.avg_value * table.c.sample_count
+                              + excluded.avg_value * excluded.sample_count) / total,
+                'sample_count': total
+            }
+        ))
+
+    @staticmethod
+    def _accumulate(buckets, key, low, high, total, count):
+        agg = buckets.get(key)
+        if agg is None:
+            buckets[key] = {'min': low, 'max': high, 'sum': total, 'count': count}
+        else:
+            agg['min'] = min(agg['min'], low)
+            agg['max'] = max(agg['max'], high)
+            agg['sum'] += total
+            agg['count'] += count
+
+    def _downsample_raw_batch(self, cutoff):
+        Sample = self.Sample
+        rows = self.db.session.query(
+            Sample.id, Sample.metric_name, Sample.metric_value, Sample.status, Sample.recorded_at
+        ).filter(Sample.recorded_at < cutoff).order_by(Sample.id).limit(self.batch_size).all()
+        if not rows:
+            return 0
+        buckets = {}
+        for row in rows:
+            key = ('hour', row.metric_name, _truncate(row.recorded_at, 'hour'))
+            self._accumulate(buckets, key, row.metric_value, row.metric_value, row.metric_value, 1)
+        self._merge(buckets)
+        Sample.query.filter(Sample.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        # Keep the per-status counters equal to the rows left in system_health
+        removed = Counter(row.status for row in rows)
+        self.store.adjust_status_counts({status: -count for status, count in removed.items()})
+        self.db.session.commit()
+        return len(rows)
+
+    def _downsample_hourly_batch(self, cutoff):
+        Rollup = self.Rollup
+        rows = Rollup.query.filter(
+            Rollup.resolution == 'hour', Rollup.bucket_start < cutoff
+        ).order_by(Rollup.id).limit(self.batch_size).all()
+        if not rows:
+            return 0
+        buckets = {}
+        for row in rows:
+            key = ('day', row.metric_name, _truncate(row.bucket_start, 'day'))
+            self._accumulate(buckets, key, row.min_value, row.max_value,
+                             row.avg_value * row.sample_count, row.sample_count)
+        self._merge(buckets)
+        Rollup.query.filter(Rollup.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        self.db.session.commit()
+        return len(rows)
+
+    def run(self, max_batches=100):
+        """Apply the retention policy; returns how many raw and hourly rows were folded"""
+        now = datetime.utcnow()
+        # Whole hours/days only, so a bucket is never split across runs mid-way
+        raw_cutoff = _truncate(now - timedelta(days=self.raw_days), 'hour')
+        hourly_cutoff = _truncate(now - timedelta(days=self.hourly_days), 'day')
+        result = {'raw': 0, 'hourly': 0}
+        for _ in range(max_batches):
+            folded = self._downsample_raw_batch(raw_cutoff)
+            result['raw'] += folded
+            if folded < self.batch_size:
+                break
+        for _ in range(max_batches):
+            folded = self._downsample_hourly_batch(hourly_cutoff)
+            result['hourly'] += folded
+            if folded < self.batch_size:
+                break
+        if result['raw'] or result['hourly']:
+            logger.info(f"System health retention folded {result['raw']} raw and {result['hourly']} hourly rows")
+        return result
+
+    def pick_resolution(self, start, end):
+        """Finest resolution that still covers ``start`` and keeps the series small"""
+        now = datetime.utcnow()
+        span = end - start
+        if span <= timedelta(days=2) and start >= now - timedelta(days=self.raw_days):
+            return 'raw'
+        if span <= timedelta(days=60) and start >= now - timedelta(days=self.hourly_days):
+            return 'hour'
+        return 'day'
+
+    def series(self, metric_name, start, end, resolution=None):
+        """Time series of min/avg/max buckets for ``metric_name`` between ``start`` and ``end``"""
+        resolution = resolution or self.pick_resolution(start, end)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        Sample, Rollup = self.Sample, self.Rollup
+        points = {}
+
+        if resolution == 'raw':
+            rows = self.db.session.query(Sample.recorded_at, Sample.metric_value).filter(
+                Sample.metric_name == metric_name,
+                Sample.recorded_at >= start, Sample.recorded_at < end
+            ).order_by(Sample.recorded_at).all()
+            return resolution, [{'bucket': recorded_at.isoformat(), 'min': value, 'avg': value,
+                                 'max': value, 'count': 1} for recorded_at, value in rows]
+
+        # Coarser levels: stored buckets, plus still-raw samples aggregated live
+        start = _truncate(start, resolution)
+        levels = ('hour',) if resolution == 'hour' else ('hour', 'day')
+        for row in Rollup.query.filter(
+            Rollup.metric_name == metric_name, Rollup.resolution.in_(levels),
+            Rollup.bucket_start >= start, Rollup.bucket_start < end
+        ).all():
+            self._accumulate(points, _truncate(row.bucket_start, resolution), row.min_value,
+                             row.max_value, row.avg_value * row.sample_count, row.sample_count)
+        # Inline the unit so SELECT and GROUP BY render the identical expression
+        bucket = func.date_trunc(literal_column(f"'{resolution}'"), Sample.recorded_at)
+        for bucket_start, low, high, total, count in self.db.session.query(
+            bucket, func.min(Sample.metric_value), func.max(Sample.metric_value),
+            func.sum(Sample.metric_value), func.count(Sample.id)
+        ).filter(
+            Sample.metric_name == metric_name,
+            Sample.recorded_at >= start, Sample.recorded_at < end
+        ).group_by(bucket).all():
+            self._accumulate(points, bucket_start, low, high, total, count)
+
+        return resolution, [
+            {'bucket': bucket_start.isoformat(), 'min': agg['min'], 'avg': agg['sum'] / agg['count'],
+             'max': agg['max'], 'count': agg['count']}
+            for bucket_start, agg in sorted(points.items())
+        ]
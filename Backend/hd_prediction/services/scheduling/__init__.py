@@ -0,0 +1,37 @@
+from .schedule import (
+    WEEKDAYS,
+    DEFAULT_SLOT_MINUTES,
+    IntervalIndex,
+    DaySchedule,
+    DoctorSchedule,
+    availability_rules,
+    expand,
+    to_minutes,
+    from_minutes,
+    format_minutes
+)
+from .slot_calendar import SlotCalendar
+from .booking import SlotTakenError, SLOT_CONSTRAINT, is_slot_conflict, commit_booking
+from .utilization import AppointmentStats, APPOINTMENT_STATUSES
+from .agenda import AgendaCache
+
+__all__ = [
+    'WEEKDAYS',
+    'DEFAULT_SLOT_MINUTES',
+    'IntervalIndex',
+    'DaySchedule',
+    'DoctorSchedule',
+    'availability_rules',
+    'expand',
+    'to_minutes',
+    'from_minutes',
+    'format_minutes',
+    'SlotCalendar',
+    'SlotTakenError',
+    'SLOT_CONSTRAINT',
+    'is_slot_conflict',
+    'commit_booking',
+    'AppointmentStats',
+    'APPOINTMENT_STATUSES',
+    'AgendaCache'
+]
@@ -0,0 +1,104 @@
+import threading
+from collections import OrderedDict
+from sqlalchemy import event, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+
+class AgendaCache:
+    """Per-worker LRU cache of doctors' agendas, validated by a per-doctor version.
+
+    ``watch`` bumps the doctor's row in ``doctor_agenda_versions`` on every
+    flush that inserts, updates or deletes one of their appointments, on the
+    same connection, so the version commits with the change whichever worker
+    made it. Agendas also show the patient's name and latest risk level, so a
+    flush that adds or deletes a prediction or renames a user bumps every
+    doctor that patient has appointments with. A request reads the version
+    (one primary-key lookup) and reuses the cached agenda while it matches;
+    otherwise ``loader(doctor_id, start, end)`` rebuilds it.
+    """
+
+    def __init__(self, db, appointment_model, user_model, prediction_model, version_model, loader,
+                 max_entries=1000):
+        self.db = db
+        self.Appointment = appointment_model
+        self.User = user_model
+        self.Prediction = prediction_model
+        self.Version = version_model
+        self.loader = loader
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def watch(self):
+        @event.listens_for(Session, 'after_flush')
+        def after_flush(session, flush_context):
+            doctors, patients = set(), set()
+            for target in list(session.new) + list(session.deleted):
+                if isinstance(target, self.Appointment):
+                    doctors.add(target.doctor_id)
+                elif isinstance(target, self.Prediction):
+                    patients.add(target.user_id)
+            for target in session.dirty:
+                if isinstance(target, self.Appointment) and session.is_modified(target):
+                    doctors.add(target.doctor_id)
+                    # A move to another doctor changes both agendas
+                    doctors.update(get_history(target, 'doctor_id').deleted)
+                elif isinstance(target, self.User) and get_history(target, 'full_name').has_changes():
+                    patients.add(target.id)
+            doctors.discard(None)
+            patients.discard(None)
+            if doctors:
+                self.bump(session.connection(), doctors)
+            if patients:
+                self.bump_patients(session.connection(), patients)
+
+    def _upsert(self, connection, statement):
+        table = self.Version.__table__
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=['doctor_id'],
+            set_={'version': table.c.version + 1}
+        ))
+
+    def bump(self, connection, doctor_ids):
+        statement = insert(self.Version.__table__).values(
+            [{'doctor_id': doctor_id, 'version': 1} for doctor_id in sorted(doctor_ids)]
+        )
+        self._upsert(connection, statement)
+
+    def bump_patients(self, connection, user_ids):
+        """Bump every doctor with an appointment for one of ``user_ids``"""
+        Appointment = self.Appointment
+        doctors = select(Appointment.doctor_id, literal(1)).where(
+            Appointment.user_id.in_(sorted(user_ids))
+        ).distinct()
+        self._upsert(connection, insert(self.Version.__table__).from_select(['doctor_id', 'version'], doctors))
+
+    def version(self, doctor_id):
+        return self.db.session.query(self.Version.version).filter_by(doctor_id=doctor_id).scalar() or 0
+
+    def get(self, doctor_id, start, end):
+        # Read the version before loading: a change landing mid-load leaves a stale version, not stale data
+        version = self.version(doctor_id)
+        key = (doctor_id, start, end)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        agenda = self.loader(doctor_id, start, end)
+        with self._lock:
+            self._entries[key] = (version, agenda)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return agenda
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
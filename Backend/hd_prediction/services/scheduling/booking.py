@@ -0,0 +1,36 @@
+from sqlalchemy.exc import IntegrityError
+from ...errors import ConflictError
+
+# Partial unique index on appointments (doctor_id, date, time) WHERE status = 'scheduled'
+SLOT_CONSTRAINT = 'uq_appointments_doctor_slot_scheduled'
+
+
+class SlotTakenError(ConflictError):
+    """The doctor already has a scheduled appointment in this slot"""
+    def __init__(self, message='This time slot is already booked', payload=None):
+        super().__init__(message, payload=payload)
+
+
+def is_slot_conflict(error):
+    """True if an IntegrityError came from the scheduled-slot unique index"""
+    diag = getattr(error.orig, 'diag', None)
+    constraint = getattr(diag, 'constraint_name', None)
+    if constraint is not None:
+        return constraint == SLOT_CONSTRAINT
+    return SLOT_CONSTRAINT in str(error.orig)
+
+
+def commit_booking(session):
+    """Commit a pending appointment insert/update, letting the database arbitrate the slot.
+
+    Concurrent bookings of the same slot race on the unique index rather than
+    on a prior availability read: exactly one commit succeeds and the others
+    raise SlotTakenError after rolling back.
+    """
+    try:
+        session.commit()
+    except IntegrityError as error:
+        session.rollback()
+        if is_slot_conflict(error):
+            raise SlotTakenError()
+        raise
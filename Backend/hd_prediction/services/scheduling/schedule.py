@@ -0,0 +1,144 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+DEFAULT_SLOT_MINUTES = 30
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(moment):
+    return moment.hour * 60 + moment.minute
+
+
+def from_minutes(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def format_minutes(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def expand(start, end, slot_minutes):
+    """Consecutive [start, end) slots of ``slot_minutes`` that fit inside the window"""
+    return [(minute, minute + slot_minutes) for minute in range(start, end - slot_minutes + 1, slot_minutes)]
+
+
+def _round_up(minutes, step):
+    return -(-minutes // step) * step
+
+
+def availability_rules(availability):
+    """Weekly rules equivalent to the legacy ``Doctor.availability`` JSON (fixed 30-minute slots).
+
+    As before the schedule tables: slots sit on the 30-minute grid from
+    ``startTime`` (rounded up) and run while they start before ``endTime``, so
+    the last one may end after it (09:15-17:10 ends with 17:00-17:30).
+    """
+    if not availability or 'days' not in availability or 'startTime' not in availability \
+            or 'endTime' not in availability:
+        return []
+    start = _round_up(to_minutes(datetime.strptime(availability['startTime'], '%H:%M')), DEFAULT_SLOT_MINUTES)
+    end = _round_up(to_minutes(datetime.strptime(availability['endTime'], '%H:%M')), DEFAULT_SLOT_MINUTES)
+    return [(WEEKDAYS.index(name), start, end, DEFAULT_SLOT_MINUTES)
+            for name in availability['days'] if name in WEEKDAYS]
+
+
+class IntervalIndex:
+    """Sorted, disjoint half-open [start, end) minute intervals.
+
+    Overlapping or touching inputs are merged; overlap and containment
+    queries are a bisect over the start/end arrays, so O(log n).
+    """
+
+    def __init__(self, intervals=()):
+        merged = []
+        for start, end in sorted(intervals):
+            if start >= end:
+                continue
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def overlaps(self, start, end):
+        index = bisect_right(self.ends, start)
+        return index < len(self.starts) and self.starts[index] < end
+
+    def contains(self, start, end):
+        index = bisect_right(self.starts, start) - 1
+        return index >= 0 and self.ends[index] >= end
+
+    def overlapping(self, start, end):
+        """Intervals that overlap [start, end)"""
+        index = bisect_right(self.ends, start)
+        result = []
+        while index < len(self.starts) and self.starts[index] < end:
+            result.append((self.starts[index], self.ends[index]))
+            index += 1
+        return result
+
+
+class DaySchedule:
+    """Bookable slots of one doctor on one day, sorted by start"""
+
+    def __init__(self, slots):
+        self.slots = sorted(set(slots))
+        self.starts = [start for start, _ in self.slots]
+
+    def __bool__(self):
+        return bool(self.slots)
+
+    def slot_at(self, minute):
+        """The slot starting exactly at ``minute``, or None"""
+        index = bisect_left(self.starts, minute)
+        if index < len(self.starts) and self.starts[index] == minute:
+            return self.slots[index]
+        return None
+
+    def free(self, busy):
+        """Slots that do not overlap the ``busy`` IntervalIndex"""
+        return [slot for slot in self.slots if not busy.overlaps(*slot)]
+
+
+class DoctorSchedule:
+    """Weekly rules plus dated exceptions for one doctor.
+
+    ``rules`` are ``(weekday, start_minute, end_minute, slot_minutes)`` with
+    weekday 0 = Monday. ``exceptions`` are ``(date, start_minute, end_minute,
+    kind, slot_minutes)``: kind ``off`` removes every slot overlapping the
+    window (the whole day when start/end are None), kind ``extra`` adds a
+    window of slots. Weekly slots are expanded once; each day's view is
+    built on demand and cached.
+    """
+
+    def __init__(self, rules, exceptions=()):
+        self.weekly = {}
+        for weekday, start, end, slot_minutes in rules:
+            self.weekly.setdefault(weekday, []).extend(expand(start, end, slot_minutes))
+        off, self.extra = {}, {}
+        for day, start, end, kind, slot_minutes in exceptions:
+            if kind == 'off':
+                window = (0, MINUTES_PER_DAY) if start is None or end is None else (start, end)
+                off.setdefault(day, []).append(window)
+            elif start is not None and end is not None:
+                self.extra.setdefault(day, []).extend(expand(start, end, slot_minutes or DEFAULT_SLOT_MINUTES))
+        self.off = {day: IntervalIndex(windows) for day, windows in off.items()}
+        self._days = {}
+
+    def day(self, day):
+        schedule = self._days.get(day)
+        if schedule is None:
+            slots = self.weekly.get(day.weekday(), []) + self.extra.get(day, [])
+            off = self.off.get(day)
+            if off:
+                slots = [slot for slot in slots if not off.overlaps(*slot)]
+            schedule = self._days[day] = DaySchedule(slots)
+        return schedule
@@ -0,0 +1,138 @@
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice
+from sqlalchemy import text
+from .booking import SlotTakenError
+from .schedule import (
+    DoctorSchedule,
+    IntervalIndex,
+    DEFAULT_SLOT_MINUTES,
+    availability_rules,
+    to_minutes,
+    format_minutes
+)
+
+# First key of pg_advisory_xact_lock(class, doctor_id) for per-doctor booking locks
+BOOKING_LOCK_CLASS = 4801
+
+
+class SlotCalendar:
+    """Free/busy view of doctors' schedules over a date range.
+
+    A doctor's bookable slots come from their weekly rules and dated
+    exceptions (falling back to the legacy ``availability`` JSON when they
+    have no rules). Scheduled appointments for the whole range are loaded in
+    one query and kept per day in an IntervalIndex, so each slot is checked
+    with a bisect rather than a scan.
+    """
+
+    def __init__(self, db, appointment_model, rule_model, exception_model):
+        self.db = db
+        self.Appointment = appointment_model
+        self.Rule = rule_model
+        self.ScheduleException = exception_model
+
+    def schedules(self, doctors, start, end):
+        """{doctor_id: DoctorSchedule} for ``(doctor_id, availability)`` pairs; two queries in total"""
+        doctors = dict(doctors)
+        if not doctors:
+            return {}
+        Rule, ScheduleException = self.Rule, self.ScheduleException
+        rules, exceptions = {}, {}
+        for rule in Rule.query.filter(Rule.doctor_id.in_(list(doctors))).all():
+            rules.setdefault(rule.doctor_id, []).append(rule.as_rule())
+        for exception in ScheduleException.query.filter(
+            ScheduleException.doctor_id.in_(list(doctors)), ScheduleException.date.between(start, end)
+        ).all():
+            exceptions.setdefault(exception.doctor_id, []).append(exception.as_exception())
+        return {
+            doctor_id: DoctorSchedule(rules.get(doctor_id) or availability_rules(availability),
+                                      exceptions.get(doctor_id, ()))
+            for doctor_id, availability in doctors.items()
+        }
+
+    def busy(self, schedules, start, end):
+        """{(doctor_id, date): IntervalIndex of scheduled appointments} in one query"""
+        if not schedules:
+            return {}
+        Appointment = self.Appointment
+        rows = self.db.session.query(Appointment.doctor_id, Appointment.date, Appointment.time).filter(
+            Appointment.doctor_id.in_(list(schedules)),
+            Appointment.date.between(start, end),
+            Appointment.status == 'scheduled'
+        ).all()
+        intervals = {}
+        for doctor_id, day, moment in rows:
+            minute = to_minutes(moment)
+            # An appointment occupies the slot it was booked into
+            slot = schedules[doctor_id].day(day).slot_at(minute)
+            intervals.setdefault((doctor_id, day), []).append(slot or (minute, minute + DEFAULT_SLOT_MINUTES))
+        return {key: IntervalIndex(value) for key, value in intervals.items()}
+
+    def _free_days(self, doctor_id, schedule, busy, start, end):
+        empty = IntervalIndex()
+        day = start
+        while day <= end:
+            yield day, schedule.day(day).free(busy.get((doctor_id, day), empty))
+            day += timedelta(days=1)
+
+    def free_intervals(self, doctor, start, end):
+        """{date: [(start_minute, end_minute), ...]} of free slots for every day in the range"""
+        schedules = self.schedules([(doctor.id, doctor.availability)], start, end)
+        busy = self.busy(schedules, start, end)
+        return dict(self._free_days(doctor.id, schedules[doctor.id], busy, start, end))
+
+    def free_slots(self, doctor, start, end):
+        """{date: ['HH:MM', ...]} of free slot start times for every day in the range"""
+        return {day: [format_minutes(slot_start) for slot_start, _ in slots]
+                for day, slots in self.free_intervals(doctor, start, end).items()}
+
+    def reserve(self, doctor, day, moment, require_slot=True):
+        """Lock the doctor's bookings until the transaction ends and check ``moment`` is free.
+
+        The (doctor_id, date, time) unique index cannot see two different
+        start times whose slots overlap (a 45-minute slot at 09:00 and an old
+        30-minute booking at 09:30), so booking takes a transaction-level
+        advisory lock per doctor: overlapping bookings queue and the later one
+        sees the earlier one in ``busy``. Returns the (start_minute,
+        end_minute) slot starting at ``moment``, or None when it is not one of
+        the doctor's slots and ``require_slot`` is set. Raises SlotTakenError
+        when the slot overlaps a scheduled appointment.
+        """
+        self.db.session.execute(text('SELECT pg_advisory_xact_lock(:lock_class, :doctor_id)'),
+                                {'lock_class': BOOKING_LOCK_CLASS, 'doctor_id': doctor.id})
+        schedules = self.schedules([(doctor.id, doctor.availability)], day, day)
+        minute = to_minutes(moment)
+        slot = schedules[doctor.id].day(day).slot_at(minute)
+        if slot is None:
+            if require_slot:
+                return None
+            slot = (minute, minute + DEFAULT_SLOT_MINUTES)
+        busy = self.busy(schedules, day, day).get((doctor.id, day))
+        if busy is not None and busy.overlaps(*slot):
+            raise SlotTakenError()
+        return slot
+
+    def earliest(self, doctors, start, end, limit=10, not_before=None):
+        """The ``limit`` earliest free (doctor_id, date, start_minute, end_minute) across ``doctors``.
+
+        ``doctors`` is an iterable of ``(doctor_id, availability)``. Schedules
+        and bookings for all of them come from three queries; each doctor's
+        free slots are a lazy, time-ordered stream and a heap merges the
+        streams, so only ``limit`` slots are ever materialized. Slots starting
+        before ``not_before`` (e.g. now) are skipped.
+        """
+        schedules = self.schedules(doctors, start, end)
+        busy = self.busy(schedules, start, end)
+
+        def stream(doctor_id, schedule):
+            for day, slots in self._free_days(doctor_id, schedule, busy, start, end):
+                for slot_start, slot_end in slots:
+                    if not_before is None or datetime.combine(day, datetime.min.time()) \
+                            + timedelta(minutes=slot_start) >= not_before:
+                        yield day, slot_start, doctor_id, slot_end
+
+        merged = heapq.merge(*(stream(doctor_id, schedule) for doctor_id, schedule in schedules.items()))
+        return [(doctor_id, day, slot_start, slot_end)
+                for day, slot_start, doctor_id, slot_end in islice(merged, limit)]
+
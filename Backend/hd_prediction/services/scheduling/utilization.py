@@ -0,0 +1,174 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from ...logging import get_logger
+
+logger = get_logger(__name__)
+
+APPOINTMENT_STATUSES = ('scheduled', 'completed', 'cancelled')
+
+
+def _value(target, key, previous):
+    if previous:
+        history = get_history(target, key)
+        if history.deleted:
+            return history.deleted[0]
+    return getattr(target, key)
+
+
+def _state(appointment, previous=False):
+    """(doctor_id, date, status) of an appointment before or after the pending flush"""
+    return (_value(appointment, 'doctor_id', previous), _value(appointment, 'date', previous),
+            _value(appointment, 'status', previous) or 'scheduled')
+
+
+class AppointmentStats:
+    """Per-doctor appointment counters and daily utilization, maintained in step with appointments.
+
+    ``watch`` hooks every flush: each inserted, updated or deleted
+    Appointment's (doctor, date, status) is diffed against its previous
+    state and the deltas are upserted into the status counters,
+    ``doctors.totalAppointments`` and the booked-slot count of the day, on
+    the same connection. They commit or roll back with the appointment.
+    Available slots come from the doctors' schedules and are refreshed
+    periodically by ``refresh_available``; nothing here reads appointments
+    except ``rebuild``.
+    """
+
+    def __init__(self, db, appointment_model, doctor_model, count_model, utilization_model, calendar):
+        self.db = db
+        self.Appointment = appointment_model
+        self.Doctor = doctor_model
+        self.Count = count_model
+        self.Utilization = utilization_model
+        self.calendar = calendar
+
+    def watch(self):
+        @event.listens_for(Session, 'after_flush')
+        def after_flush(session, flush_context):
+            changes = []
+            for target in session.new:
+                if isinstance(target, self.Appointment):
+                    changes.append((None, _state(target)))
+            for target in session.dirty:
+                if isinstance(target, self.Appointment) and session.is_modified(target):
+                    before, after = _state(target, previous=True), _state(target)
+                    if before != after:
+                        changes.append((before, after))
+            for target in session.deleted:
+                if isinstance(target, self.Appointment):
+                    changes.append((_state(target, previous=True), None))
+            if changes:
+                self.apply(session, changes)
+
+    def apply(self, session, changes):
+        """Apply ``(before, after)`` state pairs; None stands for a missing row"""
+        statuses, booked = Counter(), Counter()
+        for before, after in changes:
+            for state, sign in ((before, -1), (after, 1)):
+                if state is None:
+                    continue
+                doctor_id, day, status = state
+                statuses[(doctor_id, status)] += sign
+                if status != 'cancelled':
+                    booked[(doctor_id, day)] += sign
+        totals = Counter()
+        for (doctor_id, _), delta in statuses.items():
+            totals[doctor_id] += delta
+
+        # Straight on the flush's connection: no nested autoflush
+        connection = session.connection()
+        self._upsert(connection, self.Count.__table__, ['doctor_id', 'status'], 'count', [
+            {'doctor_id': doctor_id, 'status': status, 'count': delta}
+            for (doctor_id, status), delta in statuses.items() if delta
+        ])
+        self._upsert(connection, self.Utilization.__table__, ['doctor_id', 'day'], 'booked_slots', [
+            {'doctor_id': doctor_id, 'day': day, 'booked_slots': delta}
+            for (doctor_id, day), delta in booked.items() if delta
+        ])
+        doctors = self.Doctor.__table__
+        for doctor_id, delta in totals.items():
+            if delta:
+                # Keep updated_at as is so a booking does not count as a directory change
+                connection.execute(update(doctors).where(doctors.c.id == doctor_id).values(
+                    totalAppointments=func.coalesce(doctors.c.totalAppointments, 0) + delta,
+                    updated_at=doctors.c.updated_at
+                ))
+
+    @staticmethod
+    def _upsert(executor, table, keys, column, rows):
+        if not rows:
+            return
+        statement = insert(table).values(rows)
+        executor.execute(statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: table.c[column] + statement.excluded[column]}
+        ))
+
+    def counts(self, doctor_ids):
+        """{doctor_id: {'total', 'scheduled', 'completed', 'cancelled'}} from the counters"""
+        result = {doctor_id: dict.fromkeys(('total',) + APPOINTMENT_STATUSES, 0) for doctor_id in doctor_ids}
+        for row in self.Count.query.filter(self.Count.doctor_id.in_(list(result))).all():
+            result[row.doctor_id][row.status] = row.count
+            result[row.doctor_id]['total'] += row.count
+        return result
+
+    def refresh_available(self, start, end, chunk_size=1000):
+        """Recompute available slots per doctor and day in ``[start, end]`` from the schedules"""
+        doctors = self.db.session.query(self.Doctor.id, self.Doctor.availability).all()
+        schedules = self.calendar.schedules(doctors, start, end)
+        rows = []
+        for doctor_id, schedule in schedules.items():
+            day = start
+            while day <= end:
+                available = len(schedule.day(day).slots)
+                if available:
+                    rows.append({'doctor_id': doctor_id, 'day': day, 'available_slots': available})
+                day += timedelta(days=1)
+        table = self.Utilization.__table__
+        session = self.db.session
+        # Zero the range first so days that stopped being working days drop out, in the same transaction
+        session.execute(update(table).where(table.c.day.between(start, end)).values(available_slots=0))
+        now = datetime.utcnow()
+        for offset in range(0, len(rows), chunk_size):
+            statement = insert(table).values([dict(row, updated_at=now) for row in rows[offset:offset + chunk_size]])
+            session.execute(statement.on_conflict_do_update(
+                index_elements=['doctor_id', 'day'],
+                set_={'available_slots': statement.excluded.available_slots, 'updated_at': now}
+            ))
+        session.commit()
+        logger.info(f"Doctor utilization refreshed for {len(schedules)} doctor(s) from {start} to {end}")
+        return len(rows)
+
+    def rebuild(self):
+        """Recompute every counter and booked-slot count from ``appointments`` (repair only)"""
+        Appointment = self.Appointment
+        session = self.db.session
+        status = func.coalesce(Appointment.status, 'scheduled')
+        per_status = session.query(Appointment.doctor_id, status, func.count(Appointment.id))\
+            .group_by(Appointment.doctor_id, status).all()
+        per_day = session.query(Appointment.doctor_id, Appointment.date, func.count(Appointment.id))\
+            .filter(status != 'cancelled').group_by(Appointment.doctor_id, Appointment.date).all()
+
+        session.execute(self.Count.__table__.delete())
+        session.execute(update(self.Utilization.__table__).values(booked_slots=0))
+        self._upsert(session, self.Count.__table__, ['doctor_id', 'status'], 'count', [
+            {'doctor_id': doctor_id, 'status': name, 'count': count} for doctor_id, name, count in per_status
+        ])
+        self._upsert(session, self.Utilization.__table__, ['doctor_id', 'day'], 'booked_slots', [
+            {'doctor_id': doctor_id, 'day': day, 'booked_slots': count} for doctor_id, day, count in per_day
+        ])
+        totals = Counter()
+        for doctor_id, _, count in per_status:
+            totals[doctor_id] += count
+        doctors = self.Doctor.__table__
+        session.execute(update(doctors).values(totalAppointments=0, updated_at=doctors.c.updated_at))
+        for doctor_id, total in totals.items():
+            session.execute(update(doctors).where(doctors.c.id == doctor_id)
+                            .values(totalAppointments=total, updated_at=doctors.c.updated_at))
+        session.commit()
+        logger.info(f"Appointment counters rebuilt for {len(totals)} doctor(s)")
+        return len(totals)
@@ -0,0 +1,40 @@
+"""add partial unique index on scheduled appointment slots
+
+Revision ID: add_appointment_slot_unique_index
+Revises: add_doctor_location_index
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_appointment_slot_unique_index'
+down_revision = 'add_doctor_location_index'
+branch_labels = None
+depends_on = None
+
+DUPLICATES = """
+    SELECT doctor_id, date, time, count(*) AS bookings
+    FROM appointments
+    WHERE status = 'scheduled'
+    GROUP BY doctor_id, date, time
+    HAVING count(*) > 1
+"""
+
+def upgrade():
+    # Existing double bookings must be resolved by hand; cancelling one silently is not our call
+    duplicates = op.get_bind().execute(sa.text(DUPLICATES)).fetchall()
+    if duplicates:
+        raise RuntimeError(
+            f"{len(duplicates)} doctor slot(s) have more than one scheduled appointment "
+            f"(first: doctor {duplicates[0].doctor_id} on {duplicates[0].date} at {duplicates[0].time}). "
+            f"Cancel or move the extra bookings, then re-run the migration."
+        )
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_appointments_doctor_slot_scheduled "
+        "ON appointments (doctor_id, date, time) WHERE status = 'scheduled'"
+    )
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS uq_appointments_doctor_slot_scheduled')
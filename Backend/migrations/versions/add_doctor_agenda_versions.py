@@ -0,0 +1,27 @@
+"""add doctor agenda versions
+
+Revision ID: add_doctor_agenda_versions
+Revises: add_doctor_appointment_stats
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_doctor_agenda_versions'
+down_revision = 'add_doctor_appointment_stats'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Rows appear on a doctor's first appointment change; a missing row reads as version 0
+    op.create_table('doctor_agenda_versions',
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('doctor_id')
+    )
+
+def downgrade():
+    op.drop_table('doctor_agenda_versions')
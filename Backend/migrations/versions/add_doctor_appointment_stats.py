@@ -0,0 +1,59 @@
+"""add doctor appointment counters and daily utilization
+
+Revision ID: add_doctor_appointment_stats
+Revises: add_doctor_schedule_tables
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_doctor_appointment_stats'
+down_revision = 'add_doctor_schedule_tables'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('doctor_appointment_counts',
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('doctor_id', 'status')
+    )
+    op.create_table('doctor_daily_utilization',
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('booked_slots', sa.Integer(), nullable=False),
+        sa.Column('available_slots', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('doctor_id', 'day')
+    )
+    op.create_index('ix_doctor_daily_utilization_day', 'doctor_daily_utilization', ['day'])
+
+    # One-time backfill; from here on the application keeps these in step.
+    # Available slots are filled by the utilization refresh job.
+    op.execute("""
+        INSERT INTO doctor_appointment_counts (doctor_id, status, count)
+        SELECT doctor_id, coalesce(status, 'scheduled'), count(*)
+        FROM appointments
+        GROUP BY doctor_id, coalesce(status, 'scheduled')
+    """)
+    op.execute("""
+        INSERT INTO doctor_daily_utilization (doctor_id, day, booked_slots, available_slots, updated_at)
+        SELECT doctor_id, date, count(*), 0, now()
+        FROM appointments
+        WHERE coalesce(status, 'scheduled') <> 'cancelled'
+        GROUP BY doctor_id, date
+    """)
+    op.execute("""
+        UPDATE doctors SET "totalAppointments" = coalesce(
+            (SELECT count(*) FROM appointments WHERE appointments.doctor_id = doctors.id), 0)
+    """)
+
+def downgrade():
+    op.drop_index('ix_doctor_daily_utilization_day', table_name='doctor_daily_utilization')
+    op.drop_table('doctor_daily_utilization')
+    op.drop_table('doctor_appointment_counts')
@@ -0,0 +1,22 @@
+"""add (latitude, longitude) index for nearby doctor search
+
+Revision ID: add_doctor_location_index
+Revises: add_doctor_trigram_indexes
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_doctor_location_index'
+down_revision = 'add_doctor_trigram_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Bounding-box prefilter for /api/doctors/nearby with DOCTOR_SEARCH_BACKEND=sql
+    op.execute('CREATE INDEX IF NOT EXISTS ix_doctors_latitude_longitude ON doctors (latitude, longitude)')
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_doctors_latitude_longitude')
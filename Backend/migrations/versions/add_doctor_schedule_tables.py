@@ -0,0 +1,53 @@
+"""add doctor schedule rules and exceptions
+
+Revision ID: add_doctor_schedule_tables
+Revises: add_appointment_slot_unique_index
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_doctor_schedule_tables'
+down_revision = 'add_appointment_slot_unique_index'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Doctors without rules keep using their availability JSON, so nothing is backfilled
+    op.create_table('doctor_schedule_rules',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('weekday', sa.SmallInteger(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.Column('slot_minutes', sa.SmallInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_doctor_schedule_rules_doctor_id_weekday', 'doctor_schedule_rules',
+                    ['doctor_id', 'weekday'])
+    op.create_table('doctor_schedule_exceptions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=True),
+        sa.Column('end_time', sa.Time(), nullable=True),
+        sa.Column('slot_minutes', sa.SmallInteger(), nullable=True),
+        sa.Column('reason', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['doctor_id'], ['doctors.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_doctor_schedule_exceptions_doctor_id_date', 'doctor_schedule_exceptions',
+                    ['doctor_id', 'date'])
+
+def downgrade():
+    op.drop_index('ix_doctor_schedule_exceptions_doctor_id_date', table_name='doctor_schedule_exceptions')
+    op.drop_table('doctor_schedule_exceptions')
+    op.drop_index('ix_doctor_schedule_rules_doctor_id_weekday', table_name='doctor_schedule_rules')
+    op.drop_table('doctor_schedule_rules')
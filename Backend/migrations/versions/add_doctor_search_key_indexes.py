@@ -0,0 +1,44 @@
+"""add accent- and case-insensitive search key indexes for doctor autocomplete
+
+Revision ID: add_doctor_search_key_indexes
+Revises: add_doctor_agenda_versions
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_doctor_search_key_indexes'
+down_revision = 'add_doctor_agenda_versions'
+branch_labels = None
+depends_on = None
+
+# SQL twin of hd_prediction.services.directory.normalize: unaccent, lower-case and
+# collapse whitespace. unaccent() is only STABLE, so an IMMUTABLE wrapper naming
+# the dictionary explicitly is needed to index the expression.
+SEARCH_KEY_FUNCTION = r"""
+    CREATE OR REPLACE FUNCTION doctor_search_key(value text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $$
+        SELECT lower(public.unaccent('public.unaccent'::regdictionary,
+                                     regexp_replace(btrim(value), '\s+', ' ', 'g')))
+    $$
+"""
+
+INDEXES = [
+    ('ix_doctors_city_search_key', 'city'),
+    ('ix_doctors_area_search_key', 'area'),
+    ('ix_doctors_specialization_search_key', 'specialization'),
+]
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    op.execute(SEARCH_KEY_FUNCTION)
+    # gin_trgm_ops serves both the 'term%' and '% term%' word-prefix patterns
+    for name, column in INDEXES:
+        op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON doctors USING gin (doctor_search_key({column}) gin_trgm_ops)')
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+    op.execute('DROP FUNCTION IF EXISTS doctor_search_key(text)')
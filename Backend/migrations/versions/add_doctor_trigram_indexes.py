@@ -0,0 +1,35 @@
+"""add pg_trgm GIN indexes for doctor text search
+
+Revision ID: add_doctor_trigram_indexes
+Revises: add_keyset_pagination_indexes
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_doctor_trigram_indexes'
+down_revision = 'add_keyset_pagination_indexes'
+branch_labels = None
+depends_on = None
+
+# gin_trgm_ops serves ILIKE '%term%' and word_similarity() ranking on each column.
+# Not declared on the model: db.create_all() would fail where pg_trgm is unavailable.
+INDEXES = [
+    ('ix_doctors_city_trgm', 'city'),
+    ('ix_doctors_area_trgm', 'area'),
+    ('ix_doctors_specialization_trgm', 'specialization'),
+    ('ix_doctors_full_name_trgm', '"fullName"'),
+    ('ix_doctors_email_trgm', 'email'),
+    ('ix_doctors_hospital_trgm', 'hospital'),
+]
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in INDEXES:
+        op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON doctors USING gin ({column} gin_trgm_ops)')
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.execute(f'DROP INDEX IF EXISTS {name}')
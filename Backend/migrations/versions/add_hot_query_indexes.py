@@ -0,0 +1,33 @@
+"""add indexes for hot query filters
+
+Revision ID: add_hot_query_indexes
+Revises: add_resource_updated_at
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_query_indexes'
+down_revision = 'add_resource_updated_at'
+branch_labels = None
+depends_on = None
+
+# IF NOT EXISTS because db.create_all() also creates these for fresh databases
+INDEXES = [
+    ('ix_prediction_records_user_id_prediction_date', 'prediction_records', 'user_id, prediction_date DESC'),
+    ('ix_user_activities_created_at', 'user_activities', 'created_at'),
+    ('ix_user_activities_user_id_created_at', 'user_activities', 'user_id, created_at'),
+    ('ix_appointments_doctor_id_date_status', 'appointments', 'doctor_id, date, status'),
+    ('ix_system_health_metric_name_recorded_at', 'system_health', 'metric_name, recorded_at DESC'),
+    ('ix_admin_activity_logs_created_at', 'admin_activity_logs', 'created_at'),
+]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+
+def downgrade():
+    for name, _, _ in reversed(INDEXES):
+        op.execute(f'DROP INDEX IF EXISTS {name}')
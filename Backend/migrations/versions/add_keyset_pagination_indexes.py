@@ -0,0 +1,43 @@
+"""add composite indexes for keyset pagination
+
+Revision ID: add_keyset_pagination_indexes
+Revises: add_system_health_rollups
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_keyset_pagination_indexes'
+down_revision = 'add_system_health_rollups'
+branch_labels = None
+depends_on = None
+
+# Each index ends in the full cursor key so "(key) < (cursor)" is an index range scan
+INDEXES = [
+    ('ix_prediction_records_user_id_prediction_date_id', 'prediction_records', 'user_id, prediction_date, id'),
+    ('ix_user_activities_created_at_id', 'user_activities', 'created_at, id'),
+    ('ix_admin_activity_logs_created_at_id', 'admin_activity_logs', 'created_at, id'),
+    ('ix_appointments_user_id_date_time_id', 'appointments', 'user_id, date, time, id'),
+    ('ix_appointments_doctor_id_date_time_id', 'appointments', 'doctor_id, date, time, id'),
+]
+
+# Left-prefixes of the new indexes
+SUPERSEDED = [
+    ('ix_prediction_records_user_id_prediction_date', 'prediction_records', 'user_id, prediction_date DESC'),
+    ('ix_user_activities_created_at', 'user_activities', 'created_at'),
+    ('ix_admin_activity_logs_created_at', 'admin_activity_logs', 'created_at'),
+]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+    for name, _, _ in SUPERSEDED:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+def downgrade():
+    for name, table, columns in SUPERSEDED:
+        op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+    for name, _, _ in reversed(INDEXES):
+        op.execute(f'DROP INDEX IF EXISTS {name}')
@@ -0,0 +1,36 @@
+"""add prediction_daily_rollup table
+
+Revision ID: add_prediction_daily_rollup
+Revises: add_hot_query_indexes
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_prediction_daily_rollup'
+down_revision = 'add_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+COUNTERS = [
+    'prediction_count', 'probability_count', 'high_risk_count', 'medium_risk_count',
+    'low_risk_count', 'male_count', 'female_count', 'age_under_40', 'age_40_54',
+    'age_55_64', 'age_65_plus', 'max_record_id'
+]
+
+def upgrade():
+    op.create_table('prediction_daily_rollup',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('probability_sum', sa.Float(), nullable=False, server_default='0'),
+        *[sa.Column(name, sa.Integer(), nullable=False, server_default='0') for name in COUNTERS],
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('day')
+    )
+    # Lets the live "today" aggregate and backfill chunks range-scan by date
+    op.execute('CREATE INDEX IF NOT EXISTS ix_prediction_records_prediction_date ON prediction_records (prediction_date)')
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_prediction_records_prediction_date')
+    op.drop_table('prediction_daily_rollup')
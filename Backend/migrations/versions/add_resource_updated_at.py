@@ -0,0 +1,23 @@
+"""add updated_at to resources
+
+Revision ID: add_resource_updated_at
+Revises: add_last_login_to_doctors
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_resource_updated_at'
+down_revision = 'add_last_login_to_doctors'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Used as the version stamp for ETags on the public resource endpoints
+    op.add_column('resources', sa.Column('updated_at', sa.DateTime(), nullable=True,
+                                         server_default=sa.text('CURRENT_TIMESTAMP')))
+
+def downgrade():
+    op.drop_column('resources', 'updated_at')
@@ -0,0 +1,46 @@
+"""add system_health_current and system_health_status_counts
+
+Revision ID: add_system_health_read_models
+Revises: add_prediction_daily_rollup
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_system_health_read_models'
+down_revision = 'add_prediction_daily_rollup'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('system_health_current',
+        sa.Column('metric_name', sa.String(length=50), nullable=False),
+        sa.Column('metric_value', sa.Float(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('recorded_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('metric_name')
+    )
+    op.create_table('system_health_status_counts',
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('status')
+    )
+    # Seed both read models from the existing history
+    op.execute("""
+        INSERT INTO system_health_current (metric_name, metric_value, status, details, recorded_at)
+        SELECT DISTINCT ON (metric_name) metric_name, metric_value, status, details, recorded_at
+        FROM system_health
+        WHERE recorded_at IS NOT NULL
+        ORDER BY metric_name, recorded_at DESC
+    """)
+    op.execute("""
+        INSERT INTO system_health_status_counts (status, count)
+        SELECT status, count(*) FROM system_health GROUP BY status
+    """)
+
+def downgrade():
+    op.drop_table('system_health_status_counts')
+    op.drop_table('system_health_current')
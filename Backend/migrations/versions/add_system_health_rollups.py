@@ -0,0 +1,35 @@
+"""add system_health_rollups for downsampled health history
+
+Revision ID: add_system_health_rollups
+Revises: add_system_health_read_models
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_system_health_rollups'
+down_revision = 'add_system_health_read_models'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('system_health_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('resolution', sa.String(length=10), nullable=False),
+        sa.Column('metric_name', sa.String(length=50), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('min_value', sa.Float(), nullable=False),
+        sa.Column('avg_value', sa.Float(), nullable=False),
+        sa.Column('max_value', sa.Float(), nullable=False),
+        sa.Column('sample_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('resolution', 'metric_name', 'bucket_start', name='uq_system_health_rollups_bucket')
+    )
+    # Retention batches select raw rows by age
+    op.execute("CREATE INDEX IF NOT EXISTS ix_system_health_recorded_at ON system_health (recorded_at)")
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_system_health_recorded_at")
+    op.drop_table('system_health_rollups')
@@ -0,0 +1,187 @@
+"""Concurrent booking stress test.
+
+Creates a throwaway patient and two doctors, then has T threads, each with
+its own test client (and so its own session and connection), hit the real
+booking endpoints at the same instant:
+
+- same slot: every thread books the same doctor, date and time through
+  POST /api/appointments, for S slots.
+- overlapping create: half the threads book the 45-minute 09:00 slot while
+  the other half re-schedule (PUT status=scheduled) a cancelled 30-minute
+  booking at 09:30 left from an earlier schedule, for S days.
+- overlapping reschedule: every thread re-schedules its own cancelled
+  booking, alternating 09:00 and 09:30, for S days.
+
+Every round must let exactly one booking through and answer every other
+attempt with 409. The overlapping rounds never repeat a start time, so the
+scheduled-slot unique index cannot arbitrate them; only the per-doctor lock
+and overlap check in SlotCalendar.reserve can. All rows created here are
+deleted afterwards. Connection settings come from the same DB_* variables as
+the app (DB_POOL_SIZE defaults to T); run the migrations first.
+
+Usage: python stress_booking.py [threads] [rounds]
+"""
+import os
+import sys
+import threading
+from collections import Counter
+from datetime import date, time, timedelta
+
+from dotenv import load_dotenv
+
+from hd_prediction.services.scheduling import from_minutes
+
+MARKER = 'stress-booking'
+# Doctor with weekly rules of 45-minute slots; 09:30 is not one of them
+RULE_START, RULE_END, SLOT_MINUTES = time(9, 0), time(12, 0), 45
+EARLY, LATE = time(9, 0), time(9, 30)
+
+
+def create_fixtures(server):
+    db = server.db
+    user = server.User(email=f'{MARKER}@example.invalid', password_hash='x', full_name='Stress Booking')
+    doctors = []
+    for name, availability in [
+        ('Slot', {'days': list(server.WEEKDAYS), 'startTime': '00:00', 'endTime': '23:30'}),
+        ('Overlap', {'days': [], 'startTime': '09:00', 'endTime': '17:00'}),
+    ]:
+        doctors.append(server.Doctor(
+            fullName=f'Dr. Stress {name}', specialization='Cardiology', qualifications='MD', experience=10,
+            hospital='Stress Hospital', address='Stress Street', city='Stress City', area='Stress Area',
+            phoneNumber='000', email=f'{MARKER}-{name.lower()}@example.invalid', password_hash='x',
+            availability=availability
+        ))
+    db.session.add(user)
+    db.session.add_all(doctors)
+    db.session.flush()
+    db.session.add_all([
+        server.DoctorScheduleRule(doctor_id=doctors[1].id, weekday=weekday, start_time=RULE_START,
+                                  end_time=RULE_END, slot_minutes=SLOT_MINUTES)
+        for weekday in range(len(server.WEEKDAYS))
+    ])
+    db.session.commit()
+    return user.id, doctors[0].id, doctors[1].id
+
+
+def cancelled_bookings(server, user_id, doctor_id, day, times):
+    """Cancelled appointments at ``times``, written through the app's models so its counters stay right"""
+    appointments = [server.Appointment(user_id=user_id, doctor_id=doctor_id, date=day, time=moment,
+                                       reason=MARKER, status='cancelled') for moment in times]
+    server.db.session.add_all(appointments)
+    server.db.session.commit()
+    return [appointment.id for appointment in appointments]
+
+
+def drop_fixtures(server, user_id, doctor_ids):
+    db = server.db
+    db.session.rollback()
+    db.session.execute(db.text("DELETE FROM appointments WHERE user_id = :user_id"), {'user_id': user_id})
+    # Schedule rules and appointment counters cascade with the doctor
+    db.session.execute(db.text("DELETE FROM doctors WHERE id = ANY(:ids)"), {'ids': list(doctor_ids)})
+    db.session.execute(db.text("DELETE FROM users WHERE id = :id"), {'id': user_id})
+    db.session.commit()
+
+
+def book(doctor_id, day, moment):
+    def send(client):
+        return client.post('/api/appointments', json={
+            'doctorId': doctor_id, 'date': day.isoformat(), 'time': moment.strftime('%H:%M'), 'reason': MARKER
+        })
+    return send
+
+
+def reschedule(appointment_id):
+    def send(client):
+        return client.put(f'/api/appointments/{appointment_id}', json={'status': 'scheduled'})
+    return send
+
+
+def race(server, identity, requests):
+    """Send every request from its own thread and client at the same instant; Counter of outcomes"""
+    barrier = threading.Barrier(len(requests))
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def worker(send):
+        client = server.app.test_client()
+        with client.session_transaction() as session:
+            session.update(identity)
+        barrier.wait()
+        try:
+            result = send(client).status_code
+        except Exception as error:
+            result = f'error: {type(error).__name__}'
+        with lock:
+            outcomes[result] += 1
+
+    workers = [threading.Thread(target=worker, args=(send,)) for send in requests]
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    return outcomes
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    load_dotenv()
+    os.environ.setdefault('DB_POOL_SIZE', str(threads))
+    import app as server
+
+    start = date.today() + timedelta(days=30)
+    results = {'same slot': Counter(), 'overlapping create': Counter(), 'overlapping reschedule': Counter()}
+    failures = []
+
+    def check(scenario, label, outcomes):
+        results[scenario].update(outcomes)
+        if outcomes[200] != 1 or outcomes[409] != threads - 1:
+            failures.append(f"{scenario} {label}: {dict(outcomes)}")
+
+    with server.app.app_context():
+        user_id, slot_doctor_id, overlap_doctor_id = create_fixtures(server)
+        try:
+            for index in range(rounds):
+                moment = from_minutes(9 * 60 + 30 * index)
+                identity = {'user_id': user_id}
+                # Same request the app's booking form sends: SlotCalendar.reserve, then commit_booking
+                check('same slot', moment.strftime('%H:%M'),
+                      race(server, identity, [book(slot_doctor_id, start, moment)] * threads))
+
+            identity = {'user_id': user_id, 'doctor_id': overlap_doctor_id}
+            for index in range(rounds):
+                day = start + timedelta(days=index)
+                late = cancelled_bookings(server, user_id, overlap_doctor_id, day, [LATE] * (threads // 2))
+                requests = [book(overlap_doctor_id, day, EARLY)] * (threads - len(late))
+                check('overlapping create', day.isoformat(),
+                      race(server, identity, requests + [reschedule(appointment_id) for appointment_id in late]))
+
+            for index in range(rounds):
+                day = start + timedelta(days=rounds + index)
+                cancelled = cancelled_bookings(server, user_id, overlap_doctor_id, day,
+                                               [(EARLY, LATE)[thread % 2] for thread in range(threads)])
+                check('overlapping reschedule', day.isoformat(),
+                      race(server, identity, [reschedule(appointment_id) for appointment_id in cancelled]))
+
+            # Whatever the responses said, the table must hold one scheduled booking per round
+            Appointment = server.Appointment
+            scheduled = dict(server.db.session.query(Appointment.doctor_id, server.db.func.count(Appointment.id))
+                             .filter(Appointment.user_id == user_id, Appointment.status == 'scheduled')
+                             .group_by(Appointment.doctor_id).all())
+            expected = {slot_doctor_id: rounds, overlap_doctor_id: 2 * rounds}
+            if scheduled != expected:
+                failures.append(f"scheduled bookings per doctor: expected {expected}, got {scheduled}")
+        finally:
+            drop_fixtures(server, user_id, (slot_doctor_id, overlap_doctor_id))
+
+    for scenario, outcomes in results.items():
+        print(f"{scenario}: {threads} threads x {rounds} rounds: {dict(outcomes)}")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK: exactly one booking per slot and per overlapping round")
+
+
+if __name__ == '__main__':
+    main()